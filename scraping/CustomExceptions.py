@@ -20,3 +20,8 @@ class LoginError(Exception):
 class OrdersNotFound(Exception):
     """gets raised if 'orders.json' not found in th project root directory"""
     pass
+
+
+class ScrapeCancelled(Exception):
+    """gets raised inside a scrape that got cancelled, e.g. by the cancel command of the CLI"""
+    pass
@@ -6,14 +6,15 @@ Projects entry point providing command parsing
 import datetime
 import logging
 import sys
-from typing import Optional
+from typing import List, Optional
 
 import click
 
 from scraping.CustomExceptions import PasswordFileNotFound, LoginError
-from scraping.cli import Cli
-from . import dash_app
-from .scraper import Scraper
+
+# The subcommands import their modules themselves: dash, plotly and flask (dash_app) or selenium (scraper, cli) take
+# most of the startup time and only few commands need them
+# pylint: disable=C0415
 
 
 @click.group()
@@ -25,13 +26,67 @@ def main() -> None:
 @main.command()
 def cli() -> None:
     """starts the CLI"""
+    from scraping.cli import Cli
     Cli()
 
 
 @main.command()
-def dash() -> None:
+@click.option("--webgl/--no-webgl", default=False,
+              help="render the time series graph through WebGL, which stays fast with many data points")
+@click.option("--serve", is_flag=True, default=False,
+              help="serve the dashboard through gunicorn with several workers instead of the development server")
+@click.option("--host", default="127.0.0.1", help="the address to listen on with --serve")
+@click.option("--port", default=8050, help="the port to listen on with --serve")
+@click.option("--workers", default=2, help="number of worker processes with --serve")
+@click.option("--threads", default=4, help="number of threads per worker process with --serve")
+def dash(webgl: bool, serve: bool, host: str, port: int, workers: int, threads: int) -> None:
     """ creates a dash app to visualize the evaluated scraping output """
-    dash_app.main()
+    if serve:
+        from . import serving
+        serving.serve(host, port, workers, threads, bool(webgl))
+    else:
+        from . import dash_app
+        dash_app.main(bool(webgl))
+
+
+@main.command()
+def classify() -> None:
+    """ tags all stored orders again with the rules from rules.json, e.g. after changing the rules """
+    from . import classification
+    from . import file_handler
+    orders = file_handler.load_orders()
+    tagged = classification.load_classifier().tag_orders(orders, force=True)
+    file_handler.save_orders(orders)
+    print(f"{tagged} items classified")
+
+
+@main.command()
+@click.option("--orders", "orders_files", multiple=True, default=["orders.json"], show_default=True,
+              help="orders file to add to the store, can be given several times (e.g. one per account)")
+@click.option("--output", default="orders.store", show_default=True, help="the order store to write")
+def store(orders_files: List[str], output: str) -> None:
+    """ merges orders files into one order store, which is read lazily through mmap """
+    from . import file_handler
+    from .order_store import SUFFIX, write_store
+    if not output.endswith(SUFFIX):
+        print(f'the order store has to end with {SUFFIX}')
+        sys.exit(1)
+    orders = [order for orders_file in orders_files for order in file_handler.load_orders(orders_file)]
+    print(f'{write_store(file_handler.to_file_path(output), orders)} orders written to {output}')
+
+
+@main.command()
+@click.option("--orders", "orders_files", multiple=True, default=["orders.json"], show_default=True,
+              help="orders file to report on, can be given several times (e.g. one per account)")
+@click.option("--output", default="reports", show_default=True, help="directory the reports are written to")
+@click.option("--image", "image_format", type=click.Choice(["png", "svg"]), default=None,
+              help="additionally export every figure as image (needs plotly's orca)")
+def report(orders_files: List[str], output: str, image_format: Optional[str]) -> None:
+    """ writes a static HTML report per orders file, without starting a server or a browser """
+    from . import report as report_export
+    failed = report_export.main(list(orders_files), output, image_format)
+    if failed:
+        sys.exit(1)
 
 
 # @click.option("--password", required=False, default=None, hide_input=True, prompt=True, help="the users password")
@@ -45,12 +100,177 @@ def dash() -> None:
               help="the year to end with. If not set the current year is used.")
 @click.option("--extensive", default=True,
               help="if set to False categorization for items isn't available, but scraping itself should be faster")
-def scrape(email: str, password: Optional[str], headless: bool, start: int, end: int, extensive: bool) -> None:
+@click.option("--enrich-workers", default=0, show_default=True,
+              help="additional browsers reading item categories and prices while the first one reads the order list, "
+                   "0 to use a single browser")
+@click.option("--max-rate", default=4.0, show_default=True,
+              help="pages per second at most, the scrape slows down by itself when Amazon starts throttling")
+@click.option("--refresh", is_flag=True, help="load product and order details pages again instead of using the cache")
+@click.option("--refresh-days", default=60, show_default=True,
+              help="stored orders of the last days are scraped again and updated, older ones are never loaded again")
+@click.option("--base-url", default=None,
+              help="the shop to scrape, https://www.amazon.de if not set, e.g. http://127.0.0.1:8060 for mock-server")
+def scrape(email: str, password: Optional[str], headless: bool, start: int, end: int, extensive: bool,
+           enrich_workers: int, max_rate: float, refresh: bool, refresh_days: int, base_url: Optional[str]) -> None:
     """ starts the scraping process and collects all data """
+    from .progress import TerminalProgress
+    from .scraper import BASE_URL, Scraper
+    from .throttle import AdaptiveThrottle
+    terminal_progress = TerminalProgress()
     try:
-        Scraper(email, password, bool(headless), start, end, extensive)
+        Scraper(email, password, bool(headless), start, end, extensive, progress_observer_callback=terminal_progress,
+                enrich_workers=enrich_workers,
+                throttle=AdaptiveThrottle(max_rate=max_rate, max_concurrency=1 + enrich_workers), refresh=refresh,
+                refresh_days=refresh_days, base_url=base_url or BASE_URL)
     except (PasswordFileNotFound, LoginError):
         exit(1)
+    finally:
+        terminal_progress.close()
+
+
+@main.command()
+@click.option("--email", required=True, help="The users email address")
+@click.option("--password", required=False, default=None, help="the users password")
+@click.option("--headless/--no-headless", default=False, help="run the browser in headless mode")
+@click.option("--orders", "orders_file", default="orders.json", show_default=True, help="orders file to enrich")
+@click.option("--priority", type=click.Choice(["recent", "expensive"]), default="recent", show_default=True,
+              help="which items get their categories first")
+@click.option("--batch-size", default=20, show_default=True,
+              help="items between two saves, a stopped run continues after the last saved batch")
+@click.option("--max-items", default=None, type=int, help="items to enrich at most in this run")
+@click.option("--max-minutes", default=None, type=float, help="minutes after which no further items are started")
+@click.option("--enrich-workers", default=0, show_default=True,
+              help="additional browsers reading product pages, 0 to use the signed in browser only")
+@click.option("--retry-failed", is_flag=True, help="try again the items whose page showed no categories before")
+@click.option("--refresh", is_flag=True, help="load product pages again instead of using the cache")
+@click.option("--base-url", default=None,
+              help="the shop to scrape, https://www.amazon.de if not set, e.g. http://127.0.0.1:8060 for mock-server")
+def enrich(email: str, password: Optional[str], headless: bool, orders_file: str, priority: str, batch_size: int,
+           max_items: Optional[int], max_minutes: Optional[float], enrich_workers: int, retry_failed: bool,
+           refresh: bool, base_url: Optional[str]) -> None:
+    """ backfills the categories of items scraped without them, e.g. with --extensive False """
+    from . import enrich as enrichment
+    from .scraper import BASE_URL
+    try:
+        enrichment.main(email, password, bool(headless), orders_file, priority, batch_size, max_items,
+                        max_minutes * 60 if max_minutes is not None else None, enrich_workers, retry_failed, refresh,
+                        base_url or BASE_URL)
+    except (PasswordFileNotFound, LoginError):
+        sys.exit(1)
+
+
+@main.command()
+@click.option("--accounts", default="accounts.json", show_default=True,
+              help="json list of accounts, e.g. [{\"email\": \"max@example.com\", \"password\": \"...\"}]")
+@click.option("--workers", default=2, show_default=True, help="maximum number of browsers scraping at once")
+@click.option("--retries", default=2, show_default=True, help="further attempts for an account after a failure")
+@click.option("--backoff", default=30.0, show_default=True,
+              help="seconds before the first retry of an account, doubled for every further retry")
+@click.option("--headless/--no-headless", default=True, help="run the browsers in headless mode")
+@click.option("--enrich-workers", default=0, show_default=True,
+              help="additional browsers per account reading item categories and prices")
+@click.option("--max-rate", default=4.0, show_default=True,
+              help="pages per second at most of all accounts together, each account adapts its own rate below that")
+@click.option("--base-url", default=None,
+              help="the shop to scrape, https://www.amazon.de if not set, e.g. http://127.0.0.1:8060 for mock-server")
+def batch(accounts: str, workers: int, retries: int, backoff: float, headless: bool, enrich_workers: int,
+          max_rate: float, base_url: Optional[str]) -> None:
+    """ scrapes all accounts of an accounts file, each into accounts/<email>.json unless it sets a file_name """
+    from . import batch as batch_scraping
+    if not batch_scraping.main(accounts, workers, retries, backoff, bool(headless), enrich_workers, base_url,
+                               max_rate):
+        sys.exit(1)
+
+
+@main.command()
+@click.option("--sizes", default=None,
+              help="comma separated numbers of synthetic orders to benchmark with, 1000 up to 1000000 if not set")
+@click.option("--seed", default=0, help="seed for the synthetic order generator")
+@click.option("--memory/--no-memory", default=True,
+              help="additionally measure the peak memory (runs every benchmark a second time)")
+@click.option("--output", default=None, help="write the measurements as json to this file")
+def benchmark(sizes: Optional[str], seed: int, memory: bool, output: Optional[str]) -> None:
+    """ benchmarks loading, evaluating and visualizing synthetic order histories """
+    from . import benchmarks
+    benchmarks.main([int(size) for size in sizes.split(',')] if sizes else benchmarks.DEFAULT_SIZES, seed,
+                    bool(memory), output)
+
+
+@main.command("memory-benchmark")
+@click.option("--sizes", default="10000,100000", show_default=True,
+              help="comma separated numbers of synthetic orders to load")
+@click.option("--seed", default=0, help="seed for the synthetic order generator")
+def memory_benchmark(sizes: str, seed: int) -> None:
+    """ measures the memory loaded order histories keep """
+    from . import benchmarks
+    benchmarks.print_retained_memory([int(size) for size in sizes.split(',')], seed)
+
+
+@main.command("serialization-benchmark")
+@click.option("--sizes", default="10000,100000", show_default=True,
+              help="comma separated numbers of synthetic orders to write and read")
+@click.option("--seed", default=0, help="seed for the synthetic order generator")
+def serialization_benchmark(sizes: str, seed: int) -> None:
+    """ compares saving and loading orders as json and in the binary format """
+    from . import benchmarks
+    benchmarks.print_serialization_benchmark([int(size) for size in sizes.split(',')], seed)
+
+
+@main.command("store-benchmark")
+@click.option("--sizes", default="100000,1000000", show_default=True,
+              help="comma separated numbers of synthetic orders in the store")
+@click.option("--days", default=31, show_default=True, help="days of orders read from the middle of the history")
+@click.option("--seed", default=0, help="seed for the synthetic order generator")
+def store_benchmark(sizes: str, days: int, seed: int) -> None:
+    """ compares reading a date range from an order store with loading the whole json file """
+    from . import benchmarks
+    benchmarks.print_store_benchmark([int(size) for size in sizes.split(',')], seed, days)
+
+
+@main.command("import-benchmark")
+@click.option("--repeat", default=5, help="imports per module, the fastest one counts")
+def import_benchmark(repeat: int) -> None:
+    """ measures the import time of the entry points and fails if one got slower than its threshold """
+    from . import benchmarks
+    if not benchmarks.check_import_times(repeat):
+        sys.exit(1)
+
+
+@main.command("mock-server")
+@click.option("--orders", default=500, show_default=True, help="number of synthetic orders")
+@click.option("--years", default=3, show_default=True, help="the orders are spread over this many years up to today")
+@click.option("--port", default=8060, show_default=True)
+@click.option("--latency", default=0.0, help="seconds added to every response")
+@click.option("--jitter", default=0.0, help="up to this many seconds added at random")
+@click.option("--error-rate", default=0.0, help="share of pages answered with an error page")
+@click.option("--captcha-rate", default=0.0, help="share of pages answered with a captcha")
+@click.option("--max-rate", default=None, type=float, help="pages per second, beyond that the server answers errors")
+@click.option("--padding", default=0, help="bytes added to every page")
+def mock_server(orders: int, years: int, port: int, latency: float, jitter: float, error_rate: float,
+                captcha_rate: float, max_rate: Optional[float], padding: int) -> None:
+    """ serves synthetic orders like amazon.de, e.g. for scrape --base-url http://127.0.0.1:8060 """
+    from . import mock_server as mock
+    mock.main(orders, years, port=port, settings=mock.MockSettings(latency, jitter, error_rate, captcha_rate, max_rate,
+                                                                   padding))
+
+
+@main.command("scrape-benchmark")
+@click.option("--orders", default=200, show_default=True, help="number of synthetic orders on the mock server")
+@click.option("--years", default=2, show_default=True, help="the orders are spread over this many years up to today")
+@click.option("--enrich-workers", default=2, show_default=True)
+@click.option("--headless/--no-headless", default=True)
+@click.option("--latency", default=0.0, help="seconds the mock server adds to every response")
+@click.option("--error-rate", default=0.0, help="share of pages answered with an error page")
+@click.option("--max-rate", default=None, type=float, help="pages per second the mock server answers without errors")
+def scrape_benchmark(orders: int, years: int, enrich_workers: int, headless: bool, latency: float, error_rate: float,
+                     max_rate: Optional[float]) -> None:
+    """ scrapes a local mock server end to end and reports throughput and latency """
+    import json
+    from . import benchmarks
+    from .mock_server import MockSettings
+    result = benchmarks.scrape_benchmark(orders, years, enrich_workers, bool(headless),
+                                         MockSettings(latency=latency, error_rate=error_rate, max_rate=max_rate))
+    print(json.dumps(result, indent=2))
 
 
 def setup_logger() -> None:
@@ -0,0 +1,243 @@
+"""
+JSON endpoints for the aggregates of the dashboard under /api/v1, with ETags and gzip compression
+"""
+from __future__ import annotations
+
+import datetime
+import functools
+import gzip
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import flask
+
+from .categories import CategoryTrie, PATH_SEPARATOR
+from .data import Order
+from .evaluation import Evaluation
+from .ranking import OrderRanking
+from .timeseries import Frequency, TimeSeries
+
+if TYPE_CHECKING:
+    from .dash_app import LiveEvaluation
+
+URL_PREFIX: str = '/api/v1'
+
+# responses smaller than this are sent uncompressed, gzip would not save anything
+MINIMUM_COMPRESS_SIZE: int = 500
+
+# number of memoized date ranges for category and top-K queries, these have to scan the orders in the range
+CACHE_SIZE: int = 32
+
+
+class BadRequest(ValueError):
+    """ raised for invalid query parameters, answered with status 400 """
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime.date]:
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value[:10])
+    except ValueError:
+        raise BadRequest(f'invalid date {value}, expected YYYY-MM-DD')
+
+
+def parse_int(value: Optional[str], default: int, minimum: int = 0) -> int:
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f'invalid number {value}')
+    if number < minimum:
+        raise BadRequest(f'{number} is smaller than {minimum}')
+    return number
+
+
+def parse_choice(value: Optional[str], choices: List[str]) -> str:
+    if value is None:
+        return choices[0]
+    if value not in choices:
+        raise BadRequest(f'invalid value {value}, expected one of {", ".join(choices)}')
+    return value
+
+
+def parse_classes(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """ comma separated order classes, None (all classes) if not given """
+    return tuple(sorted(tag.strip() for tag in value.split(','))) if value else None
+
+
+def create_blueprint(live: LiveEvaluation) -> flask.Blueprint:
+    """
+    Query parameters shared by all endpoints: start and end (YYYY-MM-DD, both inclusive). The ETag of a response is
+    derived from the version of the loaded orders and the request, so polling clients sending If-None-Match get an
+    empty 304 answer until new orders arrive
+    """
+    blueprint = flask.Blueprint('api', __name__, url_prefix=URL_PREFIX)
+    aggregates = RangeAggregates(live)
+
+    def endpoint(rule: str) -> Callable[[Callable[[], Any]], Callable[[], flask.Response]]:
+        def decorator(build: Callable[[], Any]) -> Callable[[], flask.Response]:
+            @functools.wraps(build)
+            def respond() -> flask.Response:
+                etag = hashlib.sha1(f'{live.data_version()}|{flask.request.full_path}'.encode()).hexdigest()
+                if etag in flask.request.if_none_match:
+                    return conditional_response(flask.Response(status=304), etag)
+                try:
+                    return conditional_response(json_response(build()), etag)
+                except BadRequest as error:
+                    return json_response({'error': str(error)}, 400)
+
+            blueprint.add_url_rule(rule, view_func=respond)
+            return respond
+        return decorator
+
+    @endpoint('/yearly')
+    def yearly() -> Any:
+        """
+        totals per year
+        :param group: 'class' (default) for totals per order class and year, 'total' for the sum of the classes
+        :param classes: comma separated order classes to include, all if not given
+        """
+        start, end = date_range()
+        group = parse_choice(flask.request.args.get('group'), ['class', 'total'])
+        with live.lock:
+            totals = live.filtered.cube.yearly_totals_by_class(start, end,
+                                                               parse_classes(flask.request.args.get('classes')))
+        if group == 'class':
+            return totals
+        summed: Dict[int, float] = dict()
+        for class_totals in totals.values():
+            for year, total in class_totals.items():
+                summed[year] = summed.get(year, 0.0) + total
+        return {year: round(total, 2) for year, total in sorted(summed.items())}
+
+    @endpoint('/monthly')
+    def monthly() -> Any:
+        """
+        totals per period, periods without orders included as 0
+        :param group: 'month' (default), 'week' or 'day'
+        :param classes: comma separated order classes to include, all if not given
+        """
+        start, end = date_range()
+        frequency = Frequency(parse_choice(flask.request.args.get('group'), ['month', 'week', 'day']))
+        with live.lock:
+            cube = live.filtered.cube
+            totals = cube.totals(frequency, start, end, parse_classes(flask.request.args.get('classes')))
+            series = TimeSeries.from_totals(totals, frequency, start or cube.first_date, end or cube.last_date)
+        return {period.isoformat(): total for period, total in series.rounded().to_dict().items()}
+
+    @endpoint('/categories')
+    def categories() -> Any:
+        """
+        totals of the categories on one level of the hierarchy, sorted descending
+        :param group: the depth of the categories, 1 (default) for the top level categories
+        :param path: only categories below this path, e.g. 'Bücher / Fachbücher'
+        """
+        start, end = date_range()
+        depth = parse_int(flask.request.args.get('group'), 1, minimum=1)
+        path = flask.request.args.get('path')
+        trie = aggregates.category_trie(start, end)
+        if path:
+            parent = trie.get(tuple(path.split(PATH_SEPARATOR)))
+            if parent is None:
+                raise BadRequest(f'unknown category {path}')
+            nodes = [node for node in parent.walk() if node.depth == parent.depth + depth]
+        else:
+            nodes = trie.level(depth)
+        nodes = sorted(nodes, key=lambda node: node.subtotal, reverse=True)
+        return [{'category': PATH_SEPARATOR.join(node.path), 'total': round(node.subtotal, 2),
+                 'orders': node.order_count, 'items': node.item_count} for node in nodes]
+
+    @endpoint('/top')
+    def top() -> Any:
+        """
+        the top-K orders, items or sellers
+        :param group: 'orders' (most expensive, default), 'largest-orders' (most items), 'items' or 'sellers'
+        :param count: the number of entries, at most the size of the ranking (20)
+        """
+        start, end = date_range()
+        group = parse_choice(flask.request.args.get('group'), ['orders', 'largest-orders', 'items', 'sellers'])
+        ranking = aggregates.ranking(start, end)
+        count = parse_int(flask.request.args.get('count'), ranking.k, minimum=1)
+        if group == 'orders':
+            return [order_summary(order) for order in ranking.most_expensive_orders.largest(count)]
+        if group == 'largest-orders':
+            return [order_summary(order) for order in ranking.largest_orders.largest(count)]
+        if group == 'items':
+            return [{'title': item.title, 'price': item.price, 'seller': item.seller, 'link': item.link,
+                     'tag': item.tag, 'order_id': order.order_id, 'date': order.date.isoformat()}
+                    for item, order in ranking.most_expensive_items.largest(count)]
+        return [{'seller': seller, 'total': round(total, 2)} for seller, total in ranking.top_sellers(count)]
+
+    return blueprint
+
+
+def date_range() -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+    start, end = parse_date(flask.request.args.get('start')), parse_date(flask.request.args.get('end'))
+    if start and end and start > end:
+        raise BadRequest('start is after end')
+    return start, end
+
+
+def order_summary(order: Order) -> Dict[str, Any]:
+    return {'order_id': order.order_id, 'date': order.date.isoformat(), 'price': order.price,
+            'items': len(order.items)}
+
+
+def json_response(data: Any, status: int = 200) -> flask.Response:
+    """ serializes data, gzip compressed if the client accepts it """
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode()
+    response = flask.Response(status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= MINIMUM_COMPRESS_SIZE and 'gzip' in flask.request.accept_encodings:
+        body = gzip.compress(body, compresslevel=6)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.set_data(body)
+    return response
+
+
+def conditional_response(response: flask.Response, etag: str) -> flask.Response:
+    response.set_etag(etag)
+    # clients have to revalidate, the answer changes as soon as new orders are loaded
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+class RangeAggregates:
+    """
+    category trie and ranking for a date range. Without a range the aggregates of the evaluation are used, ranges
+    are aggregated from the orders in the range and memoized by data version and range
+    """
+
+    def __init__(self, live: LiveEvaluation) -> None:
+        self.live = live
+        self._category_trie = functools.lru_cache(maxsize=CACHE_SIZE)(self._build_category_trie)
+        self._ranking = functools.lru_cache(maxsize=CACHE_SIZE)(self._build_ranking)
+
+    def category_trie(self, start: Optional[datetime.date], end: Optional[datetime.date]) -> CategoryTrie:
+        with self.live.lock:
+            return self._category_trie(self.live.data_version(), start, end)
+
+    def ranking(self, start: Optional[datetime.date], end: Optional[datetime.date]) -> OrderRanking:
+        with self.live.lock:
+            return self._ranking(self.live.data_version(), start, end)
+
+    def _build_category_trie(self, _: str, start: Optional[datetime.date],
+                             end: Optional[datetime.date]) -> CategoryTrie:
+        evaluated = self.live.evaluation()
+        if start is None and end is None:
+            return evaluated.category_trie()
+        return CategoryTrie.from_orders(orders_in_range(evaluated, start, end))
+
+    def _build_ranking(self, _: str, start: Optional[datetime.date], end: Optional[datetime.date]) -> OrderRanking:
+        evaluated = self.live.evaluation()
+        if start is None and end is None:
+            return evaluated.ranking()
+        return OrderRanking.from_orders(orders_in_range(evaluated, start, end))
+
+
+def orders_in_range(evaluated: Evaluation, start: Optional[datetime.date], end: Optional[datetime.date]) -> List[Order]:
+    return [order for order in evaluated.orders
+            if (start is None or order.date >= start) and (end is None or order.date <= end)]
@@ -0,0 +1,222 @@
+"""
+scrapes many accounts with a bounded number of browsers at once, each account into its own orders file
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from termcolor import colored
+
+from scraping.CustomExceptions import LoginError, PasswordFileNotFound, ScrapeCancelled
+from . import file_handler
+from .progress import ProgressTracker
+from .throttle import MAX_RATE, AdaptiveThrottle, TokenBucket
+
+ACCOUNTS_FILE_NAME: str = 'accounts.json'
+
+# directory (relative to the project root) containing the orders file of every account without an explicit file
+ORDERS_DIRECTORY: str = 'accounts'
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class Account:
+    """ an entry of the accounts file, only email is required """
+    email: str
+    password: Optional[str] = None
+    file_name: Optional[str] = None
+    start: int = 2010
+    end: Optional[int] = None
+    extensive: bool = True
+
+    @property
+    def orders_file(self) -> str:
+        """ the orders file of the account relative to the project root, e.g. accounts/max_example.com.json """
+        return self.file_name or os.path.join(ORDERS_DIRECTORY, re.sub(r'[^\w.-]', '_', self.email) + '.json')
+
+    @staticmethod
+    def from_dict(account_dict: Dict) -> Account:
+        return Account(account_dict['email'], account_dict.get('password'), account_dict.get('file_name'),
+                       int(account_dict.get('start', 2010)),
+                       int(account_dict['end']) if account_dict.get('end') is not None else None,
+                       bool(account_dict.get('extensive', True)))
+
+
+@dataclass
+class AccountResult:
+    """ the outcome of all attempts to scrape an account """
+    account: Account
+    attempts: int = 0
+    orders: int = 0  # orders scraped by the successful attempt
+    items: int = 0
+    pages: int = 0
+    seconds: float = 0.0  # of all attempts, without the waiting in between
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+    @property
+    def orders_per_minute(self) -> float:
+        return self.orders / self.seconds * 60 if self.seconds else 0.0
+
+
+def load_accounts(file_name: str = ACCOUNTS_FILE_NAME) -> List[Account]:
+    """
+    reads a json list of accounts, e.g. [{"email": "max@example.com", "password": "...", "start": 2015}]
+    accounts without password use the pw.txt
+    """
+    return [Account.from_dict(account_dict) for account_dict in file_handler.read_json_file(file_name)]
+
+
+class BatchScraper:
+    """
+    Runs the scrapes of all accounts in a pool of `workers` threads, each driving one browser, so at most `workers`
+    browsers are open at once. A failed scrape is retried after an exponential backoff with jitter, the backoff only
+    blocks the worker of that account. Wrong credentials are not retried
+    """
+
+    def __init__(self, accounts: List[Account], workers: int = 2, retries: int = 2, backoff: float = 30.0,
+                 headless: bool = True, enrich_workers: int = 0, base_url: Optional[str] = None,
+                 max_rate: float = MAX_RATE) -> None:
+        """
+        :param retries: attempts per account after the first one
+        :param backoff: seconds to wait before the first retry, doubled for every further retry
+        :param enrich_workers: additional browsers per account reading categories and prices, so up to
+        workers * (1 + enrich_workers) browsers are open at once
+        :param base_url: the shop to scrape, e.g. the url of a local mock server, amazon.de if None
+        :param max_rate: pages per second at most, of all accounts together
+        """
+        self.accounts = accounts
+        self.workers = max(workers, 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.headless = headless
+        self.enrich_workers = enrich_workers
+        self.base_url = base_url
+        # all scrapes come from the same machine, together they never load more than max_rate pages per second
+        self.bucket = TokenBucket(max_rate)
+        # below that every account adapts its own rate and concurrency, kept across its attempts. A single throttle
+        # would start the whole pool with one page at a time and slow every account down for one getting throttled
+        self.throttles: Dict[str, AdaptiveThrottle] = {
+            account.email: AdaptiveThrottle(max_rate=max_rate, max_concurrency=1 + max(enrich_workers, 0),
+                                            shared=self.bucket)
+            for account in accounts}
+        self.cancel_event = threading.Event()
+
+    def run(self) -> List[AccountResult]:
+        """ :returns the results in the order of the accounts """
+        for account in self.accounts:
+            os.makedirs(os.path.dirname(file_handler.to_file_path(account.orders_file)), exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as executor:
+            futures = [executor.submit(self._scrape_account, account) for account in self.accounts]
+            try:
+                return [future.result() for future in futures]
+            except KeyboardInterrupt:
+                # running scrapes stop after their current order, pending ones do not start
+                self.cancel_event.set()
+                raise
+
+    def _scrape_account(self, account: Account) -> AccountResult:
+        result = AccountResult(account)
+        for attempt in range(self.retries + 1):
+            if self.cancel_event.is_set():
+                result.error = 'cancelled'
+                break
+            result.attempts = attempt + 1
+            started = time.monotonic()
+            try:
+                progress = self._scrape(account)
+                result.seconds += time.monotonic() - started
+                result.orders, result.items, result.pages = progress.orders, progress.items, progress.pages
+                result.error = None
+                LOGGER.info(colored(f'{account.email}: {result.orders} orders scraped', 'blue'))
+                break
+            except (LoginError, PasswordFileNotFound, AssertionError) as error:
+                # retrying can't fix wrong credentials or arguments, but might lock the account
+                result.seconds += time.monotonic() - started
+                result.error = f'{type(error).__name__} {error}'.strip()
+                break
+            except ScrapeCancelled:
+                result.seconds += time.monotonic() - started
+                result.error = 'cancelled'
+                break
+            except Exception as error:  # pylint: disable=W0703
+                # e.g. a crashed browser or a timeout, another attempt may well succeed
+                result.seconds += time.monotonic() - started
+                result.error = repr(error)
+                LOGGER.warning(colored(f'{account.email}: attempt {attempt + 1} failed: {error!r}', 'yellow'))
+                if attempt < self.retries:
+                    delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                    LOGGER.info(colored(f'{account.email}: retrying in {delay:.0f}s', 'blue'))
+                    self.cancel_event.wait(delay)
+        return result
+
+    def _scrape(self, account: Account) -> ProgressTracker:
+        # pylint: disable=C0415
+        from .scraper import BASE_URL, Scraper
+
+        end = account.end if account.end is not None else datetime.datetime.now().year
+        scraper = Scraper(account.email, account.password, self.headless, account.start, end, account.extensive,
+                          cancel_event=self.cancel_event, file_name=account.orders_file,
+                          enrich_workers=self.enrich_workers, throttle=self.throttles[account.email],
+                          base_url=self.base_url or BASE_URL)
+        return scraper.progress
+
+    def metrics(self) -> Dict[str, float]:
+        """ the page loads, throttled loads and back offs of all accounts and the sum of their final limits """
+        totals: Dict[str, float] = {'requests': 0, 'throttled': 0, 'decreases': 0, 'rate': 0.0}
+        for throttle in self.throttles.values():
+            metrics = throttle.metrics()
+            for name in totals:
+                totals[name] += metrics[name]
+        return totals
+
+
+def print_summary(results: List[AccountResult]) -> None:
+    print(f'{"account":<40}{"result":<10}{"attempts":>9}{"orders":>8}{"items":>8}{"pages":>8}{"minutes":>9}'
+          f'{"orders/min":>11}')
+    for result in results:
+        print(colored(f'{result.account.email:<40}{"ok" if result.succeeded else "failed":<10}{result.attempts:>9}'
+                      f'{result.orders:>8}{result.items:>8}{result.pages:>8}{result.seconds / 60:>9.1f}'
+                      f'{result.orders_per_minute:>11.1f}', 'green' if result.succeeded else 'red'))
+        if not result.succeeded:
+            print(colored(f'    {result.error}', 'red'))
+
+    succeeded = [result for result in results if result.succeeded]
+    seconds = sum(result.seconds for result in succeeded)
+    orders = sum(result.orders for result in succeeded)
+    print(f'\n{len(succeeded)}/{len(results)} accounts scraped, {orders} orders'
+          f'{f" at {orders / seconds * 60:.1f} orders/min per browser" if seconds else ""}')
+
+
+def main(accounts_file: str = ACCOUNTS_FILE_NAME, workers: int = 2, retries: int = 2, backoff: float = 30.0,
+         headless: bool = True, enrich_workers: int = 0, base_url: Optional[str] = None,
+         max_rate: float = MAX_RATE) -> bool:
+    """ :returns True if all accounts were scraped """
+    accounts = load_accounts(accounts_file)
+    if not accounts:
+        print(colored(f'No accounts found in {accounts_file}', 'red'))
+        return False
+    print(f'Scraping {len(accounts)} accounts with at most {workers} browsers at once')
+    batch_scraper = BatchScraper(accounts, workers, retries, backoff, headless, enrich_workers, base_url, max_rate)
+    results = batch_scraper.run()
+    print_summary(results)
+    metrics = batch_scraper.metrics()
+    print(f'{metrics["requests"]:.0f} pages loaded, {metrics["throttled"]:.0f} of them throttled, '
+          f'backed off {metrics["decreases"]:.0f} times, final limits {metrics["rate"]:.2f} pages/s in total '
+          f'(at most {batch_scraper.bucket.rate:.2f})')
+    return all(result.succeeded for result in results)
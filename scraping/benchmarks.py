@@ -0,0 +1,369 @@
+"""
+benchmarks for loading, evaluating and visualizing synthetic order histories of increasing size
+"""
+import datetime
+import gc
+import inspect
+import json
+import operator
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from termcolor import colored
+
+from . import file_handler
+from . import synthetic
+from .classification import Classifier, DEFAULT_RULES
+from .data import Order
+from .evaluation import Evaluation
+from .timeseries import Frequency
+
+DEFAULT_SIZES: List[int] = [1_000, 10_000, 100_000, 1_000_000]
+
+# maximum import time in seconds of the modules loaded by the entry points: scraping.__main__ for every command
+# (e.g. --help), scraping.scraper for scrape, scraping.cli for cli and scraping.dash_app for dash
+IMPORT_TIME_THRESHOLDS: Dict[str, float] = {
+    'scraping.__main__': 0.2,
+    'scraping.cli': 0.2,
+    'scraping.scraper': 1.0,
+    'scraping.dash_app': 3.0,
+}
+
+
+@dataclass
+class Measurement:
+    """ the result of one benchmarked function for one history size """
+    size: int
+    name: str
+    seconds: float
+    peak_memory: Optional[int]  # in bytes, None if not measured
+
+    @property
+    def microseconds_per_order(self) -> float:
+        return self.seconds / self.size * 1_000_000 if self.size else 0.0
+
+
+def measure(size: int, name: str, function: Callable[[Any], Any], setup: Callable[[], Any],
+            trace_memory: bool) -> Measurement:
+    """
+    times function(setup()), only the function call itself is measured. If trace_memory is set the function is run a
+    second time with tracemalloc, since tracing slows down the timed run considerably
+    """
+    argument = setup()
+    start = time.perf_counter()
+    function(argument)
+    seconds = time.perf_counter() - start
+
+    peak_memory: Optional[int] = None
+    if trace_memory:
+        argument = setup()
+        tracemalloc.start()
+        try:
+            function(argument)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return Measurement(size, name, seconds, peak_memory)
+
+
+def evaluation_methods() -> List[str]:
+    """ :returns the names of all public Evaluation methods callable without arguments """
+    names = []
+    for name, function in inspect.getmembers(Evaluation, inspect.isfunction):
+        if name.startswith('_'):
+            continue
+        parameters = [parameter for parameter in inspect.signature(function).parameters.values()
+                      if parameter.name != 'self']
+        if all(parameter.default is not inspect.Parameter.empty for parameter in parameters):
+            names.append(name)
+    return names
+
+
+def benchmark_size(size: int, seed: int, trace_memory: bool) -> List[Measurement]:
+    """ runs all benchmarks for a synthetic history with `size` orders """
+    # pylint: disable=C0415
+    from . import dash_app
+
+    measurements: List[Measurement] = []
+    classifier = Classifier(DEFAULT_RULES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'orders.json')
+        file_handler.save_orders(synthetic.generate_orders(size, seed), path)
+
+        measurements.append(measure(size, 'load_orders', file_handler.load_orders, lambda: path, trace_memory))
+        orders: List[Order] = file_handler.load_orders(path)
+        # the scraper tags orders before saving them, the synthetic ones are tagged here once
+        classifier.tag_orders(orders)
+
+    new_evaluation: Callable[[], Evaluation] = lambda: Evaluation(orders, classifier)
+    measurements.append(measure(size, 'Evaluation()', lambda _: new_evaluation(), lambda: None, trace_memory))
+
+    for name in evaluation_methods():
+        measurements.append(measure(size, f'Evaluation.{name}', operator.methodcaller(name), new_evaluation,
+                                    trace_memory))
+
+    figure_builders = [dash_app.general_information, dash_app.gen_stacked_totals_graph,
+                       dash_app.gen_scatter_by_month_graph, dash_app.gen_one_bar_graph,
+                       dash_app.gen_category_sunburst_graph]
+    for builder in figure_builders:
+        measurements.append(measure(size, f'dash_app.{builder.__name__}', builder, new_evaluation, trace_memory))
+
+    def new_filtered_figures() -> Any:
+        evaluated = new_evaluation()
+        return dash_app.FilteredFigures(evaluated.monthly_cube()), tuple(sorted(dash_app.all_classes(evaluated)))
+
+    # a cold (not memoized) answer to a dashboard filter interaction, selecting the middle half of the history
+    first = min(order.date for order in orders)
+    last = max(order.date for order in orders)
+    quarter = (last - first) / 4
+    measurements.append(measure(
+        size, 'dash_app.FilteredFigures.figures',
+        lambda filtered: filtered[0].figures(first + quarter, last - quarter, filtered[1]),
+        new_filtered_figures, trace_memory))
+    measurements.append(measure(
+        size, 'dash_app.FilteredFigures.scatter_figure (daily)',
+        lambda filtered: filtered[0].scatter_figure(first, last, filtered[1], Frequency.DAY),
+        new_filtered_figures, trace_memory))
+
+    return measurements
+
+
+def retained_memory(size: int, seed: int = 0) -> Dict[str, float]:
+    """
+    loads a synthetic history of `size` orders and measures the memory the loaded orders keep once the decoded json is
+    freed, which is what the dashboard and the scraper hold for as long as they run
+    :returns the retained bytes in total, per order and per item and the seconds the load took
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'orders.json')
+        file_handler.save_orders(synthetic.generate_orders(size, seed), path)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            orders: List[Order] = file_handler.load_orders(path)
+            seconds = time.perf_counter() - start
+            gc.collect()
+            retained, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    items = sum(len(order.items) for order in orders)
+    return {'orders': size, 'items': items, 'bytes': retained, 'bytes_per_order': round(retained / size, 1),
+            'bytes_per_item': round(retained / items, 1), 'seconds': round(seconds, 3)}
+
+
+def print_retained_memory(sizes: List[int], seed: int = 0) -> None:
+    """ prints the memory retained by loaded histories of every size as table """
+    print(f'{"orders":>10}{"items":>10}{"MB":>10}{"B/order":>10}{"B/item":>10}{"seconds":>10}')
+    for size in sizes:
+        result = retained_memory(size, seed)
+        print(f'{size:>10}{result["items"]:>10}{result["bytes"] / 1024 / 1024:>10.1f}{result["bytes_per_order"]:>10.0f}'
+              f'{result["bytes_per_item"]:>10.0f}{result["seconds"]:>10.3f}')
+
+
+def serialization_benchmark(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    writes and reads a synthetic history of `size` orders in every way, the first one is how orders were saved before
+    the streaming writers
+    :returns per way the seconds and peak memory of writing, the file size and the seconds of reading
+    """
+    # pylint: disable=C0415
+    from . import serialization
+
+    orders = synthetic.generate_orders(size, seed)
+
+    def dumps(path: str) -> None:
+        with open(path, 'w') as file:
+            file.write(json.dumps([order.to_dict() for order in orders]))
+
+    def load(path: str) -> None:
+        with open(path) as file:
+            [Order.from_dict(order_dict) for order_dict in json.load(file)]  # pylint: disable=W0106
+
+    ways: List[Tuple[str, Callable[[str], Any], Callable[[str], Any]]] = [
+        ('json.dumps(to_dict)', dumps, load),
+        ('json stream', lambda path: serialization.write_orders(path, orders, binary=False),
+         serialization.read_orders),
+        ('binary stream', lambda path: serialization.write_orders(path, orders, binary=True),
+         serialization.read_orders),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        # every way overwrites the file of the previous one
+        path = os.path.join(directory, 'orders')
+        for name, write, read in ways:
+            written = measure(size, name, write, lambda: path, trace_memory=True)
+            read_measurement = measure(size, name, read, lambda: path, trace_memory=False)
+            results.append({'name': name, 'write_seconds': round(written.seconds, 3),
+                            'write_peak_mb': round((written.peak_memory or 0) / 1024 / 1024, 1),
+                            'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+                            'read_seconds': round(read_measurement.seconds, 3)})
+    return results
+
+
+def print_serialization_benchmark(sizes: List[int], seed: int = 0) -> None:
+    """ prints the serialization benchmark of every size as table """
+    for size in sizes:
+        print(colored(f'\n{size} orders', 'cyan'))
+        print(f'{"format":<22}{"write s":>10}{"write peak MB":>15}{"file MB":>10}{"read s":>10}')
+        for result in serialization_benchmark(size, seed):
+            print(f'{result["name"]:<22}{result["write_seconds"]:>10.3f}{result["write_peak_mb"]:>15.1f}'
+                  f'{result["file_mb"]:>10.1f}{result["read_seconds"]:>10.3f}')
+
+
+def store_benchmark(size: int, seed: int = 0, days: int = 31) -> List[Dict[str, Any]]:
+    """
+    compares reading the orders of `days` days in the middle of a synthetic history of `size` orders from an order
+    store with loading the json file and filtering it
+    :returns per step the seconds, the memory still in use after it, its peak memory and the number of orders it
+    returned
+    """
+    # pylint: disable=C0415
+    from . import order_store
+
+    orders = synthetic.generate_orders(size, seed)
+    start = orders[len(orders) // 2].date
+    end = start + datetime.timedelta(days=days - 1)
+    results: List[Dict[str, Any]] = []
+
+    def run(name: str, function: Callable[[], Any]) -> Any:
+        """ times function, then runs it a second time with tracemalloc, which slows it down considerably """
+        gc.collect()
+        began = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - began
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = function()
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results.append({'name': name, 'seconds': round(seconds, 4), 'retained_mb': round(retained / 1024 / 1024, 2),
+                        'peak_mb': round(peak / 1024 / 1024, 2),
+                        'orders': len(result) if isinstance(result, list) else None})
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'orders.json')
+        store_path = os.path.join(directory, f'orders{order_store.SUFFIX}')
+        file_handler.save_orders(orders, json_path)
+        file_handler.save_orders(orders, store_path)
+        del orders
+
+        run('load_orders (json) + filter',
+            lambda: [order for order in file_handler.load_orders(json_path) if start <= order.date <= end])
+        store = run('OrderStore()', lambda: order_store.OrderStore(store_path))
+        run(f'OrderStore.between ({days} days)', lambda: list(store.between(start, end)))
+        run(f'OrderStore.total ({days} days)', lambda: store.total(start, end))
+        run('OrderStore.get', lambda: store.get(store[size // 3].order_id))
+        run('OrderStore (all orders)', lambda: list(store))
+        store.close()
+    return results
+
+
+def print_store_benchmark(sizes: List[int], seed: int = 0, days: int = 31) -> None:
+    """ prints the store benchmark of every size as table """
+    for size in sizes:
+        print(colored(f'\n{size} orders', 'cyan'))
+        print(f'{"step":<32}{"seconds":>10}{"retained MB":>13}{"peak MB":>10}{"orders":>10}')
+        for result in store_benchmark(size, seed, days):
+            orders = result['orders'] if result['orders'] is not None else '-'
+            print(f'{result["name"]:<32}{result["seconds"]:>10.4f}{result["retained_mb"]:>13.2f}'
+                  f'{result["peak_mb"]:>10.2f}{orders:>10}')
+
+
+def import_time(module: str, repeat: int = 5) -> float:
+    """
+    :returns the cumulative import time of module in seconds as reported by `python -X importtime`, the fastest of
+    `repeat` fresh interpreters, so the modules are never cached in sys.modules and disk caches are warm
+    """
+    fastest = float('inf')
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True,
+                                check=True, cwd=file_handler.to_file_path(''))
+        # lines look like "import time:  self [us] | cumulative | imported package"
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                fastest = min(fastest, int(fields[1]) / 1_000_000)
+    return fastest
+
+
+def check_import_times(repeat: int = 5, thresholds: Optional[Dict[str, float]] = None) -> bool:
+    """ prints the import time of every module with a threshold, :returns False if one exceeds its threshold """
+    passed = True
+    print(f'{"module":<30}{"seconds":>12}{"threshold":>12}')
+    for module, threshold in (thresholds or IMPORT_TIME_THRESHOLDS).items():
+        seconds = import_time(module, repeat)
+        passed = passed and seconds <= threshold
+        print(colored(f'{module:<30}{seconds:>12.3f}{threshold:>12.3f}', 'green' if seconds <= threshold else 'red'))
+    return passed
+
+
+def scrape_benchmark(orders: int = 200, years: int = 2, enrich_workers: int = 2, headless: bool = True,
+                     settings: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    scrapes a local mock server with `orders` synthetic orders over the last `years` years with the real Scraper
+    (needs Firefox and geckodriver)
+    :param settings: a mock_server.MockSettings, e.g. with latency or errors
+    :returns throughput of the scrape, the throttle metrics and the request statistics of the server
+    """
+    # pylint: disable=C0415
+    from .mock_server import MockAmazon, MockServer
+    from .page_cache import PageCache
+    from .scraper import Scraper
+    from .throttle import AdaptiveThrottle
+
+    shop = MockAmazon.generate(orders, years, settings)
+    server = MockServer(shop, port=0).start()
+    # the mock server can take far more than amazon.de, the throttle ramps up quickly
+    throttle = AdaptiveThrottle(rate=20, max_rate=1000, max_concurrency=1 + enrich_workers)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            scraper = Scraper('benchmark@example.com', 'mock', headless, datetime.date.today().year - years + 1,
+                              datetime.date.today().year, True, file_name=os.path.join(directory, 'orders.json'),
+                              enrich_workers=enrich_workers, throttle=throttle, base_url=server.base_url,
+                              pages=PageCache(os.path.join(directory, 'pages')))
+            seconds = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    progress = scraper.progress
+    return {'orders': progress.orders, 'items': progress.items, 'pages': progress.pages,
+            'seconds': round(seconds, 2), 'orders_per_second': round(progress.orders / seconds, 2),
+            'pages_per_second': round(progress.pages / seconds, 2), 'complete': progress.orders == len(shop.orders),
+            'throttle': throttle.metrics(), 'server': shop.statistics.as_dict()}
+
+
+def print_measurements(measurements: List[Measurement]) -> None:
+    """ prints the measurements of one size as table """
+    print(colored(f'\n{measurements[0].size} orders', 'cyan'))
+    print(f'{"benchmark":<50}{"seconds":>12}{"µs/order":>12}{"peak MB":>12}')
+    for measurement in measurements:
+        peak = f'{measurement.peak_memory / 1024 / 1024:.1f}' if measurement.peak_memory is not None else '-'
+        print(f'{measurement.name:<50}{measurement.seconds:>12.4f}{measurement.microseconds_per_order:>12.2f}'
+              f'{peak:>12}')
+
+
+def main(sizes: List[int], seed: int = 0, trace_memory: bool = True, output: Optional[str] = None) -> None:
+    """ benchmarks every size, prints the results and optionally writes them as json to output """
+    results: List[Measurement] = []
+    for size in sizes:
+        measurements = benchmark_size(size, seed, trace_memory)
+        print_measurements(measurements)
+        results.extend(measurements)
+
+    if output:
+        file_handler.save_file(output, json.dumps([asdict(measurement) for measurement in results], indent=2))
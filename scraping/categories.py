@@ -0,0 +1,119 @@
+"""
+Contains a CategoryTrie which aggregates spending for every level of the item category hierarchy at once
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .data import Item, Order
+
+UNCATEGORIZED: str = 'none'
+PATH_SEPARATOR: str = ' / '
+
+
+class CategoryNode:
+    """
+    a category on a specific path in the hierarchy with the aggregated values of all items below it
+    """
+
+    def __init__(self, name: str, path: Tuple[str, ...], parent: Optional[CategoryNode]) -> None:
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children: Dict[str, CategoryNode] = dict()
+        self.subtotal: float = 0.0
+        self.item_count: int = 0
+        self.order_count: int = 0
+        self._ranked_children: Optional[List[CategoryNode]] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.path)
+
+    def top_children(self, count: Optional[int] = None) -> List[CategoryNode]:
+        """
+        :returns the `count` children with the highest subtotal (all if count is None). The ranking is sorted once
+        and reused until the node changes again
+        """
+        if self._ranked_children is None:
+            self._ranked_children = sorted(self.children.values(), key=lambda child: child.subtotal, reverse=True)
+        return self._ranked_children if count is None else self._ranked_children[:count]
+
+    def walk(self) -> Iterable[CategoryNode]:
+        """ yields this node and all nodes below it, parents before their children """
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+
+class CategoryTrie:
+    """
+    prefix tree over the item category paths. Every node holds the subtotal, item and order count of all items in
+    this category or one of its subcategories. Items without category are collected under UNCATEGORIZED
+    """
+
+    def __init__(self) -> None:
+        self.root = CategoryNode('all', (), None)
+        self._nodes: Dict[Tuple[str, ...], CategoryNode] = {(): self.root}
+
+    @staticmethod
+    def from_orders(orders: Iterable[Order]) -> CategoryTrie:
+        """ builds the trie in a single pass over all orders and their items """
+        trie = CategoryTrie()
+        for order in orders:
+            trie.add_order(order)
+        return trie
+
+    def add_order(self, order: Order) -> None:
+        """ adds the items of an order, every node touched by the order counts it once """
+        touched: Dict[Tuple[str, ...], CategoryNode] = dict()
+        for item in order.items:
+            path = item.category_path or (UNCATEGORIZED,)
+            node = self.root
+            self._add_item_to_node(node, item)
+            touched[node.path] = node
+            for name in path:
+                node = self._get_or_create_child(node, name)
+                self._add_item_to_node(node, item)
+                touched[node.path] = node
+
+        for node in touched.values():
+            node.order_count += 1
+            node._ranked_children = None  # pylint: disable=W0212
+
+    @staticmethod
+    def _add_item_to_node(node: CategoryNode, item: Item) -> None:
+        node.subtotal += item.price
+        node.item_count += 1
+
+    def _get_or_create_child(self, node: CategoryNode, name: str) -> CategoryNode:
+        child = node.children.get(name)
+        if child is None:
+            child = CategoryNode(name, node.path + (name,), node)
+            node.children[name] = child
+            self._nodes[child.path] = child
+        return child
+
+    def get(self, path: Tuple[str, ...]) -> Optional[CategoryNode]:
+        """ :returns the node for a category path (prefix) or None if no item was in this category """
+        return self._nodes.get(tuple(path))
+
+    def level(self, depth: int) -> List[CategoryNode]:
+        """ :returns all nodes on the given depth, depth 1 being the top level categories """
+        return [node for path, node in self._nodes.items() if len(path) == depth]
+
+    def to_sunburst(self, max_depth: Optional[int] = None) -> Dict[str, List]:
+        """
+        :returns ids, labels, parents and values of all nodes (except the root) as expected by plotly sunburst and
+        treemap traces with branchvalues='total'
+        """
+        chart: Dict[str, List] = {'ids': [], 'labels': [], 'parents': [], 'values': []}
+        for node in self.root.walk():
+            if node is self.root or (max_depth is not None and node.depth > max_depth):
+                continue
+            assert node.parent is not None
+            chart['ids'].append(PATH_SEPARATOR.join(node.path))
+            chart['labels'].append(node.name)
+            chart['parents'].append(PATH_SEPARATOR.join(node.parent.path))
+            chart['values'].append(node.subtotal)
+        return chart
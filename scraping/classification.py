@@ -0,0 +1,141 @@
+"""
+classifies items (e.g. as audible or prime instant video) through configurable rules. Rules are compiled once and
+every item is tagged in a single pass, the tag is stored with the item so aggregations only read it
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from termcolor import colored
+
+from . import file_handler
+from .data import Item, Order
+
+RULES_FILE_NAME: str = 'rules.json'
+
+AUDIBLE: str = 'audible'
+INSTANT_VIDEO: str = 'prime instant video'
+BALANCE: str = 'balance added'
+UNCATEGORIZED: str = 'uncategorized'
+
+LOGGER = logging.getLogger(__name__)
+
+Check = Callable[[Order, Item], bool]
+
+
+@dataclass
+class Rule:
+    """
+    an item gets the rules tag if all given conditions match:
+    the exact seller, a regex searched in the title, a category path prefix and an order id prefix
+    """
+    tag: str
+    seller: Optional[str] = None
+    title: Optional[str] = None
+    category: Optional[Tuple[str, ...]] = None
+    order_id_prefix: Optional[str] = None
+
+    def is_seller_only(self) -> bool:
+        """ seller only rules are resolved through a dict lookup instead of being evaluated one by one """
+        return self.seller is not None and self.title is None and self.category is None \
+            and self.order_id_prefix is None
+
+    def compile(self) -> Check:
+        """ :returns a function checking all conditions of this rule for an item of an order """
+        checks: List[Check] = []
+        if self.seller is not None:
+            seller = self.seller
+            checks.append(lambda order, item: item.seller == seller)
+        if self.title is not None:
+            title_pattern = re.compile(self.title)
+            checks.append(lambda order, item: title_pattern.search(item.title) is not None)
+        if self.category is not None:
+            prefix = tuple(self.category)
+            checks.append(lambda order, item: item.category_path[:len(prefix)] == prefix)
+        if self.order_id_prefix is not None:
+            order_id_prefix = self.order_id_prefix
+            checks.append(lambda order, item: order.order_id.startswith(order_id_prefix))
+        return lambda order, item: all(check(order, item) for check in checks)
+
+    @staticmethod
+    def from_dict(rule_dict: Dict) -> Rule:
+        """ returns a rule for a rule as dict as found in the rules file """
+        category = rule_dict.get('category')
+        return Rule(rule_dict['tag'], rule_dict.get('seller'), rule_dict.get('title'),
+                    tuple(category) if category is not None else None, rule_dict.get('order_id_prefix'))
+
+
+DEFAULT_RULES: List[Rule] = [
+    Rule(AUDIBLE, seller='Audible GmbH'),
+    Rule(INSTANT_VIDEO, seller='Amazon Instant Video Germany GmbH'),
+    Rule(BALANCE, title='^Amazon-Konto aufladen$'),
+]
+
+
+class Classifier:
+    """
+    applies a list of rules, the first matching rule wins. Items matching no rule are tagged as UNCATEGORIZED
+    """
+
+    def __init__(self, rules: List[Rule]) -> None:
+        self.rules = rules
+        # tags in order of their first rule, an order containing items with different tags gets the first one
+        self.tags: List[str] = list(dict.fromkeys(rule.tag for rule in rules))
+        self._rank: Dict[str, int] = {tag: index for index, tag in enumerate(self.tags)}
+
+        self._rule_index_by_seller: Dict[str, int] = dict()
+        self._checks: List[Tuple[int, Check]] = []
+        for index, rule in enumerate(rules):
+            if rule.is_seller_only():
+                assert rule.seller is not None
+                self._rule_index_by_seller.setdefault(rule.seller, index)
+            else:
+                self._checks.append((index, rule.compile()))
+
+    def classify(self, order: Order, item: Item) -> str:
+        """ :returns the tag of the first rule matching the item """
+        seller_rule_index = self._rule_index_by_seller.get(item.seller, len(self.rules))
+        for index, check in self._checks:
+            if index > seller_rule_index:
+                break
+            if check(order, item):
+                return self.rules[index].tag
+        if seller_rule_index < len(self.rules):
+            return self.rules[seller_rule_index].tag
+        return UNCATEGORIZED
+
+    def tag_orders(self, orders: Iterable[Order], force: bool = False) -> int:
+        """
+        tags all items that have no tag yet
+        :param force: re-tag all items, e.g. after the rules changed
+        :return: the number of tagged items
+        """
+        tagged = 0
+        for order in orders:
+            for item in order.items:
+                if item.tag is None or force:
+                    item.tag = self.classify(order, item)
+                    tagged += 1
+        return tagged
+
+    def order_class(self, order: Order) -> str:
+        """ :returns the highest ranked tag of the orders items based on the cached item tags """
+        best_rank = len(self.tags)
+        for item in order.items:
+            best_rank = min(best_rank, self._rank.get(item.tag or UNCATEGORIZED, best_rank))
+        return self.tags[best_rank] if best_rank < len(self.tags) else UNCATEGORIZED
+
+
+def load_classifier(file_name: str = RULES_FILE_NAME) -> Classifier:
+    """ :returns a classifier for the rules in file_name or for the default rules if there is no rules file """
+    if not os.path.exists(file_handler.to_file_path(file_name)):
+        return Classifier(DEFAULT_RULES)
+
+    rules = [Rule.from_dict(rule_dict) for rule_dict in file_handler.read_json_file(file_name)]
+    LOGGER.info(colored(f"{len(rules)} classification rules loaded from {file_name}", 'blue'))
+    return Classifier(rules)
@@ -5,19 +5,19 @@ defines a CLI for the project
 from __future__ import annotations
 
 import datetime
-import itertools
 import logging
 import os
 import sys
+import threading
 
 from cmd import Cmd
 from termcolor import colored
-from typing import Tuple, List, Dict, Any, Callable
+from typing import Tuple, List, Dict, Any, Optional
 
-from scraping import dash_app, utils
+from scraping import utils
 from scraping.CustomExceptions import LoginError, PasswordFileNotFound, OrdersNotFound
-from scraping.scraper import Scraper
-from scraping.spinner import Spinner
+from scraping.jobs import Job, JobManager, ProgressCallback
+from scraping.progress import format_bar
 from scraping.utils import OptionType, ArgumentType
 
 
@@ -31,7 +31,6 @@ class Cli(Cmd):
         logger = logging.getLogger(__name__)
 
         self.refresh_cli: bool = False
-        self.spinner = itertools.cycle(['-', '/', '|', '\\'])
 
         self.prompt: str = colored("Scraping >> ", 'cyan')
         self.SCRAPING_OPTIONS: List[Tuple[str, OptionType, ArgumentType]] = [
@@ -41,6 +40,7 @@ class Cli(Cmd):
             ('end', OptionType.OPTIONAL, ArgumentType.SINGLE_INT),
             ('headless', OptionType.OPTIONAL, ArgumentType.FLAG),
             ('no-headless', OptionType.OPTIONAL, ArgumentType.FLAG)]
+        self.jobs = JobManager(listener=self._print_job_message)
 
         self.cmdloop()
 
@@ -93,24 +93,93 @@ class Cli(Cmd):
 
     def do_scrape(self, line: str) -> None:
         """
-        defines what happens on scrape command. In this case it tries to run the Scraper
+        defines what happens on scrape command. In this case it starts the Scraper as background job, so the CLI
+        stays usable (e.g. dash shows the last saved orders) until the scrape is done
         :param line: inputline
         """
         args_dict: Dict[str, Any] = self._get_args(line)
         if self._scrape_check_args(args_dict):
-            print("Starting to scrape. This may take a while...\n")
-            try:
-                progress_callback: Callable[[float], None] = lambda progress: self._print_progress_bar(
-                    progress * 100, 100)
-                with Spinner():
-                    self._print_progress_bar(0, 100)
-                    Scraper(email=args_dict['email'], password=args_dict['password'], headless=args_dict['headless'],
-                            start=args_dict['start'], end=args_dict['end'], extensive=True,
-                            progress_observer_callback=progress_callback)
-            except (LoginError, PasswordFileNotFound, AssertionError):
-                pass
+            running = self.jobs.running()
+            if running:
+                # scrapes would overwrite each others orders.json
+                print(colored(f'Job {running[0].job_id} is still scraping, wait for it or cancel it first', 'red'))
+            else:
+                job = self.jobs.submit(f'scrape {args_dict["email"]} {args_dict["start"]}-{args_dict["end"]}',
+                                       lambda cancel_event, progress_callback: self._scrape(args_dict, cancel_event,
+                                                                                           progress_callback))
+                print(f"Started scraping as job {job.job_id}. This may take a while, see 'status {job.job_id}'\n")
+        self.refresh_cli = False
+
+    @staticmethod
+    def _scrape(args_dict: Dict[str, Any], cancel_event: threading.Event, progress_callback: ProgressCallback) -> None:
+        """ runs in the thread of a job """
+        # pylint: disable=C0415
+        from scraping.scraper import Scraper
+
+        try:
+            Scraper(email=args_dict['email'], password=args_dict['password'], headless=args_dict['headless'],
+                    start=args_dict['start'], end=args_dict['end'], extensive=True,
+                    progress_observer_callback=lambda progress: progress_callback(progress.fraction, progress.format()),
+                    cancel_event=cancel_event)
+        except (LoginError, PasswordFileNotFound) as error:
+            raise RuntimeError(f'login failed ({type(error).__name__})') from error
+
+    def _print_job_message(self, job: Job, message: str) -> None:
+        """ prints a message of a background job above the prompt, without touching the input typed so far """
+        print(f'\r{colored(f"[job {job.job_id}] {message}", "blue")}\n{self.prompt}', end='', flush=True)
+
+    def do_jobs(self, _: str) -> None:
+        """ lists all jobs of this session """
+        jobs = self.jobs.jobs()
+        if not jobs:
+            print('No jobs started yet')
+        for job in jobs:
+            print(f'{job.job_id:>4}  {job.state.value:<10} {job.progress * 100:>5.1f}%  '
+                  f'{str(job.duration).split(".")[0]:>8}  {job.description}')
+        self.refresh_cli = False
+
+    @staticmethod
+    def help_jobs() -> None:
+        print('Lists the background jobs (e.g. scrapes) with their state and progress')
+
+    def do_status(self, line: str) -> None:
+        """ shows the state and progress of one job """
+        job = self._get_job(line)
+        if job is not None:
+            print(f'Job {job.job_id}: {job.description}\n'
+                  f'{job.state.value}, {"running for" if job.is_running else "took"} {str(job.duration).split(".")[0]}'
+                  f'{f" ({job.error})" if job.error else ""}')
+            print(f'|{format_bar(job.progress, 60)}| {job.detail or f"{job.progress * 100:.1f}%"}')
         self.refresh_cli = False
 
+    @staticmethod
+    def help_status() -> None:
+        print('status <job id>: shows state and progress of a background job')
+
+    def do_cancel(self, line: str) -> None:
+        """ cancels a running job """
+        job = self._get_job(line)
+        if job is not None:
+            if self.jobs.cancel(job.job_id):
+                print(f'Cancelling job {job.job_id}, the orders saved before stay unchanged')
+            else:
+                print(colored(f'Job {job.job_id} is not running ({job.state.value})', 'red'))
+        self.refresh_cli = False
+
+    @staticmethod
+    def help_cancel() -> None:
+        print('cancel <job id>: stops a running background job, a cancelled scrape saves nothing')
+
+    def _get_job(self, line: str) -> Optional[Job]:
+        """ :returns the job with the id given in line, None (after printing why) if there is none """
+        if not utils.is_int_parsable(line.strip()):
+            print(colored('Expected a job id, see jobs for all jobs', 'red'))
+            return None
+        job = self.jobs.get(int(line.strip()))
+        if job is None:
+            print(colored(f'There is no job {line.strip()}', 'red'))
+        return job
+
     def complete_scrape(self, text: str, line: str, begidx: int, endidx: int) -> List[str]:
         """
         for auto completion inside the scrape command
@@ -142,6 +211,9 @@ class Cli(Cmd):
         executes the dash command
         :param line: command input line
         """
+        # pylint: disable=C0415
+        from scraping import dash_app
+
         args_dict: Dict[str, Any] = self._get_args(line)
         if self._are_all_rec_args_accepted(received_args=args_dict, accepted_args=[]) \
                 and self._check_args_value_count(received_args=args_dict, accepted_args=[]):
@@ -158,13 +230,17 @@ class Cli(Cmd):
         """
         print("Evaluates the orders.json (which is created by scrape) and displays it in the browser")
 
-    @staticmethod
-    def do_exit(*_) -> bool:
+    def do_exit(self, *_) -> bool:
         """
-        exits the CLI on exit command
+        exits the CLI on exit command, running jobs get cancelled first
         :param _: is ignored
         :return: True
         """
+        for job in self.jobs.running():
+            self.jobs.cancel(job.job_id)
+            print(f'Waiting for job {job.job_id} to stop...')
+            if job.thread is not None:
+                job.thread.join()
         return True
 
     def _scrape_check_args(self, args: Dict[str, Any]) -> bool:
@@ -307,28 +383,6 @@ class Cli(Cmd):
 
         return args_dict
 
-    @staticmethod
-    def _print_progress_bar(iteration: float, total: int, prefix: str = '', suffix: str = '', decimals: int = 1,
-                            length: int = 90, fill: str = '█'):
-        """
-        Call in a loop to create terminal progress bar
-        @params:
-            iteration   - Required  : current iteration (Int)
-            total       - Required  : total iterations (Int)
-            prefix      - Optional  : prefix string (Str)
-            suffix      - Optional  : suffix string (Str)
-            decimals    - Optional  : positive number of decimals in percent complete (Int)
-            length      - Optional  : character length of bar (Int)
-            fill        - Optional  : bar fill character (Str)
-        """
-        percent = ("{0:." + str(decimals) + "f}").format(round(100 * (iteration / float(total)), decimals))
-        filled_length = int(length * iteration // total)
-        bar = fill * filled_length + '-' * (length - filled_length)
-        print('\r%s |%s| %s%% %s' % (prefix, bar, percent, suffix), end='\r')
-        # Print New Line on Complete
-        if int(iteration) == total:
-            print('\n\n')
-
     def cmdloop(self, intro=None) -> None:
         """Repeatedly issue a prompt, accept input, parse an initial prefix
         off the received input, and dispatch to action methods, passing them
@@ -0,0 +1,135 @@
+"""
+Contains a MonthlyCube which pre-aggregates orders by month and order class, so filtered views never rescan orders
+"""
+from __future__ import annotations
+
+import bisect
+import datetime
+from dataclasses import dataclass
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .classification import Classifier
+from .data import Order
+from .timeseries import Frequency, period_start
+
+
+@dataclass
+class CubeCell:
+    """ aggregated values of all orders of one class in one month """
+    total: float = 0.0
+    order_count: int = 0
+    item_count: int = 0
+
+    def add(self, cell: CubeCell) -> None:
+        self.total += cell.total
+        self.order_count += cell.order_count
+        self.item_count += cell.item_count
+
+
+class MonthlyCube:
+    """
+    orders aggregated by (month, order class). Queries by date range and classes only touch the cells of the
+    requested months, i.e. O(months * classes) independent of the number of orders. Additionally the totals are kept
+    per (day, order class) for graphs with a daily or weekly resolution
+    """
+
+    def __init__(self) -> None:
+        self._cells: Dict[datetime.date, Dict[str, CubeCell]] = dict()
+        self._months: List[datetime.date] = []
+        self._daily_totals: Dict[datetime.date, Dict[str, float]] = dict()
+        self._days: List[datetime.date] = []
+        # increases with every added order, e.g. to invalidate caches built on the cube
+        self.version: int = 0
+
+    @staticmethod
+    def from_orders(orders: Iterable[Order], classifier: Classifier) -> MonthlyCube:
+        cube = MonthlyCube()
+        for order in orders:
+            cube.add(order, classifier.order_class(order))
+        return cube
+
+    @property
+    def months(self) -> List[datetime.date]:
+        """ the first day of every month containing orders, sorted """
+        return self._months
+
+    @property
+    def first_date(self) -> Optional[datetime.date]:
+        return self._months[0] if self._months else None
+
+    @property
+    def last_date(self) -> Optional[datetime.date]:
+        """ the last day of the newest month containing orders """
+        if not self._months:
+            return None
+        month = self._months[-1]
+        next_month = datetime.date(year=month.year + month.month // 12, month=month.month % 12 + 1, day=1)
+        return next_month - datetime.timedelta(days=1)
+
+    def add(self, order: Order, tag: str) -> None:
+        month = period_start(order.date, Frequency.MONTH)
+        if month not in self._cells:
+            self._cells[month] = dict()
+            bisect.insort(self._months, month)
+        cell = self._cells[month].setdefault(tag, CubeCell())
+        cell.add(CubeCell(order.price, 1, len(order.items)))
+
+        if order.date not in self._daily_totals:
+            self._daily_totals[order.date] = dict()
+            bisect.insort(self._days, order.date)
+        daily_totals = self._daily_totals[order.date]
+        daily_totals[tag] = daily_totals.get(tag, 0.0) + order.price
+        self.version += 1
+
+    def cells(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+              tags: Optional[Collection[str]] = None) -> Iterator[Tuple[datetime.date, str, CubeCell]]:
+        """
+        yields month, class and cell of all months overlapping start to end (both inclusive)
+        :param tags: only yield these classes, all if None
+        """
+        first = bisect.bisect_left(self._months, period_start(start, Frequency.MONTH)) if start else 0
+        last = bisect.bisect_right(self._months, end) if end else len(self._months)
+        for month in self._months[first:last]:
+            for tag, cell in self._cells[month].items():
+                if tags is None or tag in tags:
+                    yield month, tag, cell
+
+    def monthly_totals(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                       tags: Optional[Collection[str]] = None) -> Dict[datetime.date, float]:
+        totals: Dict[datetime.date, float] = dict()
+        for month, _, cell in self.cells(start, end, tags):
+            totals[month] = totals.get(month, 0.0) + cell.total
+        return totals
+
+    def totals(self, frequency: Frequency, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+               tags: Optional[Collection[str]] = None) -> Dict[datetime.date, float]:
+        """ :returns the totals keyed by the start of each period containing orders in start to end """
+        if frequency == Frequency.MONTH:
+            return self.monthly_totals(start, end, tags)
+
+        first = bisect.bisect_left(self._days, start) if start else 0
+        last = bisect.bisect_right(self._days, end) if end else len(self._days)
+        totals: Dict[datetime.date, float] = dict()
+        for day in self._days[first:last]:
+            period = period_start(day, frequency)
+            for tag, total in self._daily_totals[day].items():
+                if tags is None or tag in tags:
+                    totals[period] = totals.get(period, 0.0) + total
+        return totals
+
+    def yearly_totals_by_class(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                               tags: Optional[Collection[str]] = None) -> Dict[str, Dict[int, float]]:
+        totals: Dict[str, Dict[int, float]] = dict()
+        for month, tag, cell in self.cells(start, end, tags):
+            class_totals = totals.setdefault(tag, dict())
+            class_totals[month.year] = class_totals.get(month.year, 0.0) + cell.total
+        return {tag: {year: round(total, 2) for year, total in class_totals.items()}
+                for tag, class_totals in totals.items()}
+
+    def summary(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+                tags: Optional[Collection[str]] = None) -> CubeCell:
+        """ :returns the sum of all cells in the range """
+        summary = CubeCell()
+        for _, _, cell in self.cells(start, end, tags):
+            summary.add(cell)
+        return summary
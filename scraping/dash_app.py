@@ -2,24 +2,42 @@
 # pylint: disable=C0111
 # pylint: disable=C0330
 
+import bisect
 import copy
+import datetime
+import functools
+import json
 import logging
+import os
+import threading
 import time
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
 from multiprocessing import Process
 
 import dash
+import flask
 import dash_core_components as dcc
 import dash_html_components as html
 import plotly.graph_objs as go
 from dash import Dash
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 from termcolor import colored
 
 from scraping import utils
 from scraping.CustomExceptions import OrdersNotFound
 from scraping.evaluation import Evaluation
+from . import api
+from . import classification
 from . import evaluation
 from . import file_handler as fh
+from .classification import Classifier
+from .cube import MonthlyCube
+from .data import Order
+from .downsampling import lttb
+from .figure_cache import FigureCache, file_signature, from_plotly_json
+from .timeseries import Frequency, TimeSeries
+from .watcher import FileWatcher
 
 LAYOUT = dict(
     autosize=True,
@@ -30,52 +48,263 @@ LAYOUT = dict(
     legend=dict(font=dict(size=10), orientation="h"),
 )
 
+# number of memoized filter results
+CACHE_SIZE: int = 128
+
+# points per line if the width of the graph is not known
+MAX_POINTS: int = 1000
+
+# trend window (number of periods) for each resolution of the time series graph, about half a year
+TREND_WINDOWS: Dict[Frequency, int] = {Frequency.MONTH: 6, Frequency.WEEK: 26, Frequency.DAY: 182}
+
+# milliseconds between two checks of connected browsers for new orders
+REFRESH_INTERVAL: int = 3000
+
 LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
-def main() -> None:
+def main(webgl: bool = False) -> None:
+    """
+    :param webgl: render the time series graph through WebGL (Scattergl), which stays fast with many points
+    """
+    app, live = create_app(webgl)
+    run_server(app, FileWatcher(fh.to_file_path(live.file_name), live.reload))
+
+
+def create_app(webgl: bool = False) -> Tuple[Dash, 'LiveEvaluation']:
+    """
+    builds the dashboard for the stored orders
+    :raise OrdersNotFound if there are no orders
+    """
+    started = time.perf_counter()
     app: Dash = Dash(__name__)
 
-    orders = fh.load_orders()
-    if not orders:
-        raise OrdersNotFound
-    evaluated = evaluation.Evaluation(orders)
+    live = LiveEvaluation(webgl=webgl, cache=FigureCache(fh.to_file_path('orders.json'), f'webgl={webgl}'))
+    cache_hit = live.load()
+    # a function as layout gets evaluated for every new page load, so new sessions always see the current orders
+    app.layout = live.layout
+    register_callbacks(app, live)
+    register_health_check(app, live)
+    app.server.register_blueprint(api.create_blueprint(live))
+
+    startup = f'Dashboard ready after {time.perf_counter() - started:.2f}s ' \
+              f'({"restored from cache" if cache_hit else "orders evaluated"})'
+    LOGGER.info(colored(startup, 'blue'))
+    return app, live
+
+
+def register_health_check(app: Dash, live: 'LiveEvaluation') -> None:
+    """ GET /health answers without touching the aggregates, e.g. for load balancers and process supervisors """
+
+    @app.server.route('/health')  # type: ignore
+    def health() -> Any:
+        return flask.jsonify(status='ok', version=live.version, pid=os.getpid())
+
+
+def run_server(app: Dash, watcher: Optional[FileWatcher] = None) -> None:
+    server_process: Process = Process(target=serve, args=(app, watcher))
+    server_process.daemon = True
+    server_process.start()
+    LOGGER.info(colored(f'Dash server process started. PID: {server_process.pid}', 'blue'))
+    time.sleep(0.1)
+    webbrowser_process: Process = Process(target=utils.open_webbrowser, kwargs={'url': 'http://127.0.0.1:8050/'})
+    webbrowser_process.daemon = True
+    webbrowser_process.start()
+    LOGGER.info(colored(f'Webbrowser process started. PID: {webbrowser_process.pid}', 'blue'))
+
+
+def serve(app: Dash, watcher: Optional[FileWatcher] = None) -> None:
+    """ runs in the server process, the watcher has to be started there to update the evaluation the server uses """
+    if watcher is not None:
+        watcher.start()
+    app.run_server()
+
 
-    app.layout = html.Div(
+class LiveEvaluation:
+    """
+    the evaluation shown by the dashboard, kept up to date with the orders file. A changed file is read completely,
+    new orders are added to the existing aggregates, changed ones are evaluated again. Connected browsers notice the new version through an interval
+    and refresh their graphs. With a figure cache an unchanged orders file is not evaluated at all
+    """
+
+    def __init__(self, file_name: str = 'orders.json', webgl: bool = False,
+                 cache: Optional[FigureCache] = None) -> None:
+        self.file_name = file_name
+        self.webgl = webgl
+        self.cache = cache
+        self.lock = threading.RLock()
+        self.version: int = 0
+        # None while the dashboard is served from the cache
+        self.evaluated: Optional[Evaluation] = None
+        self.filtered = FilteredFigures(MonthlyCube(), self.lock, webgl=webgl)
+
+        # the orders file as it was when the orders were last loaded
+        self._signature: str = ''
+        self._sections: Optional[Tuple[int, List, List]] = None
+        self._page: Optional[Tuple[int, html.Div]] = None
+
+    def load(self) -> bool:
+        """
+        restores the dashboard from the cache or evaluates all orders if there is no cache entry for the orders file
+        :return: True if the dashboard was restored from the cache
+        :raise OrdersNotFound if there are no orders
+        """
+        cached = self.cache.load() if self.cache is not None else None
+        if cached is None:
+            self._evaluate()
+            return False
+
+        with self.lock:
+            self._signature = file_signature(fh.to_file_path(self.file_name))
+            self.filtered = FilteredFigures(cached.cube, self.lock, webgl=self.webgl)
+            self._page = (self.version, from_plotly_json(json.loads(cached.page)))
+        return True
+
+    def _evaluate(self) -> None:
+        """ evaluates all orders of the orders file and caches the resulting dashboard """
+        signature = file_signature(fh.to_file_path(self.file_name))
+        orders = fh.load_orders(self.file_name)
+        if not orders:
+            raise OrdersNotFound
+        self._replace_orders(signature, orders, classification.load_classifier())
+        self._update_cache()
+
+    def _replace_orders(self, signature: str, orders: List[Order], classifier: Classifier) -> None:
+        with self.lock:
+            self._signature = signature
+            # only orders saved before the rules changed or by an older version lack tags
+            classifier.tag_orders(orders)
+            self.evaluated = evaluation.Evaluation(orders, classifier)
+            self.filtered = FilteredFigures(self.evaluated.monthly_cube(), self.lock, webgl=self.webgl)
+
+    def _update_cache(self) -> None:
+        if self.cache is not None and self.evaluated is not None:
+            with self.lock:
+                self.cache.save(self._signature, self.layout(), self.evaluated.monthly_cube())
+
+    def reload(self) -> int:
+        """
+        brings the evaluation up to date with the orders file. New orders are added to the existing aggregates, if
+        known orders changed (e.g. refreshed by a partial scrape, see Order.update) or were removed, all orders get
+        evaluated again
+        :returns the number of new and changed orders
+        """
+        if self.evaluated is None:
+            # served from the cache so far, the aggregates to add to do not exist yet
+            self._evaluate()
+            with self.lock:
+                self.version += 1
+            return self.evaluation().get_order_count()
+
+        signature = file_signature(fh.to_file_path(self.file_name))
+        if signature == self._signature:
+            return 0
+        orders = fh.load_orders(self.file_name)
+        if not orders:
+            LOGGER.warning(colored(f'no orders in {self.file_name}, the dashboard keeps the previous ones', 'yellow'))
+            return 0
+        classifier = self.evaluated.classifier
+        classifier.tag_orders(orders)
+        known = {order.order_id: order for order in self.evaluated.orders}
+        new_orders = [order for order in orders if order.order_id not in known]
+        changed = [order for order in orders if order.order_id in known and order != known[order.order_id]]
+        removed = len(known) - (len(orders) - len(new_orders))
+
+        if changed or removed:
+            self._replace_orders(signature, orders, classifier)
+            LOGGER.info(colored(f'{len(new_orders)} new, {len(changed)} changed and {removed} removed orders in '
+                                f'{self.file_name}, all orders evaluated again', 'blue'))
+        else:
+            with self.lock:
+                self._signature = signature
+                self.evaluated.add_orders(new_orders)
+            LOGGER.info(colored(f'{len(new_orders)} new orders loaded from {self.file_name}', 'blue'))
+        with self.lock:
+            self.version += 1
+        self._update_cache()
+        return len(new_orders) + len(changed)
+
+    def evaluation(self) -> Evaluation:
+        """ the evaluation of the orders, evaluated now if the dashboard was restored from the cache so far """
+        with self.lock:
+            if self.evaluated is None:
+                self._evaluate()
+            assert self.evaluated is not None
+            return self.evaluated
+
+    def data_version(self) -> str:
+        """
+        changes whenever other orders are shown. Derived from the orders file only, so it is the same in all processes
+        serving the dashboard and across restarts
+        """
+        with self.lock:
+            return self._signature
+
+    def sections(self) -> Tuple[List, List]:
+        """ the general information and the unfiltered graph sections, only rebuilt once the orders changed """
+        with self.lock:
+            assert self.evaluated is not None, "sections are only rebuilt after the orders were evaluated"
+            if self._sections is None or self._sections[0] != self.version:
+                self._sections = (self.version, general_information(self.evaluated).children,
+                                  gen_evaluation_sections(self.evaluated))
+            return self._sections[1], self._sections[2]
+
+    def layout(self) -> html.Div:
+        """ the whole page, only rebuilt once the orders changed """
+        with self.lock:
+            if self._page is None or self._page[0] != self.version:
+                assert self.evaluated is not None
+                general, sections = self.sections()
+                self._page = (self.version, gen_page(self.evaluated, self.data_version(), general, sections,
+                                                         self.webgl))
+            return self._page[1]
+
+
+def gen_page(evaluated: Evaluation, version: str, general: List, sections: List, webgl: bool = False) -> html.Div:
+    return html.Div(
         children=[
             head(),
+            dcc.Store(id='data-version', data=version),
+            dcc.Interval(id='refresh-interval', interval=REFRESH_INTERVAL),
+            html.Div(
+                gen_filter_controls(evaluated),
+                className="row flex-display"
+            ),
             html.Div(
                 [
-                    general_information(evaluated),
+                    html.Div(general, id='general-information', className="two columns"),
                     gen_stacked_totals_graph(evaluated)
                 ],
                 className="row flex-display"
             ),
             html.Div(
-                gen_scatter_by_month_graph(evaluated),
+                gen_scatter_by_month_graph(evaluated, webgl),
                 className="row flex-display"
             ),
-            html.Div(
-                gen_one_bar_graph(evaluated),
-                className="row flex-display"
-            )
+            html.Div(sections, id='evaluation-sections')
         ],
         id="mainContainer"
     )
 
-    run_server(app)
 
-
-def run_server(app: Dash) -> None:
-    server_process: Process = Process(target=app.run_server)
-    server_process.daemon = True
-    server_process.start()
-    LOGGER.info(colored(f'Dash server process started. PID: {server_process.pid}', 'blue'))
-    time.sleep(0.1)
-    webbrowser_process: Process = Process(target=utils.open_webbrowser, kwargs={'url': 'http://127.0.0.1:8050/'})
-    webbrowser_process.daemon = True
-    webbrowser_process.start()
-    LOGGER.info(colored(f'Webbrowser process started. PID: {webbrowser_process.pid}', 'blue'))
+def gen_evaluation_sections(evaluated: Evaluation) -> List[html.Div]:
+    return [
+        html.Div(
+            gen_one_bar_graph(evaluated),
+            className="row flex-display"
+        ),
+        html.Div(
+            gen_category_sunburst_graph(evaluated),
+            className="row flex-display"
+        ),
+        html.Div(
+            [
+                gen_top_orders_table(evaluated),
+                gen_top_sellers_table(evaluated)
+            ],
+            className="row flex-display"
+        )
+    ]
 
 
 def head() -> html.Div:
@@ -94,48 +323,251 @@ def head() -> html.Div:
     )
 
 
-def general_information(evaluated: Evaluation) -> html.Div:
-    return html.Div([
-        html.Div(
-            [f" {evaluated.get_total()}€", html.H6("Amazon (all)")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{evaluated.get_audible_total()}€", html.H6("Audible")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{evaluated.get_instant_video_total()}€", html.H6("Prime Instant Video")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{evaluated.get_most_expensive_order()[0].price}€", html.H6("max order price")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{len(evaluated.get_orders_with_most_items()[0].items)} items", html.H6("largest order")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{evaluated.get_order_count()}", html.H6("Orders")],
-            className='mini_container'
-        ),
-        html.Div(
-            [f"{evaluated.get_item_count()}", html.H6("Items")],
-            className='mini_container'
-        ),
+def all_classes(evaluated: Evaluation) -> List[str]:
+    """ the order classes in the order of the rules, a rule may tag items as uncategorized itself """
+    return list(dict.fromkeys(evaluated.classifier.tags + [classification.UNCATEGORIZED]))
+
 
-    ],
+def gen_filter_controls(evaluated: Evaluation) -> html.Div:
+    """ generates a date range picker and a order class selector, both filter the totals graphs """
+    cube = evaluated.monthly_cube()
+    return html.Div(
+        [
+            dcc.DatePickerRange(
+                id='date-range',
+                min_date_allowed=cube.first_date,
+                max_date_allowed=cube.last_date,
+                start_date=cube.first_date,
+                end_date=cube.last_date,
+                display_format='DD.MM.YYYY',
+            ),
+            dcc.Dropdown(
+                id='class-selector',
+                options=[{'label': tag, 'value': tag} for tag in all_classes(evaluated)],
+                value=all_classes(evaluated),
+                multi=True,
+            ),
+            html.Div(id='filtered-summary', className='mini_container'),
+        ],
+        className="pretty_container twelve columns",
+    )
+
+
+class FilteredFigures:
+    """
+    answers the dashboard filters from the monthly cube. The results are memoized by the filter parameters and the
+    cube version, the least recently used results get dropped once CACHE_SIZE results are stored
+    """
+
+    def __init__(self, cube: MonthlyCube, lock: Optional[threading.RLock] = None, cache_size: int = CACHE_SIZE,
+                 webgl: bool = False) -> None:
+        self.cube = cube
+        # guards the cube against orders being added while a query runs
+        self.lock = lock if lock is not None else threading.RLock()
+        self.webgl = webgl
+        self._cached_figures = functools.lru_cache(maxsize=cache_size)(self._figures)
+        self._cached_scatter_figure = functools.lru_cache(maxsize=cache_size)(self._scatter_figure)
+
+    def figures(self, start: datetime.date, end: datetime.date, tags: Tuple[str, ...]) -> Tuple[Dict, str]:
+        """ :returns the stacked totals figure and a summary for the filters """
+        with self.lock:
+            return self._cached_figures(self.cube.version, start, end, tags)
+
+    def _figures(self, _: int, start: datetime.date, end: datetime.date, tags: Tuple[str, ...]) -> Tuple[Dict, str]:
+        summary = self.cube.summary(start, end, tags)
+        return (
+            stacked_totals_figure(self.cube.yearly_totals_by_class(start, end, tags), list(tags)),
+            f"{summary.total:.2f}€ in {summary.order_count} orders with {summary.item_count} items",
+        )
+
+    def scatter_figure(self, start: datetime.date, end: datetime.date, tags: Tuple[str, ...], frequency: Frequency,
+                       visible: Optional[Tuple[datetime.date, datetime.date]] = None,
+                       max_points: int = MAX_POINTS) -> Dict:
+        """
+        :returns the scatter figure for the filters
+        :param visible: the currently visible (zoomed) date range, shown in full resolution as far as max_points allow
+        :param max_points: the maximum number of points per line, i.e. the width of the graph in pixels
+        """
+        with self.lock:
+            return self._cached_scatter_figure(self.cube.version, start, end, tags, frequency, visible, max_points)
+
+    def _scatter_figure(self, _: int, start: datetime.date, end: datetime.date, tags: Tuple[str, ...],
+                        frequency: Frequency, visible: Optional[Tuple[datetime.date, datetime.date]],
+                        max_points: int) -> Dict:
+        series = TimeSeries.from_totals(self.cube.totals(frequency, start, end, tags), frequency, start, end)
+        # keeps the users zoom while only the data changes, a new filter resets it
+        revision = f'{start}|{end}|{tags}|{frequency.value}'
+        return scatter_figure(series, self.webgl, max_points, visible, revision)
+
+
+def register_callbacks(app: Dash, live: LiveEvaluation) -> None:
+    """ connects the filter controls with the totals graphs and refreshes all graphs when new orders arrive """
+
+    @app.callback(Output('data-version', 'data'), [Input('refresh-interval', 'n_intervals')],  # type: ignore
+                  [State('data-version', 'data')])
+    def check_for_new_orders(_: int, version: str) -> str:
+        # requests may be answered by any process serving the dashboard, its own counter would differ from the others
+        current = live.data_version()
+        if version == current:
+            raise PreventUpdate
+        return current
+
+    @app.callback([Output('general-information', 'children'), Output('evaluation-sections', 'children'),  # type: ignore
+                   Output('date-range', 'max_date_allowed')],
+                  [Input('data-version', 'data')], prevent_initial_call=True)
+    def refresh_evaluation(_: str) -> Tuple[List, List, Optional[datetime.date]]:
+        # evaluates the orders first if this process serves the dashboard from the cache so far
+        evaluated = live.evaluation()
+        general, sections = live.sections()
+        return general, sections, evaluated.monthly_cube().last_date
+
+    @app.callback([Output('count_graph', 'figure'), Output('filtered-summary', 'children')],  # type: ignore
+                  [Input('date-range', 'start_date'), Input('date-range', 'end_date'),
+                   Input('class-selector', 'value'), Input('data-version', 'data')])
+    def update_filtered_graphs(start_date: str, end_date: str, tags: Optional[List[str]],
+                               _: str) -> Tuple[Dict, str]:
+        return live.filtered.figures(parse_date(start_date), parse_date(end_date), tuple(sorted(tags or [])))
+
+    app.clientside_callback(
+        "function(_) { return window.innerWidth; }",
+        Output('graph-width', 'data'),
+        [Input('data-version', 'data')]
+    )
+
+    @app.callback(Output('scatter-graph', 'figure'),  # type: ignore
+                  [Input('date-range', 'start_date'), Input('date-range', 'end_date'),
+                   Input('class-selector', 'value'), Input('resolution', 'value'),
+                   Input('scatter-graph', 'relayoutData'), Input('graph-width', 'data'),
+                   Input('data-version', 'data')])
+    def update_scatter_graph(start_date: str, end_date: str, tags: Optional[List[str]], resolution: str,
+                             relayout: Optional[Dict], width: Optional[int], _: str) -> Dict:
+        visible = visible_range(relayout)
+        triggered = [trigger['prop_id'] for trigger in dash.callback_context.triggered]
+        if triggered == ['scatter-graph.relayoutData'] and visible is None \
+                and not (relayout or {}).get('xaxis.autorange'):
+            # e.g. an autosize event, the visible range did not change
+            raise PreventUpdate
+        return live.filtered.scatter_figure(parse_date(start_date), parse_date(end_date), tuple(sorted(tags or [])),
+                                            Frequency(resolution), visible, int(width or MAX_POINTS))
+
+
+def parse_date(date_str: str) -> datetime.date:
+    """ dash sends dates as iso strings, sometimes with a time """
+    return datetime.date.fromisoformat(date_str[:10])
+
+
+def visible_range(relayout: Optional[Dict]) -> Optional[Tuple[datetime.date, datetime.date]]:
+    """ :returns the visible date range after the user zoomed or panned a graph, None if the whole range is shown """
+    if not relayout:
+        return None
+    if 'xaxis.range[0]' in relayout and 'xaxis.range[1]' in relayout:
+        first, last = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    elif 'xaxis.range' in relayout:
+        first, last = relayout['xaxis.range']
+    else:
+        return None
+    return parse_date(str(first)), parse_date(str(last))
+
+
+def summary_numbers(evaluated: Evaluation) -> List[Tuple[str, str]]:
+    """ :returns the values and labels shown as general information """
+    return [
+        (f" {evaluated.get_total()}€", "Amazon (all)"),
+        (f"{evaluated.get_audible_total()}€", "Audible"),
+        (f"{evaluated.get_instant_video_total()}€", "Prime Instant Video"),
+        (f"{evaluated.ranking().most_expensive_orders.largest(1)[0].price}€", "max order price"),
+        (f"{len(evaluated.ranking().largest_orders.largest(1)[0].items)} items", "largest order"),
+        (f"{evaluated.get_order_count()}", "Orders"),
+        (f"{evaluated.get_item_count()}", "Items"),
+    ]
+
+
+def general_information(evaluated: Evaluation) -> html.Div:
+    return html.Div(
+        [
+            html.Div(
+                [value, html.H6(label)],
+                className='mini_container'
+            ) for value, label in summary_numbers(evaluated)
+        ],
         className="two columns",
     )
 
 
-def gen_bar(data: Dict, name: str) -> go.Bar:
-    return go.Bar(x=list(data.keys()), y=list(data.values()), name=name)
+def gen_bar(data: Dict, name: str) -> Dict:
+    return dict(type='bar', x=list(data.keys()), y=list(data.values()), name=name)
+
+
+def gen_scatter(data: Dict, name: str, webgl: bool = False) -> Dict:
+    return dict(type='scattergl' if webgl else 'scatter', x=list(data.keys()), y=list(data.values()), name=name)
 
 
-def gen_scatter(data: Dict, name: str) -> dcc.Graph:
-    return go.Scatter(x=list(data.keys()), y=list(data.values()), name=name)
+def gen_layout(**layout: Any) -> Dict:
+    """ the default LAYOUT updated by layout, the legend gets merged instead of replaced """
+    merged: Dict[str, Any] = copy.deepcopy(LAYOUT)
+    merged['legend'].update(layout.pop('legend', {}))
+    merged.update(layout)
+    return merged
+
+
+def stacked_totals_figure(totals: Dict[str, Dict[int, float]], tags: List[str]) -> Dict:
+    """
+    the yearly totals with each bar subdivided into the order classes as plain figure dict. Building a go.Figure
+    validates every property, which alone costs ~100ms and is too slow for interactive callbacks
+    """
+    return dict(
+        data=[gen_bar(totals.get(tag, {}), tag) for tag in tags] +
+        [gen_bar(Evaluation.prime_member_fee_by_year(), 'amazon prime member fee')],
+        layout=gen_layout(
+            barmode='stack',
+            yaxis=dict(title=dict(text='Price in €', font=dict(size=18)), tickfont=dict(size=16)),
+            xaxis=dict(title=dict(text='Year', font=dict(size=18)), tickfont=dict(size=16), dtick=1.0),
+            legend=dict(font=dict(size=16), bgcolor='rgba(255, 255, 255, 0)'),
+            height=600,
+            title=dict(text="Amazon totals by year, split by categories", font=dict(size=20)),
+        )
+    )
+
+
+def downsampled(series: TimeSeries, max_points: int,
+                visible: Optional[Tuple[datetime.date, datetime.date]] = None) -> Dict[datetime.date, float]:
+    """
+    :returns the points of the series within the visible range (and their neighbours outside of it, so the line
+    reaches the graph borders), reduced to max_points by LTTB
+    """
+    first, last = 0, len(series)
+    if visible is not None:
+        first = max(0, bisect.bisect_left(series.dates, visible[0]) - 1)
+        last = min(len(series), bisect.bisect_right(series.dates, visible[1]) + 1)
+    dates = series.dates[first:last]
+    values = series.values[first:last]
+
+    indices = lttb([date.toordinal() for date in dates], values, max_points)
+    return {dates[index]: values[index] for index in indices}
+
+
+def scatter_figure(series: TimeSeries, webgl: bool = False, max_points: int = MAX_POINTS,
+                   visible: Optional[Tuple[datetime.date, datetime.date]] = None,
+                   revision: Optional[str] = None) -> Dict:
+    """
+    the spent amount for each period with trend lines as plain figure dict. The trends are calculated on the whole
+    series before it gets downsampled, so they stay correct when zooming
+    """
+    window = TREND_WINDOWS[series.frequency]
+    return dict(
+        data=[
+            gen_scatter(downsampled(series.rounded(), max_points, visible), 'total', webgl),
+            gen_scatter(downsampled(series.rolling_mean(window), max_points, visible), 'trend', webgl),
+            gen_scatter(downsampled(series.ewma(span=window), max_points, visible), 'weighted trend', webgl),
+        ],
+        layout=gen_layout(
+            yaxis=dict(title=dict(text='Price in €', font=dict(size=18)), tickfont=dict(size=16)),
+            xaxis=dict(tickfont=dict(size=16)),
+            legend=dict(font=dict(size=16), bgcolor='rgba(255, 255, 255, 0)'),
+            title=dict(text=f"Amazon totals by {series.frequency.value}", font=dict(size=20)),
+            uirevision=revision,
+        )
+    )
 
 
 def gen_stacked_totals_graph(evaluated: Evaluation) -> html.Div:
@@ -143,25 +575,7 @@ def gen_stacked_totals_graph(evaluated: Evaluation) -> html.Div:
         - ToDo (prime music unlimited)
         - ToDo (prime membership fee)
     """
-    fig = go.Figure(data=[
-        gen_bar(evaluated.audible_total_by_year(), 'audible'),
-        gen_bar(evaluated.instant_video_total_per_year(), 'prime instant video'),
-        gen_bar(evaluated.prime_member_fee_by_year(), 'amazon prime member fee'),
-        gen_bar(evaluated.added_balance_per_year(), 'balance added'),
-        gen_bar(evaluated.uncategorized_totals_per_year(), 'uncategorized'),
-    ], layout=copy.deepcopy(LAYOUT))
-
-    fig.update_layout(
-        barmode='stack',
-        yaxis=dict(title='Price in €', titlefont_size=18, tickfont_size=16),
-        xaxis=dict(title='Year', titlefont_size=18, tickfont_size=16),
-        legend=dict(font_size=16, bgcolor='rgba(255, 255, 255, 0)'),
-        height=600,
-        title="Amazon totals by year, split by categories",
-        titlefont={"size": 20}
-    )
-
-    fig.update_xaxes(dtick=1.0)
+    fig = stacked_totals_figure(evaluated.totals_by_year_and_class(), all_classes(evaluated))
 
     return html.Div(
         dcc.Graph(id='count_graph', figure=fig),
@@ -170,30 +584,34 @@ def gen_stacked_totals_graph(evaluated: Evaluation) -> html.Div:
     )
 
 
-def gen_scatter_by_month_graph(evaluated: Evaluation) -> html.Div:
-    """ generates a line graph with spend amount for each month """
-
-    fig = go.Figure(data=[
-        gen_scatter(evaluated.totals_by_month(), 'total'),
-        gen_scatter(evaluated.trend_by_month(), 'trend')
-    ], layout=copy.deepcopy(LAYOUT))
-
-    fig.update_layout(
-        yaxis=dict(title='Price in €', titlefont_size=18, tickfont_size=16),
-        xaxis=dict(titlefont_size=18, tickfont_size=16),
-        legend=dict(font_size=16, bgcolor='rgba(255, 255, 255, 0)'),
-        title="Amazon totals by month",
-        titlefont={"size": 20}
-    )
+def gen_scatter_by_month_graph(evaluated: Evaluation, webgl: bool = False) -> html.Div:
+    """ generates a line graph with spend amount for each month, the resolution can be changed to weeks or days """
+    fig = scatter_figure(evaluated.spending_series(Frequency.MONTH), webgl)
 
     return html.Div(
-        dcc.Graph(id='scatter-graph', figure=fig),
+        [
+            dcc.RadioItems(
+                id='resolution',
+                options=[{'label': frequency.value, 'value': frequency.value} for frequency in Frequency],
+                value=Frequency.MONTH.value,
+                labelStyle={'display': 'inline-block'},
+            ),
+            dcc.Store(id='graph-width'),
+            dcc.Graph(id='scatter-graph', figure=fig),
+        ],
         className="pretty_container twelve columns"
     )
 
 
 def gen_one_bar_graph(evaluated: Evaluation) -> html.Div:
+    return html.Div(
+        dcc.Graph(id='bar-graph', figure=category_bar_figure(evaluated)),
+        className="pretty_container twelve columns"
+    )
+
 
+def category_bar_figure(evaluated: Evaluation) -> go.Figure:
+    """ a single bar split by the share of each level 1 category """
     category_sums = evaluated.total_by_level_1_category()
     total = sum(category_sums.values())
     percentages = {category[0]: category[1] / total * 100 for category in category_sums.items()}
@@ -214,12 +632,67 @@ def gen_one_bar_graph(evaluated: Evaluation) -> html.Div:
         title="Totals split by level 1 categories",
         titlefont={"size": 20,},
     )
+    return fig
 
+
+def gen_category_sunburst_graph(evaluated: Evaluation) -> html.Div:
+    """ generates a sunburst chart over the whole category hierarchy, clicking a category drills down into it """
     return html.Div(
-        dcc.Graph(id='bar-graph', figure=fig),
+        dcc.Graph(id='category-sunburst-graph', figure=category_sunburst_figure(evaluated)),
         className="pretty_container twelve columns"
     )
 
 
+def category_sunburst_figure(evaluated: Evaluation) -> go.Figure:
+    chart = evaluated.category_trie().to_sunburst()
+
+    fig = go.Figure(
+        data=[go.Sunburst(ids=chart['ids'], labels=chart['labels'], parents=chart['parents'], values=chart['values'],
+                          branchvalues='total', maxdepth=3, hovertemplate='%{label}<br>%{value:.2f}€<extra></extra>')],
+        layout=copy.deepcopy(LAYOUT)
+    )
+
+    fig.update_layout(
+        height=700,
+        title="Totals split by category hierarchy",
+        titlefont={"size": 20},
+    )
+    return fig
+
+
+def gen_table(header: List[str], rows: List[List[str]]) -> html.Table:
+    return html.Table(
+        [html.Tr([html.Th(column) for column in header])] +
+        [html.Tr([html.Td(cell) for cell in row]) for row in rows]
+    )
+
+
+def gen_top_orders_table(evaluated: Evaluation) -> html.Div:
+    """ generates a table with the most expensive orders """
+    rows = [[str(order.date), order.order_id, f"{len(order.items)}", f"{order.price:.2f}€"]
+            for order in evaluated.ranking().most_expensive_orders.largest()]
+
+    return html.Div(
+        [
+            html.H5(f"Top {len(rows)} orders"),
+            gen_table(["Date", "Order", "Items", "Price"], rows)
+        ],
+        className="pretty_container six columns"
+    )
+
+
+def gen_top_sellers_table(evaluated: Evaluation) -> html.Div:
+    """ generates a table with the sellers most money was spent at """
+    rows = [[seller, f"{total:.2f}€"] for seller, total in evaluated.ranking().top_sellers()]
+
+    return html.Div(
+        [
+            html.H5(f"Top {len(rows)} sellers"),
+            gen_table(["Seller", "Total"], rows)
+        ],
+        className="pretty_container six columns"
+    )
+
+
 if __name__ == '__main__':
     main()
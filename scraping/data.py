@@ -4,60 +4,235 @@ data classes for orders and items
 from __future__ import annotations
 
 import datetime
-from dataclasses import dataclass
-from typing import List, Dict
+import functools
+import sys
+from typing import List, Dict, Optional, Tuple
 
 import dateutil.parser
 
 from . import utils
 
 
-@dataclass
+# (depth, name) pairs sorted by depth and the names alone, e.g. (((0, 'Bücher'), (1, 'Romane')), ('Bücher', 'Romane'))
+CategoryEntry = Tuple[Tuple[Tuple[int, str], ...], Tuple[str, ...]]
+
+# every distinct category of all items once, the items refer to the shared entry instead of keeping a dict each
+_CATEGORIES: Dict[Tuple[Tuple[int, str], ...], CategoryEntry] = dict()
+_NO_CATEGORY: CategoryEntry = ((), ())
+
+
+# the entries by the category items as given (e.g. with the depths as str when loaded from json), saves sorting them
+_CATEGORIES_AS_GIVEN: Dict[tuple, CategoryEntry] = dict()
+
+
+def _category_entry(category: Dict[int, str]) -> CategoryEntry:
+    """ :returns the shared entry of the category, its names are interned """
+    if not category:
+        return _NO_CATEGORY
+    given = tuple(category.items())
+    entry = _CATEGORIES_AS_GIVEN.get(given)
+    if entry is None:
+        key = tuple(sorted((int(depth), sys.intern(name)) for depth, name in given))
+        entry = _CATEGORIES.setdefault(key, (key, tuple(name for _, name in key)))
+        _CATEGORIES_AS_GIVEN[given] = entry
+    return entry
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _to_cents(price: float) -> int:
+    return round(float(price) * 100)
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_date(date: str) -> datetime.date:
+    """ orders of the same day share their date """
+    parsed: datetime.datetime = dateutil.parser.parse(date)
+    return parsed.date()
+
+
 class Item:
-    """ a dataclass for items """
-    price: float
-    link: str
-    title: str
-    seller: str
-    # category depth as key and name as value, e.g. [0: Bekleidung, 1: Herren, 2: Tops,T-Shirts & Hemden, 3: T-Shirts]
-    category: Dict[int, str]
+    """
+    an item of an order. Items are slotted and hold their price in cents, the seller and tag interned and the category
+    as an entry of a table shared by all items, since a history has many items but few sellers and categories
+    """
+    __slots__ = ('_cents', 'link', 'title', '_seller', '_category', '_tag')
+
+    def __init__(self, price: float, link: str, title: str, seller: str, category: Dict[int, str],
+                 tag: Optional[str] = None) -> None:
+        """
+        :param category: category depth as key and name as value, e.g.
+        [0: Bekleidung, 1: Herren, 2: Tops,T-Shirts & Hemden, 3: T-Shirts]
+        :param tag: class assigned by the classification rules, e.g. 'audible', None if not classified yet
+        """
+        self._cents = _to_cents(price)
+        self.link = link
+        self.title = title
+        self._seller = sys.intern(seller)
+        self._category = _category_entry(category)
+        self._tag = _intern(tag)
+
+    @property
+    def price(self) -> float:
+        return self._cents / 100
+
+    @price.setter
+    def price(self, price: float) -> None:
+        self._cents = _to_cents(price)
+
+    @property
+    def cents(self) -> int:
+        return self._cents
+
+    @property
+    def seller(self) -> str:
+        return self._seller
+
+    @seller.setter
+    def seller(self, seller: str) -> None:
+        self._seller = sys.intern(seller)
+
+    @property
+    def category(self) -> Dict[int, str]:
+        """ a copy, changing it doesn't change the item """
+        return dict(self._category[0])
+
+    @category.setter
+    def category(self, category: Dict[int, str]) -> None:
+        self._category = _category_entry(category)
+
+    @property
+    def category_pairs(self) -> Tuple[Tuple[int, str], ...]:
+        """ the (depth, name) pairs ordered by depth, the same tuple for all items with the same category """
+        return self._category[0]
+
+    @property
+    def category_path(self) -> Tuple[str, ...]:
+        """ the category names ordered by depth, e.g. ('Bekleidung', 'Herren', 'T-Shirts'), without a copy """
+        return self._category[1]
+
+    @property
+    def tag(self) -> Optional[str]:
+        return self._tag
+
+    @tag.setter
+    def tag(self, tag: Optional[str]) -> None:
+        self._tag = _intern(tag)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Item):
+            return NotImplemented
+        return (self._cents, self.link, self.title, self._seller, self._category[0], self._tag) == \
+            (other._cents, other.link, other.title, other._seller, other._category[0], other._tag)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'Item(price={self.price!r}, link={self.link!r}, title={self.title!r}, seller={self.seller!r}, ' \
+               f'category={self.category!r}, tag={self.tag!r})'
 
     def to_dict(self) -> Dict:
         """ convert item to a dictionary """
-        return self.__dict__
+        return {'price': self.price, 'link': self.link, 'title': self.title, 'seller': self.seller,
+                'category': self.category, 'tag': self.tag}
 
     @staticmethod
     def from_dict(item_dict: Dict) -> 'Item':
         """ returns an item object for a given order as dict """
-        category = {int(cat[0]): cat[1] for cat in item_dict['category'].items()}
-        return Item(item_dict['price'], item_dict['link'], item_dict['title'], item_dict['seller'], category)
+        return Item(item_dict['price'], item_dict['link'], item_dict['title'], item_dict['seller'],
+                    item_dict['category'], item_dict.get('tag'))
 
 
-@dataclass
 class Order:
-    """ a dataclass for orders, where one order usually contains at least one item """
-    order_id: str
-    price: float  # overall costs
-    # shipment: float  # total shipment cost
-    date: datetime.date
-    items: List[Item]
+    """ an order, where one order usually contains at least one item. Slotted with the price in cents like items """
+    __slots__ = ('order_id', '_cents', 'date', 'items')
+
+    def __init__(self, order_id: str, price: float, date: datetime.date, items: List[Item]) -> None:
+        """ :param price: overall costs """
+        self.order_id = order_id
+        self._cents = _to_cents(price)
+        self.date = date
+        self.items = items
+
+    @property
+    def price(self) -> float:
+        return self._cents / 100
+
+    @price.setter
+    def price(self, price: float) -> None:
+        self._cents = _to_cents(price)
+
+    @property
+    def cents(self) -> int:
+        return self._cents
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Order):
+            return NotImplemented
+        return (self.order_id, self._cents, self.date, self.items) == \
+            (other.order_id, other._cents, other.date, other.items)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'Order(order_id={self.order_id!r}, price={self.price!r}, date={self.date!r}, items={self.items!r})'
 
     def is_equal(self, order: Order) -> bool:
         """ compares to orders for equality by comparing their ids"""
         return order.order_id == self.order_id
 
+    def update(self, refreshed: Order) -> List[str]:
+        """
+        takes over what changed in a newly scraped version of this order (price, items added or removed, item prices,
+        titles and sellers). Items are matched by their link, unchanged items stay as they are. Empty categories and
+        prices of 0 (not found on the page) of the refreshed items don't replace known ones
+        :returns a description of every change, empty if nothing changed
+        """
+        changes: List[str] = []
+        if refreshed.price != self.price:
+            changes.append(f'price {self.price} -> {refreshed.price}')
+            self.price = refreshed.price
+
+        remaining: Dict[str, List[Item]] = dict()
+        for item in self.items:
+            remaining.setdefault(item.link, []).append(item)
+
+        items: List[Item] = []
+        for refreshed_item in refreshed.items:
+            matches = remaining.get(refreshed_item.link)
+            if not matches:
+                changes.append(f'item added: {refreshed_item.title}')
+                items.append(refreshed_item)
+                continue
+            item = matches.pop(0)
+            for attribute in ('price', 'title', 'seller'):
+                old, new = getattr(item, attribute), getattr(refreshed_item, attribute)
+                if old != new and new:
+                    changes.append(f'{item.title}: {attribute} {old} -> {new}')
+                    setattr(item, attribute, new)
+                    item.tag = None  # classified again
+            if refreshed_item.category and refreshed_item.category != item.category:
+                changes.append(f'{item.title}: category {item.category} -> {refreshed_item.category}')
+                item.category = refreshed_item.category
+                item.tag = None
+            items.append(item)
+
+        changes.extend(f'item removed: {item.title}' for matches in remaining.values() for item in matches)
+        self.items = items
+        return changes
+
     def to_dict(self) -> Dict:
         """ returns a serializable representation of this order as dict """
-        attr_dict = self.__dict__
-        attr_dict['items'] = [item.to_dict() for item in self.items]
-        attr_dict['date'] = utils.serialize_date(self.date)
-        return attr_dict
+        return {'order_id': self.order_id, 'price': self.price, 'date': utils.serialize_date(self.date),
+                'items': [item.to_dict() for item in self.items]}
 
     @staticmethod
     def from_dict(order_dict: Dict) -> Order:
         """ returns an order object for a given order as dict """
         order_id = order_dict['order_id']
         price = float(order_dict['price'])
-        date: datetime.date = dateutil.parser.parse(order_dict['date']).date()
+        date: datetime.date = _parse_date(order_dict['date'])
         items = [Item.from_dict(item) for item in order_dict['items']]
         return Order(order_id, price, date, items)
@@ -0,0 +1,49 @@
+"""
+downsampling of line graphs, so the points sent to the browser are bounded by the graphs width instead of the history
+"""
+from typing import List, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013). Keeps the first and the last point and from every bucket in
+    between the point forming the largest triangle with the previously kept point and the average of the next bucket,
+    which preserves peaks and the visual shape of the line
+    :param xs: the x values, sorted ascending
+    :param ys: the y values
+    :param threshold: the maximum number of points to keep
+    :return: the indices of the kept points, sorted ascending
+    """
+    length = len(xs)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+
+    selected = [0]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # average point of the next bucket, the last point for the last bucket
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        if next_start >= next_end:
+            next_start, next_end = length - 1, length
+        average_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        average_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        previous_x, previous_y = xs[previous], ys[previous]
+        largest_area = -1.0
+        for index in range(start, end):
+            # twice the triangle area, the factor does not matter for the comparison
+            area = abs((previous_x - average_x) * (ys[index] - previous_y)
+                       - (previous_x - xs[index]) * (average_y - previous_y))
+            if area > largest_area:
+                largest_area = area
+                previous = index
+        selected.append(previous)
+
+    selected.append(length - 1)
+    return selected
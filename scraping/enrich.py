@@ -0,0 +1,222 @@
+"""
+backfills the categories of items scraped without them (e.g. with --extensive False) in prioritized batches
+"""
+# pylint: disable=W1203
+# pylint: disable=W0212
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from termcolor import colored
+
+from . import file_handler
+from .data import Item, Order
+from .pipeline import Stage, StageWorker
+from .scraper import BASE_URL, FILE_NAME, Scraper
+
+LOGGER = logging.getLogger(__name__)
+
+# items resolved between two saves of the orders file and the checkpoint, i.e. the work lost at most when stopped
+BATCH_SIZE: int = 20
+
+# which items get their categories first
+PRIORITIES: Dict[str, Callable[[Order, Item], tuple]] = {
+    'recent': lambda order, item: (order.date, item.price),
+    'expensive': lambda order, item: (item.price, order.date),
+}
+
+
+@dataclass
+class Checkpoint:
+    """ the state of the backfill of an orders file, kept next to it in <orders file>.enrich.json """
+    orders_file: str
+    failed: Set[str] = field(default_factory=set)  # links without categories on their page, not tried again
+    resolved: int = 0  # items given categories over all runs
+
+    @property
+    def file_name(self) -> str:
+        return os.path.splitext(self.orders_file)[0] + '.enrich.json'
+
+    @staticmethod
+    def load(orders_file: str) -> Checkpoint:
+        checkpoint = Checkpoint(orders_file)
+        path = file_handler.to_file_path(checkpoint.file_name)
+        if os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            checkpoint.failed = set(data.get('failed', []))
+            checkpoint.resolved = int(data.get('resolved', 0))
+        return checkpoint
+
+    def save(self) -> None:
+        file_handler.save_file(self.file_name, json.dumps({'failed': sorted(self.failed), 'resolved': self.resolved}))
+
+
+def missing_categories(orders: List[Order], failed: Set[str], priority: str = 'recent') -> List[str]:
+    """
+    :param failed: links to leave out, e.g. the failed ones of the checkpoint
+    :returns: the links of all items without categories, most important first. Items ordered several times are
+    resolved once
+    """
+    best: Dict[str, tuple] = dict()
+    for order in orders:
+        for item in order.items:
+            if item.category or item.link in failed or not item.link.startswith('http'):
+                continue
+            key = PRIORITIES[priority](order, item)
+            if item.link not in best or key > best[item.link]:
+                best[item.link] = key
+    return sorted(best, key=lambda link: best[link], reverse=True)
+
+
+class Enricher(Scraper):
+    """
+    Signs in like a scrape, but instead of scraping orders it loads the orders file, reads the categories of items
+    without any from their product pages and saves the orders file and the checkpoint after every batch_size items.
+    It stops once max_items items are resolved or max_seconds have passed, the next run continues where it stopped
+    """
+
+    def __init__(self, email: str, password: Optional[str], headless: bool, file_name: str = FILE_NAME,
+                 priority: str = 'recent', batch_size: int = BATCH_SIZE, max_items: Optional[int] = None,
+                 max_seconds: Optional[float] = None, enrich_workers: int = 0,
+                 cancel_event: Optional[threading.Event] = None, refresh: bool = False,
+                 base_url: str = BASE_URL) -> None:
+        """
+        :param max_items: items to resolve at most in this run, None for all
+        :param max_seconds: seconds after which no further items are started, None for no limit
+        """
+        assert priority in PRIORITIES, f"priority must be one of {', '.join(PRIORITIES)}"
+        self.priority = priority
+        self.batch_size = max(batch_size, 1)
+        self.max_items = max_items
+        self.max_seconds = max_seconds
+        self.checkpoint = Checkpoint.load(file_name)
+        self.resolved: int = 0
+        self.remaining: int = 0
+        year = datetime.datetime.now().year
+        super().__init__(email, password, headless, year, year, True, cancel_event=cancel_event, file_name=file_name,
+                         enrich_workers=enrich_workers, refresh=refresh, base_url=base_url)
+
+    def _get_orders(self) -> None:
+        """ replaces the scrape, the orders are saved once more by the Scraper afterwards """
+        self.orders = file_handler.load_orders(self.file_name)
+        links = missing_categories(self.orders, self.checkpoint.failed, self.priority)
+        if self.max_items is not None:
+            links = links[:self.max_items]
+        self.remaining = len(links)
+        self.progress.set_period_total(0, len(links))
+        LOGGER.info(colored(f'{len(links)} items to enrich', 'blue'))
+
+        items_by_link: Dict[str, List[Item]] = dict()
+        for order in self.orders:
+            for item in order.items:
+                items_by_link.setdefault(item.link, []).append(item)
+
+        deadline = time.monotonic() + self.max_seconds if self.max_seconds is not None else None
+        results: Stage[_Resolved] = Stage('results', lambda: _ResultWorker(self, items_by_link), workers=1,
+                                          capacity=self.batch_size)
+        # the first browser must only be used by this thread, so its cookies are read here
+        cookies = self.browser.get_cookies() if self.enrich_workers else []
+        lookups: Stage[str] = Stage('categories', lambda: _CategoryWorker(self, results, cookies),
+                                    workers=self.enrich_workers, capacity=self.enrich_workers * 2)
+        try:
+            for link in links:
+                self._check_cancelled()
+                if deadline is not None and time.monotonic() > deadline:
+                    LOGGER.info(colored('time budget used up', 'blue'))
+                    break
+                lookups.put(link)
+            lookups.close()
+            results.close()
+        except BaseException:
+            lookups.abort()
+            results.abort()
+            raise
+
+    def save_batch(self) -> None:
+        """ saves the orders and the checkpoint together, so a stopped run loses at most the current batch """
+        file_handler.save_orders(self.orders, self.file_name)
+        self.checkpoint.save()
+        LOGGER.info(colored(f'{self.resolved} items enriched, {self.remaining} left', 'blue'))
+
+
+@dataclass
+class _Resolved:
+    link: str
+    categories: Dict[int, str]
+
+
+class _CategoryWorker(StageWorker[str]):
+    """ reads the categories of product pages with a browser of its own (or the first one) """
+
+    def __init__(self, enricher: Enricher, results: Stage[_Resolved], cookies: List[Dict]) -> None:
+        self.enricher = enricher
+        self.results = results
+        self.browser = enricher._create_session_browser(cookies) if enricher.enrich_workers else enricher.browser
+
+    def handle(self, item: str) -> None:
+        self.enricher._check_cancelled()
+        self.results.put(_Resolved(item, self.enricher._get_item_categories(self.browser, item)))
+
+    def close(self) -> None:
+        if self.browser is not self.enricher.browser:
+            self.browser.quit()
+
+
+class _ResultWorker(StageWorker[_Resolved]):
+    """ applies the categories to all items with the link and saves after every batch """
+
+    def __init__(self, enricher: Enricher, items_by_link: Dict[str, List[Item]]) -> None:
+        self.enricher = enricher
+        self.items_by_link = items_by_link
+        self.unsaved = 0
+
+    def handle(self, item: _Resolved) -> None:
+        enricher = self.enricher
+        if item.categories:
+            for listed_item in self.items_by_link[item.link]:
+                listed_item.category = dict(item.categories)
+                # classified again with the category (see Order.update), at the latest when the orders are loaded
+                listed_item.tag = None
+            enricher.checkpoint.resolved += 1
+        else:
+            enricher.checkpoint.failed.add(item.link)
+            LOGGER.warning(colored(f'no categories found on {item.link}', 'yellow'))
+        enricher.resolved += 1
+        enricher.remaining -= 1
+        enricher.progress.order_scraped(len(self.items_by_link[item.link]))
+
+        self.unsaved += 1
+        if self.unsaved >= enricher.batch_size:
+            enricher.save_batch()
+            self.unsaved = 0
+
+    def close(self) -> None:
+        if self.unsaved:
+            self.enricher.save_batch()
+
+
+def main(email: str, password: Optional[str], headless: bool, file_name: str = FILE_NAME, priority: str = 'recent',
+         batch_size: int = BATCH_SIZE, max_items: Optional[int] = None, max_seconds: Optional[float] = None,
+         enrich_workers: int = 0, retry_failed: bool = False, refresh: bool = False, base_url: str = BASE_URL) -> None:
+    if retry_failed:
+        checkpoint = Checkpoint.load(file_name)
+        checkpoint.failed.clear()
+        checkpoint.save()
+    missing = len(missing_categories(file_handler.load_orders(file_name), Checkpoint.load(file_name).failed))
+    if not missing:
+        print('All items have categories already')
+        return
+    print(f'{missing} items without categories in {file_name}')
+
+    enricher = Enricher(email, password, headless, file_name, priority, batch_size, max_items, max_seconds,
+                        enrich_workers, refresh=refresh, base_url=base_url)
+    print(f'{enricher.resolved} items enriched, {missing - enricher.resolved} left'
+          f'{f", {len(enricher.checkpoint.failed)} without categories on their page" if enricher.checkpoint.failed else ""}')
@@ -4,17 +4,43 @@ Contains an Evaluation class which provides methods to analyse a given list of O
 # pylint: disable=C0111
 import datetime
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 
+from . import classification
+from .categories import CategoryTrie
+from .classification import Classifier
+from .cube import MonthlyCube
 from .data import Order
+from .ranking import OrderRanking
+from .timeseries import Frequency, TimeSeries
 
 
 class Evaluation:
     """
-    class providing methods to analyze a list of Orders
+    class providing methods to analyze a list of Orders. The items have to be tagged by the classifier already (see
+    Classifier.tag_orders), the scraper tags them before saving
     """
-    def __init__(self, orders: List[Order]):
+    def __init__(self, orders: List[Order], classifier: Classifier):
         self.orders = orders
+        self.classifier = classifier
+
+        self._category_trie: Optional[CategoryTrie] = None
+        self._ranking: Optional[OrderRanking] = None
+        self._monthly_cube: Optional[MonthlyCube] = None
+        self._totals_by_year_and_class: Optional[Dict[str, Dict[int, float]]] = None
+
+    def add_orders(self, orders: List[Order]) -> None:
+        """ adds new, tagged orders and updates the aggregates built so far instead of recomputing them """
+        self.orders.extend(orders)
+        for order in orders:
+            if self._category_trie is not None:
+                self._category_trie.add_order(order)
+            if self._ranking is not None:
+                self._ranking.add(order)
+            if self._monthly_cube is not None:
+                self._monthly_cube.add(order, self.classifier.order_class(order))
+            if self._totals_by_year_and_class is not None:
+                self._add_to_class_totals(order)
 
     def get_most_expensive_order(self) -> List[Order]:
         """ get a list with the most expensive order, contains usually only one element """
@@ -25,6 +51,18 @@ class Evaluation:
         max_item_count = max([len(order.items) for order in self.orders])
         return list(filter(lambda order: len(order.items) == max_item_count, self.orders))
 
+    def ranking(self) -> OrderRanking:
+        """ the top K orders, items and sellers, computed in one pass on first access """
+        if self._ranking is None:
+            self._ranking = OrderRanking.from_orders(self.orders)
+        return self._ranking
+
+    def monthly_cube(self) -> MonthlyCube:
+        """ the orders aggregated by month and order class, built in one pass on first access """
+        if self._monthly_cube is None:
+            self._monthly_cube = MonthlyCube.from_orders(self.orders, self.classifier)
+        return self._monthly_cube
+
     def get_order_count(self) -> int:
         return len(self.orders)
 
@@ -43,26 +81,21 @@ class Evaluation:
         total = sum(self.instant_video_total_per_year().values())
         return round(total, 2)
 
+    @staticmethod
+    def order_contains_tag(order: Order, tag: str) -> bool:
+        return any(item.tag == tag for item in order.items)
+
     @staticmethod
     def order_contains_audible_items(order: Order) -> bool:
-        for item in order.items:
-            if item.seller == 'Audible GmbH':
-                return True
-        return False
+        return Evaluation.order_contains_tag(order, classification.AUDIBLE)
 
     @staticmethod
     def order_contains_instant_video_items(order: Order) -> bool:
-        for item in order.items:
-            if item.seller == 'Amazon Instant Video Germany GmbH':
-                return True
-        return False
+        return Evaluation.order_contains_tag(order, classification.INSTANT_VIDEO)
 
     @staticmethod
     def order_contains_balance_item(order: Order) -> bool:
-        for item in order.items:
-            if item.title == "Amazon-Konto aufladen":
-                return True
-        return False
+        return Evaluation.order_contains_tag(order, classification.BALANCE)
 
     def total_by_year(self) -> Dict[int, float]:
         totals: Dict[int, float] = dict()
@@ -73,88 +106,68 @@ class Evaluation:
         totals = {year: round(total, 2) for year, total in totals.items()}
         return totals
 
+    def totals_by_year_and_class(self) -> Dict[str, Dict[int, float]]:
+        """
+        the yearly totals for each order class (see Classifier.order_class), calculated in one pass over the
+        cached item tags. Each order belongs to exactly one class, so the classes add up to total_by_year
+        """
+        if self._totals_by_year_and_class is None:
+            self._totals_by_year_and_class = dict()
+            for order in self.orders:
+                self._add_to_class_totals(order)
+        return {tag: {year: round(total, 2) for year, total in class_totals.items()}
+                for tag, class_totals in self._totals_by_year_and_class.items()}
+
+    def _add_to_class_totals(self, order: Order) -> None:
+        assert self._totals_by_year_and_class is not None
+        class_totals = self._totals_by_year_and_class.setdefault(self.classifier.order_class(order), dict())
+        class_totals[order.date.year] = class_totals.get(order.date.year, 0) + order.price
+
     def audible_total_by_year(self) -> Dict[int, float]:
-        audible_orders = [order for order in self.orders if self.order_contains_audible_items(order)]
-        return self.__total_by_year(audible_orders)
+        return self.totals_by_year_and_class().get(classification.AUDIBLE, {})
 
     def instant_video_total_per_year(self) -> Dict[int, float]:
-        instant_video_orders = [order for order in self.orders if self.order_contains_instant_video_items(order)]
-        return self.__total_by_year(instant_video_orders)
+        return self.totals_by_year_and_class().get(classification.INSTANT_VIDEO, {})
 
     def added_balance_per_year(self) -> Dict[int, float]:
-        balance_orders = [order for order in self.orders if self.order_contains_balance_item(order)]
-        return self.__total_by_year(balance_orders)
-
-    @staticmethod
-    def __total_by_year(orders: List[Order]) -> Dict[int, float]:
-        totals: Dict[int, float] = dict()
-        for order in orders:
-            if order.date.year not in totals.keys():
-                totals[order.date.year] = 0
-            totals[order.date.year] += order.price
-        totals = {year: round(total, 2) for year, total in totals.items()}
-        return totals
+        return self.totals_by_year_and_class().get(classification.BALANCE, {})
 
     def uncategorized_totals_per_year(self) -> Dict[int, float]:
-        amazon = self.total_by_year()
-        audible = self.audible_total_by_year()
-        prime_vid = self.instant_video_total_per_year()
-        prime = self.prime_member_fee_by_year()
-        balance = self.added_balance_per_year()
-
-        remaining_totals = {}
-        for year in amazon.keys():
-            remaining = amazon[year]
-            remaining = remaining - audible[year] if year in audible.keys() else remaining
-            remaining = remaining - prime_vid[year] if year in prime_vid.keys() else remaining
-            remaining = remaining - prime[year] if year in prime.keys() else remaining
-            remaining = remaining - balance[year] if year in prime.keys() else remaining
-            remaining_totals[year] = remaining
-        return remaining_totals
+        return self.totals_by_year_and_class().get(classification.UNCATEGORIZED, {})
 
     @staticmethod
     def prime_member_fee_by_year() -> Dict[int, float]:
         # ToDo
         return {}
 
-    def totals_by_month(self) -> Dict[datetime.date, float]:
-        totals: Dict[datetime.date, float] = dict()
-        for order in self.orders:
-            key = datetime.date(year=order.date.year, month=order.date.month, day=1)
-            if key not in totals:
-                totals[key] = 0
-            totals[key] += order.price
-        totals = {date: round(total, 2) for date, total in totals.items()}
-        return totals
-
-    def trend_by_month(self) -> Dict[datetime.date, float]:
-        """ return a trend value calculated through the expenses average over the last 6 month """
-        totals = self.totals_by_month()
+    def spending_series(self, frequency: Frequency = Frequency.MONTH) -> TimeSeries:
+        """ the spent amount on a dense calendar with the given resolution, periods without orders are 0 """
+        return TimeSeries.from_orders(self.orders, frequency)
 
-        trends = dict()
-        last = [0.0] * 6
+    def totals_by_month(self) -> Dict[datetime.date, float]:
+        return self.spending_series(Frequency.MONTH).rounded().to_dict()
 
-        for date, total in totals.items():
-            last.pop(0)
-            last.append(total)
-            trend = sum(last) / len(last)
-            trends[date] = trend
+    def trend_by_month(self, window: int = 6) -> Dict[datetime.date, float]:
+        """ return a trend value calculated through the expenses average over the last `window` month """
+        return self.spending_series(Frequency.MONTH).rolling_mean(window).to_dict()
 
-        return trends
+    def category_trie(self) -> CategoryTrie:
+        """ the category hierarchy with aggregated values for every level, built once on first access """
+        if self._category_trie is None:
+            self._category_trie = CategoryTrie.from_orders(self.orders)
+        return self._category_trie
 
     def total_by_level_1_category(self) -> Dict[str, float]:
+        """
+        the item totals by the category of depth 1, which is not the first one of the trie's paths for categories
+        starting at depth 0. Items without a category of depth 1 count as 'none'
+        """
         category_sums: Dict[str, float] = dict()
         category_sums['none'] = 0
 
         for order in self.orders:
             for item in order.items:
-
-                if not item.category:
-                    category_sums['none'] += item.price
-                    continue
-
-                if item.category[1] not in category_sums.keys():
-                    category_sums[item.category[1]] = 0
-                category_sums[item.category[1]] = category_sums[item.category[1]] + item.price
+                name = next((name for depth, name in item.category_pairs if depth == 1), 'none')
+                category_sums[name] = category_sums.get(name, 0) + item.price
 
         return category_sums
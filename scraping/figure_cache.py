@@ -0,0 +1,121 @@
+"""
+persists the rendered dashboard (the layout with all figures as json and the monthly cube)
+keyed by a fingerprint of the orders file, so a restart with unchanged orders serves without evaluating them again
+"""
+# pylint: disable=W1203
+import glob
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from plotly.utils import PlotlyJSONEncoder
+from termcolor import colored
+
+from . import file_handler
+from .classification import RULES_FILE_NAME
+from .cube import MonthlyCube
+
+CACHE_DIRECTORY: str = os.path.join('.cache', 'dashboard')
+
+# has to be increased whenever the cached structure or the dashboard layout changes
+CACHE_FORMAT: int = 2
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedDashboard:
+    """ a cache entry """
+    page: str  # the whole dashboard layout serialized as json, figures included
+    cube: MonthlyCube  # answers the dashboard filters
+
+
+def from_plotly_json(value: Any) -> Any:
+    """ rebuilds dash components from their json representation, the reverse of serializing them """
+    if isinstance(value, list):
+        return [from_plotly_json(element) for element in value]
+    if isinstance(value, dict) and {'type', 'namespace', 'props'} <= value.keys():
+        component_class = getattr(importlib.import_module(value['namespace']), value['type'])
+        return component_class(**{name: from_plotly_json(prop) for name, prop in value['props'].items()})
+    return value
+
+
+def file_signature(path: str) -> str:
+    """ :returns size and modification time of the file, which change whenever it is written """
+    try:
+        stat = os.stat(path)
+        return f'{stat.st_size}:{stat.st_mtime_ns}'
+    except FileNotFoundError:
+        return 'missing'
+
+
+class FigureCache:
+    """
+    one cache entry per fingerprint of the orders file (path, size and modification time) and the classification
+    rules. Only the newest entry is kept
+    """
+
+    def __init__(self, orders_path: str, variant: str = '', directory: str = CACHE_DIRECTORY) -> None:
+        """
+        :param orders_path: the orders file the dashboard is built from
+        :param variant: options changing the rendered dashboard, e.g. whether WebGL is used
+        """
+        self.orders_path = os.path.abspath(orders_path)
+        self.variant = variant
+        self.directory = file_handler.to_file_path(directory)
+
+    def fingerprint(self, orders_signature: Optional[str] = None) -> Optional[str]:
+        """
+        :param orders_signature: the file_signature of the orders file, its current one by default
+        :returns the key for the state of the orders file, None if there is no orders file
+        """
+        if not os.path.exists(self.orders_path):
+            return None
+        if orders_signature is None:
+            orders_signature = file_signature(self.orders_path)
+        key = '|'.join([str(CACHE_FORMAT), self.orders_path, orders_signature,
+                        file_signature(file_handler.to_file_path(RULES_FILE_NAME)), self.variant])
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _entry_path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f'{fingerprint}.pickle')
+
+    def load(self) -> Optional[CachedDashboard]:
+        """ :returns the cached dashboard for the current orders file or None if there is none """
+        fingerprint = self.fingerprint()
+        if fingerprint is None or not os.path.exists(self._entry_path(fingerprint)):
+            return None
+        try:
+            with open(self._entry_path(fingerprint), 'rb') as file:
+                cached: CachedDashboard = pickle.load(file)
+            return cached
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError) as error:
+            LOGGER.warning(colored(f'dashboard cache entry {fingerprint} unreadable: {error}', 'yellow'))
+            return None
+
+    def save(self, orders_signature: str, page: Any, cube: MonthlyCube) -> None:
+        """
+        stores the dashboard and removes all older entries
+        :param orders_signature: the file_signature of the orders file taken before the orders shown by the dashboard
+        were loaded. If the file changed meanwhile the entry is never used instead of showing old orders for it
+        """
+        fingerprint = self.fingerprint(orders_signature)
+        if fingerprint is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entry = CachedDashboard(json.dumps(page, cls=PlotlyJSONEncoder), cube)
+
+        temporary_path = self._entry_path(fingerprint) + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self._entry_path(fingerprint))
+
+        for path in glob.glob(os.path.join(self.directory, '*.pickle')):
+            if path != self._entry_path(fingerprint):
+                os.remove(path)
+        LOGGER.info(colored(f'dashboard cached as {fingerprint}', 'blue'))
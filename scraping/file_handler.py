@@ -9,6 +9,7 @@ from typing import List, Iterable
 
 from termcolor import colored
 
+from . import order_store, serialization
 from .data import Order
 
 LOGGER = logging.getLogger(__name__)
@@ -28,16 +29,23 @@ def remove_file(file_name: str) -> bool:
 
 
 def load_orders(file_name: str = 'orders.json') -> List[Order]:
-    """ load all orders found in file_name """
-    data = read_json_file(file_name)
-    if not data:
+    """ load all orders found in file_name, which may be json or binary """
+    path = to_file_path(file_name)
+    if not os.path.exists(path):
+        LOGGER.warning(colored(f"{file_name} not found", 'yellow'))
         return []
+    return serialization.read_orders(path)
 
-    orders = []
-    for order_dict in data:
-        orders.append(Order.from_dict(order_dict))
 
-    return orders
+def save_orders(orders: Iterable[Order], file_name: str = 'orders.json') -> None:
+    """
+    writes all orders to file_name one by one, an existing file gets replaced once all are written. File names ending
+    with .bin are written in the binary format, those ending with .store as order store
+    """
+    if file_name.endswith(order_store.SUFFIX):
+        order_store.write_store(to_file_path(file_name), orders)
+    else:
+        serialization.write_orders(to_file_path(file_name), orders)
 
 
 def load_password(file_name: str = 'pw.txt') -> str:
@@ -52,11 +60,17 @@ def load_password(file_name: str = 'pw.txt') -> str:
 
 
 def save_file(file_name: str, data: str) -> None:
-    """ writes a file, if a file with file_name already exists its content gets overwritten """
+    """
+    writes a file, if a file with file_name already exists its content gets overwritten. The data is written to a
+    temporary file first which then replaces the file, so readers (e.g. the dashboard while a scrape is running)
+    always see either the old or the new content
+    """
     package_directory = os.path.dirname(os.path.abspath(__file__))
     path = os.path.join(package_directory, '..', file_name)
-    with open(path, 'w') as file:
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as file:
         file.write(data)
+    os.replace(temporary_path, path)
 
 
 def read_json_file(file_name: str) -> Iterable:
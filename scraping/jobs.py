@@ -0,0 +1,133 @@
+"""
+runs long tasks like scraping as background jobs, which can be listed, inspected and cancelled by id
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+from termcolor import colored
+
+from scraping.CustomExceptions import ScrapeCancelled
+
+LOGGER = logging.getLogger(__name__)
+
+# a job reports its progress to listeners in steps of this size, e.g. every 10%
+PROGRESS_STEP: float = 0.1
+
+
+class JobState(Enum):
+    RUNNING = 'running'
+    CANCELLING = 'cancelling'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    """ a task running in its own thread """
+    job_id: int
+    description: str
+    state: JobState = JobState.RUNNING
+    progress: float = 0.0  # 0 to 1
+    detail: str = ''  # e.g. rates and remaining time reported by the task
+    started: datetime.datetime = field(default_factory=datetime.datetime.now)
+    finished: Optional[datetime.datetime] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    thread: Optional[threading.Thread] = field(default=None, repr=False)
+
+    @property
+    def is_running(self) -> bool:
+        return self.state in (JobState.RUNNING, JobState.CANCELLING)
+
+    @property
+    def duration(self) -> datetime.timedelta:
+        return (self.finished or datetime.datetime.now()) - self.started
+
+
+# a task gets the event signalling its cancellation and a callback to report its progress (0 to 1) with details
+ProgressCallback = Callable[[float, str], None]
+Task = Callable[[threading.Event, ProgressCallback], None]
+
+
+class JobManager:
+    """
+    starts tasks in daemon threads and keeps track of them. Listeners get notified about progress steps and the end
+    of a job from the job's thread
+    """
+
+    def __init__(self, listener: Optional[Callable[[Job, str], None]] = None) -> None:
+        self.listener = listener
+        self._jobs: Dict[int, Job] = dict()
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def submit(self, description: str, task: Task) -> Job:
+        with self._lock:
+            job = Job(self._next_id, description)
+            self._jobs[job.job_id] = job
+            self._next_id += 1
+        job.thread = threading.Thread(target=self._run, args=(job, task), name=f'job-{job.job_id}', daemon=True)
+        job.thread.start()
+        LOGGER.info(colored(f'job {job.job_id} started: {description}', 'blue'))
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def running(self) -> List[Job]:
+        return [job for job in self.jobs() if job.is_running]
+
+    def cancel(self, job_id: int) -> bool:
+        """ asks the job to stop, it ends at the next point the task checks for cancellation. :returns False if the
+        job does not exist or has ended already """
+        job = self.get(job_id)
+        if job is None or not job.is_running:
+            return False
+        job.state = JobState.CANCELLING
+        job.cancel_event.set()
+        LOGGER.info(colored(f'job {job_id} cancelling', 'blue'))
+        return True
+
+    def _run(self, job: Job, task: Task) -> None:
+        def report_progress(progress: float, detail: str = '') -> None:
+            self._update_progress(job, progress, detail)
+
+        try:
+            task(job.cancel_event, report_progress)
+            job.state = JobState.DONE
+            job.progress = 1.0
+        except ScrapeCancelled:
+            job.state = JobState.CANCELLED
+        except Exception as error:  # pylint: disable=W0703
+            # whatever went wrong is reported through the job instead of killing the interactive session
+            job.state = JobState.FAILED
+            job.error = repr(error)
+            LOGGER.exception(f'job {job.job_id} failed')
+        finally:
+            job.finished = datetime.datetime.now()
+            self._notify(job, f'{job.state.value} after {str(job.duration).split(".")[0]}'
+                              + (f': {job.error}' if job.error else ''))
+
+    def _update_progress(self, job: Job, progress: float, detail: str) -> None:
+        previous_step = int(job.progress / PROGRESS_STEP)
+        job.progress = progress
+        job.detail = detail
+        if int(progress / PROGRESS_STEP) > previous_step:
+            self._notify(job, detail or f'{progress * 100:.0f}%')
+
+    def _notify(self, job: Job, message: str) -> None:
+        if self.listener is not None:
+            self.listener(job, message)
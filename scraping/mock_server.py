@@ -0,0 +1,431 @@
+"""
+a local HTTP server imitating the amazon.de pages the scraper reads, generated from synthetic orders, e.g. to benchmark
+whole scrapes without an account
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import collections
+import datetime
+import html
+import logging
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from termcolor import colored
+
+from . import synthetic
+from . import utils as ut
+from .data import Item, Order
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 8060
+
+# orders per page of the order list, as on amazon.de
+PAGE_SIZE: int = 10
+
+# share of items whose price is only shown on the order details page
+DETAILS_PRICE_SHARE: float = 0.1
+
+SESSION_COOKIE: str = 'session-id'
+
+PAGE = '''<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+<!-- {padding} -->
+</body></html>
+'''
+
+
+@dataclass
+class MockSettings:
+    """ how the server behaves, every page kind gets the same latency and failures """
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # up to this many seconds added at random
+    error_rate: float = 0.0  # share of pages answered with an error page (503)
+    captcha_rate: float = 0.0  # share of pages answered with a captcha
+    max_rate: Optional[float] = None  # pages per second, beyond that every page is an error page
+    padding: int = 0  # bytes added to every page, real pages have a few 100 KB
+    email: Optional[str] = None  # the only credentials accepted, any if not set
+    password: Optional[str] = None
+    seed: int = 0
+
+
+@dataclass
+class MockStatistics:
+    requests: Dict[str, int] = field(default_factory=collections.Counter)  # by page kind, e.g. 'product'
+    errors: int = 0
+    captchas: int = 0
+    bytes_sent: int = 0
+    seconds: float = 0.0  # spent answering, including the latency
+
+    def as_dict(self) -> Dict:
+        total = sum(self.requests.values())
+        return {'requests': dict(self.requests), 'total': total, 'errors': self.errors, 'captchas': self.captchas,
+                'bytes_sent': self.bytes_sent,
+                'mean_latency': round(self.seconds / total, 4) if total else 0.0}
+
+
+def format_price(price: float) -> str:
+    """ e.g. 'EUR 1234,50' as parsed by the scraper """
+    return f'EUR {price:.2f}'.replace('.', ',')
+
+
+def format_date(date: datetime.date) -> str:
+    """ e.g. '4. September 2018' """
+    return f'{date.day}. {ut.MONTHS[date.month - 1]} {date.year}'
+
+
+def asin(item: Item) -> str:
+    return item.link.rstrip('/').rsplit('/', 1)[-1]
+
+
+class MockAmazon:
+    """ the shop state: synthetic orders, sessions and the pages built from them """
+
+    def __init__(self, orders: List[Order], settings: Optional[MockSettings] = None) -> None:
+        self.settings = settings if settings is not None else MockSettings()
+        # newest first, like the order list
+        self.orders = sorted(orders, key=lambda order: order.date, reverse=True)
+        self.orders_by_id: Dict[str, Order] = {order.order_id: order for order in self.orders}
+        self.items_by_asin: Dict[str, Item] = {asin(item): item for order in self.orders for item in order.items}
+        rng = random.Random(self.settings.seed)
+        self.details_price_ids = {id(item) for order in self.orders for item in order.items
+                                  if rng.random() < DETAILS_PRICE_SHARE}
+        self.sessions: set = set()
+        self.statistics = MockStatistics()
+        self._rng = random.Random(self.settings.seed + 1)
+        self._recent: Deque[float] = collections.deque()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def generate(count: int, years: int = 3, settings: Optional[MockSettings] = None) -> MockAmazon:
+        """ a shop with `count` synthetic orders spread over the last `years` years up to today """
+        settings = settings if settings is not None else MockSettings()
+        today = datetime.date.today()
+        return MockAmazon(synthetic.generate_orders(count, settings.seed, datetime.date(today.year - years + 1, 1, 1),
+                                                    today), settings)
+
+    def sign_in(self, email: str, password: str) -> Optional[str]:
+        """ :returns a new session id, None if the credentials are wrong """
+        if self.settings.email is not None and email != self.settings.email:
+            return None
+        if self.settings.password is not None and password != self.settings.password:
+            return None
+        session = secrets.token_hex(8)
+        with self._lock:
+            self.sessions.add(session)
+        return session
+
+    def disturbance(self) -> Optional[str]:
+        """ :returns 'error' or 'captcha' if the next page is not answered regularly """
+        now = time.monotonic()
+        with self._lock:
+            self._recent.append(now)
+            while self._recent and self._recent[0] < now - 1:
+                self._recent.popleft()
+            if self.settings.max_rate is not None and len(self._recent) > self.settings.max_rate:
+                return 'error'
+            chance = self._rng.random()
+        if chance < self.settings.error_rate:
+            return 'error'
+        if chance < self.settings.error_rate + self.settings.captcha_rate:
+            return 'captcha'
+        return None
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.settings.latency + self._rng.random() * self.settings.jitter
+
+    # pages, each returns title and body
+
+    @staticmethod
+    def home_page() -> Tuple[str, str]:
+        return 'Amazon.de: Günstige Preise', '<a href="/gp/css/order-history">Meine Bestellungen</a>'
+
+    @staticmethod
+    def signin_page(failed: bool = False) -> Tuple[str, str]:
+        error = '<div class="a-alert-content">Es gab ein Problem</div>' if failed else ''
+        return 'Amazon Anmelden', f'''{error}
+<form name="signIn" method="post" action="/ap/signin">
+  <input type="email" id="ap_email" name="email">
+  <input type="password" id="ap_password" name="password">
+  <input type="checkbox" name="rememberMe" value="true">
+  <input type="submit" id="signInSubmit" value="Anmelden">
+</form>'''
+
+    @staticmethod
+    def error_page() -> Tuple[str, str]:
+        return 'Tut uns Leid!', '<h1>Tut uns Leid! Ein Fehler ist aufgetreten.</h1>'
+
+    @staticmethod
+    def captcha_page() -> Tuple[str, str]:
+        return 'Amazon.de', '''<form method="get" action="/errors/validateCaptcha">
+  <img src="/captcha.jpg"><input type="text" id="captchacharacters" name="field-keywords">
+</form>'''
+
+    def order_history_page(self, filter_index: int, start_index: int) -> Tuple[str, str]:
+        """ :param filter_index: 0 last 30 days, 1 last 3 months, 2 this year, 3 last year and so on """
+        today = datetime.date.today()
+        if filter_index == 0:
+            orders = [order for order in self.orders if order.date >= today - datetime.timedelta(days=30)]
+        elif filter_index == 1:
+            orders = [order for order in self.orders if order.date >= today - datetime.timedelta(days=91)]
+        else:
+            year = today.year - (filter_index - 2)
+            orders = [order for order in self.orders if order.date.year == year]
+
+        filters = '\n'.join(f'    <li><a id="orderFilter_{index}" href="/gp/css/order-history?orderFilter={index}">'
+                            f'{self._filter_name(index)}</a></li>' for index in range(2 + today.year - 2010 + 1))
+        body = f'''<span id="a-autoid-1-announce" class="a-button-text">{self._filter_name(filter_index)}</span>
+<ul class="a-nostyle a-list-link">
+{filters}
+</ul>
+<span class="num-orders">{len(orders)} Bestellungen</span>
+'''
+        if not orders:
+            return 'Meine Bestellungen', body + '<div>Sie haben in diesem Zeitraum keine Bestellungen aufgegeben.</div>'
+
+        page = orders[start_index:start_index + PAGE_SIZE]
+        body += '\n'.join(self._order_box(order) for order in page)
+        if len(orders) > PAGE_SIZE:
+            body += self._pagination(filter_index, start_index, len(orders))
+        return 'Meine Bestellungen', body
+
+    def order_details_page(self, order_id: str) -> Optional[Tuple[str, str]]:
+        order = self.orders_by_id.get(order_id)
+        if order is None:
+            return None
+        shipments = '\n'.join(f'''  <div class="a-row">{html.escape(item.title)}
+    <span class="a-size-small a-color-price">{format_price(item.price)}</span></div>''' for item in order.items)
+        return 'Bestelldetails', f'''<h1>Bestelldetails</h1>
+<div class="a-box-group od-shipments">
+{shipments}
+</div>'''
+
+    def product_page(self, product_asin: str) -> Optional[Tuple[str, str]]:
+        item = self.items_by_asin.get(product_asin)
+        if item is None:
+            return None
+        title = html.escape(item.title)
+        categories = [item.category[depth] for depth in sorted(item.category)]
+        if categories and categories[-1] == 'movie':
+            genres = ', '.join(html.escape(category) for category in categories[:-1])
+            return title, f'''<h1>{title}</h1>
+<div class="dv-dp-node-meta-info"><div>Genres {genres}</div>
+<div>Untertitel Deutsch</div></div>'''
+        if categories:
+            separator = '<li><span class="a-list-item">›</span></li>'
+            crumbs = separator.join(f'<li><span class="a-list-item"><a href="#">{html.escape(category)}</a></span></li>'
+                                    for category in categories)
+            return title, f'''<div id="wayfinding-breadcrumbs_container"><ul class="a-unordered-list">{crumbs}</ul></div>
+<h1>{title}</h1>'''
+        return title, f'<h1>{title}</h1>'
+
+    def _order_box(self, order: Order) -> str:
+        items = '\n'.join(self._item_box(order, item) for item in order.items)
+        return f'''<div class="a-box-group a-spacing-base order">
+  <div class="a-box a-color-offset-background order-info">
+    <span class="a-color-secondary value">{format_date(order.date)}</span>
+    <span class="a-color-secondary value">{format_price(order.price)}</span>
+    <span class="a-color-secondary value">Max Mustermann</span>
+    <span class="a-color-secondary value">{order.order_id}</span>
+    <a class="a-link-normal" href="/gp/your-account/order-details?orderID={order.order_id}">Bestelldetails</a>
+  </div>
+  <div class="a-box shipment">
+{items}
+  </div>
+</div>'''
+
+    def _item_box(self, order: Order, item: Item) -> str:
+        price = '' if id(item) in self.details_price_ids or order.order_id.startswith('D01') else \
+            f'\n      <div class="a-row"><span class="a-size-small a-color-price">{format_price(item.price)}</span></div>'
+        return f'''    <div class="a-fixed-left-grid">
+      <div class="a-fixed-left-grid-col a-col-right">
+      <div class="a-row"><a class="a-link-normal" href="/gp/product/{asin(item)}">{html.escape(item.title)}</a></div>
+      <div class="a-row"><span class="a-size-small">Verkauf durch: {html.escape(item.seller)}</span></div>{price}
+      </div>
+    </div>'''
+
+    @staticmethod
+    def _pagination(filter_index: int, start_index: int, total: int) -> str:
+        link = '/gp/css/order-history?orderFilter={}&amp;startIndex={}'
+        previous = '<li class="a-disabled">←Zurück</li>' if start_index == 0 else \
+            f'<li><a href="{link.format(filter_index, max(start_index - PAGE_SIZE, 0))}">←Zurück</a></li>'
+        following = '<li class="a-disabled a-last">Weiter→</li>' if start_index + PAGE_SIZE >= total else \
+            f'<li class="a-last"><a href="{link.format(filter_index, start_index + PAGE_SIZE)}">Weiter→</a></li>'
+        return f'\n<ul class="a-pagination">{previous}{following}</ul>'
+
+    @staticmethod
+    def _filter_name(index: int) -> str:
+        if index == 0:
+            return 'letzte 30 Tage'
+        if index == 1:
+            return 'letzte 3 Monate'
+        return str(datetime.date.today().year - (index - 2))
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """ routes the requests to the pages of server.shop """
+    server: MockServer
+
+    def do_GET(self) -> None:  # pylint: disable=C0103
+        self._answer('GET')
+
+    def do_POST(self) -> None:  # pylint: disable=C0103
+        self._answer('POST')
+
+    def log_message(self, format: str, *args: object) -> None:  # pylint: disable=W0622
+        LOGGER.debug(f'{self.address_string()} {format % args}')
+
+    def _answer(self, method: str) -> None:
+        started = time.monotonic()
+        shop = self.server.shop
+        time.sleep(shop.delay())
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        kind = self._kind(url.path)
+
+        disturbance = shop.disturbance() if kind not in ('signin', 'other') else None
+        if disturbance == 'error':
+            self._send_page(shop.error_page(), kind, started, status=503)
+            return
+        if disturbance == 'captcha':
+            self._send_page(shop.captcha_page(), kind, started, captcha=True)
+            return
+
+        if kind == 'signin':
+            self._sign_in(method, started)
+        elif kind == 'home':
+            self._send_page(shop.home_page(), kind, started)
+        elif kind == 'product':
+            self._send_page(shop.product_page(url.path.rstrip('/').rsplit('/', 1)[-1]), kind, started)
+        elif not self._signed_in():
+            self._redirect('/ap/signin', kind, started)
+        elif kind == 'orders':
+            self._send_page(shop.order_history_page(int(query.get('orderFilter', 1)),
+                                                    int(query.get('startIndex', 0))), kind, started)
+        elif kind == 'details':
+            self._send_page(shop.order_details_page(query.get('orderID', '')), kind, started)
+        else:
+            self._send_page(None, kind, started)
+
+    @staticmethod
+    def _kind(path: str) -> str:
+        if path == '/':
+            return 'home'
+        if path.startswith('/ap/signin'):
+            return 'signin'
+        if path.startswith('/gp/css/order-history'):
+            return 'orders'
+        if path.startswith('/gp/your-account/order-details'):
+            return 'details'
+        if path.startswith('/gp/product/'):
+            return 'product'
+        return 'other'
+
+    def _sign_in(self, method: str, started: float) -> None:
+        shop = self.server.shop
+        if method == 'GET':
+            self._send_page(shop.signin_page(), 'signin', started)
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        session = shop.sign_in(form.get('email', ''), form.get('password', ''))
+        if session is None:
+            self._send_page(shop.signin_page(failed=True), 'signin', started)
+        else:
+            self._redirect('/gp/css/order-history', 'signin', started,
+                           {'Set-Cookie': f'{SESSION_COOKIE}={session}; Path=/'})
+
+    def _signed_in(self) -> bool:
+        cookies = dict(cookie.strip().split('=', 1) for cookie in self.headers.get('Cookie', '').split(';')
+                       if '=' in cookie)
+        return cookies.get(SESSION_COOKIE) in self.server.shop.sessions
+
+    def _redirect(self, location: str, kind: str, started: float, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(302)
+        self.send_header('Location', location)
+        for name, value in (headers or dict()).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        self._count(kind, 0, started)
+
+    def _send_page(self, page: Optional[Tuple[str, str]], kind: str, started: float, status: int = 200,
+                   captcha: bool = False) -> None:
+        if page is None:
+            status, page = 404, ('Seite nicht gefunden', '<h1>Seite nicht gefunden</h1>')
+        title, body = page
+        content = PAGE.format(title=html.escape(title), body=body,
+                              padding='x' * self.server.shop.settings.padding).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        self._count(kind, len(content), started, error=status >= 500, captcha=captcha)
+
+    def _count(self, kind: str, size: int, started: float, error: bool = False, captcha: bool = False) -> None:
+        statistics = self.server.shop.statistics
+        with self.server.lock:
+            statistics.requests[kind] += 1
+            statistics.errors += error
+            statistics.captchas += captcha
+            statistics.bytes_sent += size
+            statistics.seconds += time.monotonic() - started
+
+
+class MockServer(ThreadingHTTPServer):
+    """ serves a MockAmazon, one thread per connection """
+    daemon_threads = True
+
+    def __init__(self, shop: MockAmazon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        """ :param port: 0 for any free port """
+        super().__init__((host, port), MockRequestHandler)
+        self.shop = shop
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f'http://{host}:{port}'
+
+    def start(self) -> MockServer:
+        """ serves in a background thread """
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-server', daemon=True)
+        self._thread.start()
+        LOGGER.info(colored(f'mock server listening on {self.base_url}', 'blue'))
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(orders: int = 500, years: int = 3, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+         settings: Optional[MockSettings] = None) -> None:
+    """ serves until Ctrl-C """
+    server = MockServer(MockAmazon.generate(orders, years, settings), host, port)
+    print(f'Serving {orders} synthetic orders on {server.base_url}, scrape them with --base-url {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(server.shop.statistics.as_dict())
@@ -0,0 +1,316 @@
+"""
+a read-only store of orders in one binary file with a fixed layout, read through mmap. Orders are decoded only when
+accessed, ranges of dates are found by binary search, so opening even a very large history takes no time.
+Only OrderStore itself reads lazily: load_orders, and with it the dashboard and the reports, decode all orders of a
+store like those of any other orders file
+"""
+from __future__ import annotations
+
+import bisect
+import datetime
+import hashlib
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from .data import Item, Order
+
+# files with this suffix are saved as order store
+SUFFIX: str = '.store'
+
+MAGIC: bytes = b'AOHS'
+VERSION: int = 2
+
+# chunks of this many bytes at least are written at once
+WRITE_BUFFER: int = 1024 * 1024
+
+# magic, version, number of orders, strings and categories and the offsets of the sections:
+# dates      the date of every order as ordinal, sorted
+# index      offset of the record and price in cents of every order, in the order of the dates
+# ids        hash of the order id and position in the dates of every order, sorted by hash
+# strings    offsets into the following utf-8 text of all sellers, tags and category names, id 0 is None
+# categories offsets into the following (depth, name id) pairs of all categories, id 0 is no category
+# records    the order id and items of every order, right after the header as they are written first
+_HEADER = struct.Struct('<4sB3xQQQQQQQQQ')
+_DATE = struct.Struct('<i')
+_INDEX = struct.Struct('<Qq')
+_ID = struct.Struct('<QI')
+_OFFSET = struct.Struct('<Q')
+_DEPTH = struct.Struct('<hI')
+_LENGTH = struct.Struct('<I')
+_ITEM_COUNT = struct.Struct('<H')
+_ITEM_FIELDS = struct.Struct('<qIII')  # price in cents, seller id, category id, tag id
+
+
+def order_id_hash(order_id: str) -> int:
+    """ a hash of the order id that is the same in every process, unlike hash() """
+    return int.from_bytes(hashlib.blake2b(order_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def write_store(path: str, orders: Iterable[Order]) -> int:
+    """
+    writes the orders as store to a temporary file which then replaces path. Orders with the same id are stored once.
+    The records are written in chunks while they are encoded, only the fixed size index and the tables of strings and
+    categories are kept until the end
+    :returns the number of stored orders
+    """
+    unique: Dict[str, Order] = {order.order_id: order for order in orders}
+    ordered = sorted(unique.values(), key=lambda order: (order.date, order.order_id))
+
+    strings: Dict[str, int] = dict()
+    categories: Dict[Tuple[Tuple[int, str], ...], int] = {(): 0}
+
+    def string_id(value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        return strings.setdefault(value, len(strings) + 1)
+
+    def category_id(pairs: Tuple[Tuple[int, str], ...]) -> int:
+        if pairs not in categories:
+            for _, name in pairs:
+                string_id(name)
+            categories[pairs] = len(categories)
+        return categories[pairs]
+
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        # the header is written again once the offsets of the sections are known
+        records_offset = _aligned(_HEADER.size)
+        file.write(b'\0' * records_offset)
+        index = bytearray()
+        records = bytearray()
+        written = 0
+        for order in ordered:
+            index += _INDEX.pack(written + len(records), order.cents)
+            _append_string(records, order.order_id)
+            records += _ITEM_COUNT.pack(len(order.items))
+            for item in order.items:
+                records += _ITEM_FIELDS.pack(item.cents, string_id(item.seller), category_id(item.category_pairs),
+                                             string_id(item.tag))
+                _append_string(records, item.link)
+                _append_string(records, item.title)
+            if len(records) >= WRITE_BUFFER:
+                written += file.write(records)
+                records = bytearray()
+        written += file.write(records)
+
+        dates = b''.join(_DATE.pack(order.date.toordinal()) for order in ordered)
+        ids = b''.join(_ID.pack(*entry) for entry in sorted((order_id_hash(order.order_id), position)
+                                                             for position, order in enumerate(ordered)))
+        string_section = _table([value.encode('utf-8') for value in strings])
+        category_section = _table([b''.join(_DEPTH.pack(depth, strings[name]) for depth, name in pairs)
+                                   for pairs in categories])
+        sections: List[Union[bytes, bytearray]] = [dates, index, ids, string_section, category_section]
+        offsets: List[int] = []
+        for section in sections:
+            offsets.append(_aligned(file.tell()))
+            file.write(b'\0' * (offsets[-1] - file.tell()))
+            file.write(section)
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, VERSION, len(ordered), len(strings), len(categories), *offsets,
+                                records_offset))
+    os.replace(temporary_path, path)
+    return len(ordered)
+
+
+def _append_string(record: bytearray, value: str) -> None:
+    encoded = value.encode('utf-8')
+    record += _LENGTH.pack(len(encoded))
+    record += encoded
+
+
+def _table(entries: List[bytes]) -> bytes:
+    """ :returns the offsets of the entries (one more than entries, the last one is the end) and the entries """
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    return b''.join(_OFFSET.pack(offset) for offset in offsets) + b''.join(entries)
+
+
+def _aligned(position: int) -> int:
+    return (position + 7) // 8 * 8
+
+
+class _Column(Sequence[int]):
+    """ the first field of fixed size entries in the mapped file, e.g. for bisect """
+
+    def __init__(self, data: mmap.mmap, offset: int, entry: struct.Struct, count: int) -> None:
+        self.data = data
+        self.offset = offset
+        self.entry = entry
+        self._length = count
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[int]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, Sequence[int]]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self._length))]
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        value: int = self.entry.unpack_from(self.data, self.offset + index * self.entry.size)[0]
+        return value
+
+
+class OrderStore(Sequence[Order]):
+    """
+    the orders of a store file sorted by date. Only the header is read when opening, every access reads just the
+    bytes of the orders it returns. Sellers, tags, categories and dates are decoded once and shared by all orders
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count: int
+        self._string_count: int
+        self._category_count: int
+        self._dates_offset: int
+        self._index_offset: int
+        self._ids_offset: int
+        self._strings_offset: int
+        self._categories_offset: int
+        self._records_offset: int
+        try:
+            magic, version, self._count, self._string_count, self._category_count, self._dates_offset, \
+                self._index_offset, self._ids_offset, self._strings_offset, self._categories_offset, \
+                self._records_offset = _HEADER.unpack_from(self._data)
+        except struct.error:
+            self._data.close()
+            raise ValueError(f'{path} is no order store')
+        if magic != MAGIC or version != VERSION:
+            self._data.close()
+            raise ValueError(f'{path} is no order store of version {VERSION}')
+        self._dates = _Column(self._data, self._dates_offset, _DATE, self._count)
+        self._hashes = _Column(self._data, self._ids_offset, _ID, self._count)
+        self._strings: Dict[int, str] = dict()
+        self._categories: Dict[int, Dict[int, str]] = {0: dict()}
+        self._decoded_dates: Dict[int, datetime.date] = dict()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> OrderStore:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @overload
+    def __getitem__(self, index: int) -> Order: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Order]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Order, List[Order]]:
+        if isinstance(index, slice):
+            return [self._order(position) for position in range(*index.indices(self._count))]
+        position = index + self._count if index < 0 else index
+        if not 0 <= position < self._count:
+            raise IndexError(index)
+        return self._order(position)
+
+    def __iter__(self) -> Iterator[Order]:
+        return (self._order(position) for position in range(self._count))
+
+    def positions(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> range:
+        """ :returns the positions of the orders from start to end (inclusive), found by binary search on the dates """
+        first = bisect.bisect_left(self._dates, start.toordinal()) if start is not None else 0
+        last = bisect.bisect_right(self._dates, end.toordinal()) if end is not None else self._count
+        return range(first, max(first, last))
+
+    def between(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> Iterator[Order]:
+        """ :returns the orders from start to end (inclusive) by date, the orders outside are not read at all """
+        return (self._order(position) for position in self.positions(start, end))
+
+    def total(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None) -> float:
+        """ :returns the summed price of the orders from start to end from the index, without decoding them """
+        positions = self.positions(start, end)
+        index = self._data[self._index_offset + positions.start * _INDEX.size:
+                           self._index_offset + positions.stop * _INDEX.size]
+        cents: int = sum(cents for _, cents in _INDEX.iter_unpack(index))
+        return cents / 100
+
+    def get(self, order_id: str) -> Optional[Order]:
+        """ :returns the order with the id, None if there is none """
+        wanted = order_id_hash(order_id)
+        slot = bisect.bisect_left(self._hashes, wanted)
+        while slot < self._count:
+            hashed, position = _ID.unpack_from(self._data, self._ids_offset + slot * _ID.size)
+            if hashed != wanted:
+                break
+            if self._order_id(position) == order_id:
+                return self._order(position)
+            slot += 1
+        return None
+
+    def _record_offset(self, position: int) -> int:
+        offset: int = _INDEX.unpack_from(self._data, self._index_offset + position * _INDEX.size)[0]
+        return self._records_offset + offset
+
+    def _order_id(self, position: int) -> str:
+        return self._read_string(self._record_offset(position))[0]
+
+    def _order(self, position: int) -> Order:
+        offset, cents = _INDEX.unpack_from(self._data, self._index_offset + position * _INDEX.size)
+        order_id, offset = self._read_string(self._records_offset + offset)
+        item_count, = _ITEM_COUNT.unpack_from(self._data, offset)
+        offset += _ITEM_COUNT.size
+        items: List[Item] = []
+        for _ in range(item_count):
+            item_cents, seller, category, tag = _ITEM_FIELDS.unpack_from(self._data, offset)
+            link, offset = self._read_string(offset + _ITEM_FIELDS.size)
+            title, offset = self._read_string(offset)
+            items.append(Item(item_cents / 100, link, title, self._string(seller), self._category(category),
+                              self._string(tag) if tag else None))
+        return Order(order_id, cents / 100, self._date(position), items)
+
+    def _read_string(self, offset: int) -> Tuple[str, int]:
+        """ :returns the string at offset and the offset after it """
+        length, = _LENGTH.unpack_from(self._data, offset)
+        start = offset + _LENGTH.size
+        return self._data[start:start + length].decode('utf-8'), start + length
+
+    def _date(self, position: int) -> datetime.date:
+        ordinal = self._dates[position]
+        date = self._decoded_dates.get(ordinal)
+        if date is None:
+            date = self._decoded_dates[ordinal] = datetime.date.fromordinal(ordinal)
+        return date
+
+    def _string(self, string_id: int) -> str:
+        """ :param string_id: the id of a string, starting with 1 """
+        if string_id not in self._strings:
+            start, end = self._table_entry(self._strings_offset, self._string_count, string_id - 1)
+            self._strings[string_id] = self._data[start:end].decode('utf-8')
+        return self._strings[string_id]
+
+    def _category(self, category_id: int) -> Dict[int, str]:
+        if category_id not in self._categories:
+            start, end = self._table_entry(self._categories_offset, self._category_count, category_id)
+            self._categories[category_id] = {depth: self._string(name)
+                                             for depth, name in _DEPTH.iter_unpack(self._data[start:end])}
+        return self._categories[category_id]
+
+    def _table_entry(self, table_offset: int, count: int, index: int) -> Tuple[int, int]:
+        """ :returns where entry index of a table with count entries starts and ends in the file """
+        start, = _OFFSET.unpack_from(self._data, table_offset + index * _OFFSET.size)
+        end, = _OFFSET.unpack_from(self._data, table_offset + (index + 1) * _OFFSET.size)
+        entries = table_offset + (count + 1) * _OFFSET.size
+        return entries + start, entries + end
+
+
+def is_store(path: str) -> bool:
+    """ :returns whether the file at path is an order store """
+    with open(path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
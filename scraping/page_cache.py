@@ -0,0 +1,252 @@
+"""
+caches product and order details pages on disk, compressed and keyed by a hash of their url, so repeated or resumed
+scrapes read them from disk instead of loading them again
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from termcolor import colored
+
+from . import file_handler
+
+CACHE_DIRECTORY: str = os.path.join('.cache', 'pages')
+
+PRODUCT: str = 'product'
+DETAILS: str = 'details'
+
+# seconds a page of the kind stays valid: products hardly ever change their categories and the prices of an order
+# are fixed once it got shipped
+TTLS: Dict[str, float] = {
+    PRODUCT: 90 * 24 * 3600,
+    DETAILS: 30 * 24 * 3600,
+}
+
+# bytes (compressed) the cache may take, the least recently used pages get removed beyond that
+MAX_BYTES: int = 256 * 1024 * 1024
+
+# query parameters only tracking where a link was clicked, they don't change the page
+TRACKING_PARAMETERS = ('ref', 'ref_', 'ie', 'psc', 'qid', 'sr', 'pd_rd_i', 'pd_rd_r', 'pf_rd_p', 'pf_rd_r')
+
+# scripts and styles are not needed to read a page again and take most of its size
+UNUSED_MARKUP = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# elements starting a new line in the text of an element, like in the browser
+BLOCK_TAGS = ('address', 'article', 'br', 'dd', 'div', 'dl', 'dt', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+              'li', 'ol', 'p', 'section', 'table', 'td', 'th', 'tr', 'ul')
+VOID_TAGS = ('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr')
+
+LOGGER = logging.getLogger(__name__)
+
+
+def page_key(url: str) -> str:
+    """ :returns the hash of the url without tracking parameters """
+    parsed = urlparse(url)
+    query = sorted((name, value) for name, value in parse_qsl(parsed.query) if name not in TRACKING_PARAMETERS)
+    # product links may end with a tracking path like /ref=ppx_yo_dt_b_asin_title_o00_s00
+    path = re.sub(r'/ref=[^/]*$', '', parsed.path)
+    return hashlib.sha256(f'{parsed.netloc}{path}?{urlencode(query)}'.encode()).hexdigest()
+
+
+class PageCache:
+    """
+    one zlib compressed file per page under directory/<first 2 characters of the key>/<key>. A page older than the
+    TTL of its kind counts as missing. Reading a page touches its file, so the modification times order the pages by
+    their last use for the eviction
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, ttls: Optional[Dict[str, float]] = None,
+                 max_bytes: int = MAX_BYTES, refresh: bool = False) -> None:
+        """
+        :param refresh: no page is read from the cache, the loaded pages replace the cached ones
+        """
+        self.directory = file_handler.to_file_path(directory)
+        self.ttls = ttls if ttls is not None else TTLS
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # computed on the first put
+
+    def get(self, kind: str, url: str) -> Optional[str]:
+        """ :returns the cached page source, None if the page is not cached, expired or refresh is set """
+        if self.refresh:
+            return None
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as file:
+                header, page = zlib.decompress(file.read()).decode('utf-8').split('\n', 1)
+            meta = json.loads(header)
+        except (OSError, ValueError, zlib.error):
+            self._count(hit=False)
+            return None
+
+        if meta.get('kind') != kind or time.time() - meta.get('fetched', 0) > self.ttls.get(kind, 0):
+            self._count(hit=False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return page
+
+    def put(self, kind: str, url: str, page: str) -> None:
+        header = json.dumps({'kind': kind, 'url': url, 'fetched': time.time()})
+        data = zlib.compress(f'{header}\n{UNUSED_MARKUP.sub("", page)}'.encode('utf-8'))
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f'{path}.{threading.get_ident()}.tmp'
+        with self._lock:
+            size = self._current_size()
+            try:
+                size -= os.path.getsize(path)
+            except OSError:
+                pass
+            with open(temporary_path, 'wb') as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+            self._size = size + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self) -> int:
+        """ removes all pages, :returns their number """
+        with self._lock:
+            removed = 0
+            for path, _, _ in self._files():
+                os.remove(path)
+                removed += 1
+            self._size = 0
+        return removed
+
+    def _path(self, url: str) -> str:
+        key = page_key(url)
+        return os.path.join(self.directory, key[:2], key)
+
+    def _files(self) -> List[Tuple[str, int, float]]:
+        """ :returns path, size and modification time of every cached page """
+        files: List[Tuple[str, int, float]] = []
+        if not os.path.isdir(self.directory):
+            return files
+        for sub_directory in os.scandir(self.directory):
+            if not sub_directory.is_dir():
+                continue
+            for entry in os.scandir(sub_directory.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._files())
+        return self._size
+
+    def _evict(self) -> None:
+        """ removes the least recently used pages until the cache takes at most 90% of max_bytes """
+        files = sorted(self._files(), key=lambda file: file[2])
+        size = sum(file[1] for file in files)
+        removed = 0
+        for path, file_size, _ in files:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
+            removed += 1
+        self._size = size
+        LOGGER.info(colored(f'page cache: {removed} least recently used pages removed', 'blue'))
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+class _ElementTexts(HTMLParser):
+    """ collects the text of every element with the id or class, with line breaks at block elements """
+
+    def __init__(self, element_id: Optional[str] = None, class_name: Optional[str] = None,
+                 within_id: Optional[str] = None, within_class: Optional[str] = None) -> None:
+        """ :param within_id, within_class: only elements inside an element with this id or class count """
+        super().__init__(convert_charrefs=True)
+        self.element_id = element_id
+        self.class_name = class_name
+        self.within_id = within_id
+        self.within_class = within_class
+        self.texts: List[str] = []
+        # per open element: its tag, whether it matches and whether it is a container
+        self._stack: List[Tuple[str, bool, bool]] = []
+        self._depth = 0  # matching elements currently open
+        self._within = 0  # containers currently open
+        self._text: List[str] = []
+
+    @property
+    def _restricted(self) -> bool:
+        return self.within_id is not None or self.within_class is not None
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in BLOCK_TAGS and self._depth:
+            self._text.append('\n')
+        if tag in VOID_TAGS:
+            return
+        attributes = dict(attrs)
+        classes = (attributes.get('class') or '').split()
+        container = (self.within_id is not None and attributes.get('id') == self.within_id) \
+            or (self.within_class is not None and self.within_class in classes)
+        matches = (not self._restricted or self._within > 0) and (
+            (self.element_id is not None and attributes.get('id') == self.element_id)
+            or (self.class_name is not None and self.class_name in classes))
+        self._stack.append((tag, matches, container))
+        self._within += container
+        if matches:
+            if not self._depth:
+                self._text = []
+            self._depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in VOID_TAGS or tag not in (entry[0] for entry in self._stack):
+            return
+        # elements left open (e.g. <li> without </li>) end with their parent
+        while True:
+            open_tag, matches, container = self._stack.pop()
+            self._within -= container
+            if open_tag in BLOCK_TAGS and self._depth:
+                self._text.append('\n')
+            if matches:
+                self._depth -= 1
+                if not self._depth:
+                    lines = (' '.join(line.split()) for line in ''.join(self._text).split('\n'))
+                    self.texts.append('\n'.join(line for line in lines if line))
+            if open_tag == tag:
+                return
+
+    def handle_data(self, data: str) -> None:
+        if self._depth:
+            self._text.append(data)
+
+
+def element_texts(page: str, element_id: Optional[str] = None, class_name: Optional[str] = None,
+                  within_id: Optional[str] = None, within_class: Optional[str] = None) -> List[str]:
+    """ :returns the texts of all elements with the id or class in the page, as the browser shows them """
+    parser = _ElementTexts(element_id, class_name, within_id, within_class)
+    parser.feed(page)
+    parser.close()
+    return parser.texts
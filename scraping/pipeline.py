@@ -0,0 +1,115 @@
+"""
+pipeline stages connected by bounded queues, each stage with its own worker threads
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import abc
+import logging
+import queue
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+LOGGER = logging.getLogger(__name__)
+
+# seconds a blocked put or get waits before checking whether the stage failed or got aborted
+POLL_INTERVAL: float = 0.2
+
+
+class StageWorker(abc.ABC, Generic[T]):
+    """ handles the items of a stage in one thread, e.g. with its own browser """
+
+    @abc.abstractmethod
+    def handle(self, item: T) -> None:
+        pass
+
+    def close(self) -> None:
+        """ releases the resources of the worker, called in its thread after the last item """
+
+
+class Stage(Generic[T]):
+    """
+    Items put into the stage are handled by `workers` threads, each with a worker created by create_worker in its
+    thread. The queue holds at most `capacity` items, put blocks while it is full, so a fast producer gets slowed down
+    to the speed of the stage (backpressure) instead of piling up items. With 0 workers put handles the item itself,
+    in the thread of the producer.
+    The first exception of a worker fails the stage: the other workers stop and put/close raise it
+    """
+
+    def __init__(self, name: str, create_worker: Callable[[], StageWorker[T]], workers: int = 1,
+                 capacity: int = 16) -> None:
+        self.name = name
+        self.create_worker = create_worker
+        self._queue: queue.Queue = queue.Queue(maxsize=max(capacity, 1))
+        self._threads: List[threading.Thread] = []
+        self._closing = threading.Event()
+        self._aborted = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._inline_worker: Optional[StageWorker[T]] = None
+
+        for index in range(workers):
+            thread = threading.Thread(target=self._run, name=f'{name}-{index}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def put(self, item: T) -> None:
+        """ hands the item to the stage, blocks while the queue is full """
+        if not self._threads:
+            if self._inline_worker is None:
+                self._inline_worker = self.create_worker()
+            self._inline_worker.handle(item)
+            return
+
+        while True:
+            self._raise_if_failed()
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> None:
+        """ waits until all items put so far are handled and the workers are closed """
+        self._stop()
+        self._raise_if_failed()
+
+    def abort(self) -> None:
+        """ stops the workers after their current item, queued items are dropped. Unlike close it does not raise the
+        error of a failed worker, e.g. while handling another error """
+        self._aborted.set()
+        self._stop()
+
+    def _stop(self) -> None:
+        self._closing.set()
+        for thread in self._threads:
+            thread.join()
+        if self._inline_worker is not None:
+            self._inline_worker.close()
+            self._inline_worker = None
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _run(self) -> None:
+        worker: Optional[StageWorker[T]] = None
+        try:
+            worker = self.create_worker()
+            while not self._aborted.is_set():
+                try:
+                    item = self._queue.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    if self._closing.is_set():
+                        return
+                    continue
+                worker.handle(item)
+        except BaseException as error:  # pylint: disable=W0703
+            if self._error is None:
+                self._error = error
+            LOGGER.warning(f'{threading.current_thread().name} failed: {error!r}')
+            self._aborted.set()
+        finally:
+            if worker is not None:
+                worker.close()
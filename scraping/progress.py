@@ -0,0 +1,198 @@
+"""
+progress of a scrape: smoothed throughput rates, the estimated amount of work and the remaining time
+"""
+from __future__ import annotations
+
+import datetime
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, TextIO
+
+# seconds after which an observation counts half as much for the rates, short enough to follow slowdowns by
+# throttling, long enough to smooth single slow product pages
+HALF_LIFE: float = 30.0
+
+# minimum seconds between two notifications of the observer, i.e. at most 4 terminal redraws per second
+REFRESH_INTERVAL: float = 0.25
+
+
+class SmoothedRate:
+    """
+    events per second, exponentially weighted by age. Counts and elapsed time decay with the same factor, so a burst
+    after a long pause does not produce an absurd rate as averaging instantaneous rates would
+    """
+
+    def __init__(self, half_life: float = HALF_LIFE, clock: Callable[[], float] = time.monotonic) -> None:
+        self.half_life = half_life
+        self.clock = clock
+        self._last: Optional[float] = None
+        self._weighted_count: float = 0.0
+        self._weighted_time: float = 0.0
+
+    def add(self, count: int = 1) -> None:
+        now = self.clock()
+        if self._last is None:
+            # the first event only starts the measurement
+            self._last = now
+            return
+        elapsed = now - self._last
+        decay = 0.5 ** (elapsed / self.half_life)
+        self._weighted_count = self._weighted_count * decay + count
+        self._weighted_time = self._weighted_time * decay + elapsed
+        self._last = now
+
+    @property
+    def per_second(self) -> float:
+        """ the time since the last event counts as well, so the rate drops while nothing happens """
+        if self._last is None:
+            return 0.0
+        idle = self.clock() - self._last
+        decay = 0.5 ** (idle / self.half_life)
+        weighted_time = self._weighted_time * decay + idle
+        return self._weighted_count * decay / weighted_time if weighted_time > 0 else 0.0
+
+
+class ProgressTracker:
+    """
+    counts scraped orders, items and loaded pages. The total number of orders is known for every year whose
+    filter was opened already (Amazon shows the number of orders of the selected year), the years not opened yet are
+    estimated with the average of the known ones
+    """
+
+    def __init__(self, periods: int = 1, observer: Optional[Callable[[ProgressTracker], None]] = None,
+                 refresh_interval: float = REFRESH_INTERVAL, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param periods: the number of year filters the scrape will open
+        :param observer: gets called with the tracker after changes, at most once per refresh_interval. Changes come
+        from several threads, but the observer is only called by one of them at a time
+        """
+        self.periods = periods
+        self.observer = observer
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.started = clock()
+
+        self.orders: int = 0
+        self.items: int = 0
+        self.pages: int = 0
+        self.order_rate = SmoothedRate(clock=clock)
+        self.item_rate = SmoothedRate(clock=clock)
+        self.page_rate = SmoothedRate(clock=clock)
+
+        # e.g. the current limits of the throttle, appended to the summary
+        self.limits: Optional[Callable[[], str]] = None
+
+        self._period_totals: Dict[int, int] = dict()
+        self._last_notification: Optional[float] = None
+        self._lock = threading.Lock()
+        # held while the observer is called, separately from _lock as the observer reads the properties
+        self._notification_lock = threading.Lock()
+
+    def set_period_total(self, period: int, orders: int) -> None:
+        """ :param orders: the number of orders in the period to be scraped, e.g. as shown by Amazon """
+        with self._lock:
+            self._period_totals[period] = orders
+        self._notify()
+
+    def order_scraped(self, items: int) -> None:
+        with self._lock:
+            self.orders += 1
+            self.items += items
+            self.order_rate.add()
+            self.item_rate.add(items)
+        self._notify()
+
+    def page_loaded(self) -> None:
+        with self._lock:
+            self.pages += 1
+            self.page_rate.add()
+        self._notify()
+
+    def finish(self) -> None:
+        """ marks all work as done and notifies the observer regardless of the refresh interval """
+        with self._lock:
+            self.periods = 1
+            self._period_totals = {0: self.orders}
+        self._notify(force=True)
+
+    @property
+    def estimated_total(self) -> Optional[int]:
+        """ the estimated number of orders of the whole scrape, None as long as no period total is known """
+        with self._lock:
+            if not self._period_totals:
+                return None
+            known = sum(self._period_totals.values())
+            unknown_periods = max(self.periods - len(self._period_totals), 0)
+            estimate = known + round(known / len(self._period_totals) * unknown_periods)
+        return max(estimate, self.orders)
+
+    @property
+    def fraction(self) -> float:
+        total = self.estimated_total
+        if total is None:
+            return 0.0
+        return self.orders / total if total else 1.0
+
+    @property
+    def eta(self) -> Optional[datetime.timedelta]:
+        """ the remaining time at the current (smoothed) order rate, None if not known yet """
+        total = self.estimated_total
+        rate = self.order_rate.per_second
+        if total is None or rate <= 0:
+            return None
+        return datetime.timedelta(seconds=round((total - self.orders) / rate))
+
+    @property
+    def elapsed(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=round(self.clock() - self.started))
+
+    def format(self) -> str:
+        """ :returns a one line summary, e.g. '42.1% 120/285 orders | 1.2 orders/s ... | ETA 0:02:15' """
+        total = self.estimated_total
+        eta = self.eta
+        return (f'{self.fraction * 100:5.1f}% {self.orders}/{total if total is not None else "?"} orders | '
+                f'{self.order_rate.per_second:.2f} orders/s {self.item_rate.per_second:.2f} items/s '
+                f'{self.page_rate.per_second:.2f} pages/s | elapsed {self.elapsed} | '
+                f'ETA {eta if eta is not None else "?"}' + (f' | {self.limits()}' if self.limits else ''))
+
+    def _notify(self, force: bool = False) -> None:
+        if self.observer is None:
+            return
+        # another thread notifying right now makes this notification redundant, unless it is the final one
+        if not self._notification_lock.acquire(blocking=force):
+            return
+        try:
+            now = self.clock()
+            if not force and self._last_notification is not None \
+                    and now - self._last_notification < self.refresh_interval:
+                return
+            self._last_notification = now
+            self.observer(self)
+        finally:
+            self._notification_lock.release()
+
+
+def format_bar(fraction: float, width: int = 40, fill: str = '█') -> str:
+    filled = int(width * min(max(fraction, 0.0), 1.0))
+    return fill * filled + '-' * (width - filled)
+
+
+class TerminalProgress:
+    """ an observer redrawing a single line with bar and summary, e.g. for non-interactive scrapes """
+
+    def __init__(self, stream: TextIO = sys.stdout) -> None:
+        self.stream = stream
+        self._width = 0
+
+    def __call__(self, tracker: ProgressTracker) -> None:
+        line = f'|{format_bar(tracker.fraction)}| {tracker.format()}'
+        # pad with spaces to overwrite a longer previous line
+        self.stream.write(f'\r{line:<{self._width}}')
+        self.stream.flush()
+        self._width = len(line)
+
+    def close(self) -> None:
+        if self._width:
+            self.stream.write('\n')
+            self.stream.flush()
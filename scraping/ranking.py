@@ -0,0 +1,88 @@
+"""
+Contains an OrderRanking class which keeps the top K orders, items and sellers while orders are added
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from .data import Item, Order
+
+T = TypeVar('T')
+
+TOP_K: int = 20
+
+
+class TopK(Generic[T]):
+    """
+    keeps the k elements with the largest key seen so far in a bounded min-heap, so adding an element costs
+    O(log k) and the memory stays O(k) no matter how many elements are added. On equal keys the earlier element wins
+    """
+
+    def __init__(self, k: int, key: Callable[[T], float]) -> None:
+        assert k > 0, "k must be positive"
+        self.k = k
+        self.key = key
+        self._heap: List[Tuple[float, int, T]] = []
+        # breaks ties so the elements themselves never get compared
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, element: T) -> None:
+        """ adds the element if it belongs to the k largest elements seen so far """
+        entry = (self.key(element), -next(self._counter), element)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, elements: Iterable[T]) -> None:
+        for element in elements:
+            self.push(element)
+
+    def largest(self, count: Optional[int] = None) -> List[T]:
+        """ :returns the `count` (at most k) largest elements, the largest first """
+        entries = sorted(self._heap, reverse=True)
+        return [entry[2] for entry in entries[:count]]
+
+
+class OrderRanking:
+    """
+    the K most expensive orders, the K orders with the most items, the K most expensive items and the spending per
+    seller, all maintained incrementally in a single pass over the orders
+    """
+
+    def __init__(self, k: int = TOP_K) -> None:
+        self.k = k
+        self.most_expensive_orders: TopK[Order] = TopK(k, lambda order: order.price)
+        self.largest_orders: TopK[Order] = TopK(k, lambda order: len(order.items))
+        self.most_expensive_items: TopK[Tuple[Item, Order]] = TopK(k, lambda item_and_order: item_and_order[0].price)
+        self.seller_totals: Dict[str, float] = dict()
+
+    @staticmethod
+    def from_orders(orders: Iterable[Order], k: int = TOP_K) -> OrderRanking:
+        ranking = OrderRanking(k)
+        ranking.add_all(orders)
+        return ranking
+
+    def add(self, order: Order) -> None:
+        """ updates all rankings with a new order """
+        self.most_expensive_orders.push(order)
+        self.largest_orders.push(order)
+        for item in order.items:
+            self.most_expensive_items.push((item, order))
+            self.seller_totals[item.seller] = self.seller_totals.get(item.seller, 0.0) + item.price
+
+    def add_all(self, orders: Iterable[Order]) -> None:
+        for order in orders:
+            self.add(order)
+
+    def top_sellers(self, count: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        :returns the sellers with the highest spending and their totals. Seller totals keep changing while orders are
+        added, so they are kept for every seller and only the selection runs through a bounded heap
+        """
+        return heapq.nlargest(count or self.k, self.seller_totals.items(), key=lambda seller_total: seller_total[1])
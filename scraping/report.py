@@ -0,0 +1,126 @@
+"""
+exports the dashboard figures as a static, self-contained HTML report (and optionally as images) without a server
+"""
+# pylint: disable=W1203
+import html
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import plotly.io as pio
+from termcolor import colored
+
+from . import classification
+from . import dash_app
+from . import file_handler
+from .CustomExceptions import OrdersNotFound
+from .evaluation import Evaluation
+from .timeseries import Frequency
+
+IMAGE_FORMATS: List[str] = ['png', 'svg']
+
+LOGGER = logging.getLogger(__name__)
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; background: #F2F2F2; margin: 2em; }}
+.numbers {{ display: flex; flex-wrap: wrap; }}
+.number {{ background: #F9F9F9; margin: 0.5em; padding: 1em; min-width: 10em; }}
+.number h6 {{ margin: 0.3em 0 0 0; font-weight: normal; }}
+.figure {{ background: #F9F9F9; margin: 1em 0.5em; padding: 0.5em; }}
+table {{ border-collapse: collapse; margin: 1em 0.5em; }}
+td, th {{ padding: 0.2em 1em; text-align: left; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+def report_figures(evaluated: Evaluation) -> Dict[str, Any]:
+    """ the figures of the dashboard without filters, keyed by the name used for image files """
+    return {
+        'yearly-totals': dash_app.stacked_totals_figure(evaluated.totals_by_year_and_class(),
+                                                        dash_app.all_classes(evaluated)),
+        'monthly-totals': dash_app.scatter_figure(evaluated.spending_series(Frequency.MONTH)),
+        'categories': dash_app.category_bar_figure(evaluated),
+        'category-hierarchy': dash_app.category_sunburst_figure(evaluated),
+    }
+
+
+def gen_table(header: List[str], rows: List[List[str]]) -> str:
+    cells = [''.join(f'<th>{html.escape(column)}</th>' for column in header)]
+    cells += [''.join(f'<td>{html.escape(cell)}</td>' for cell in row) for row in rows]
+    return '<table>' + ''.join(f'<tr>{row}</tr>' for row in cells) + '</table>'
+
+
+def gen_report(evaluated: Evaluation, figures: Dict[str, Any], title: str) -> str:
+    """ :returns the whole report as one HTML page, plotly.js is embedded with the first figure only """
+    numbers = ''.join(f'<div class="number">{html.escape(value)}<h6>{html.escape(label)}</h6></div>'
+                      for value, label in dash_app.summary_numbers(evaluated))
+    parts = [f'<div class="numbers">{numbers}</div>']
+
+    for index, figure in enumerate(figures.values()):
+        figure_html = pio.to_html(figure, include_plotlyjs=index == 0, full_html=False)
+        parts.append(f'<div class="figure">{figure_html}</div>')
+
+    parts.append(gen_table(["Date", "Order", "Items", "Price"],
+                           [[str(order.date), order.order_id, f"{len(order.items)}", f"{order.price:.2f}€"]
+                            for order in evaluated.ranking().most_expensive_orders.largest()]))
+    parts.append(gen_table(["Seller", "Total"],
+                           [[seller, f"{total:.2f}€"] for seller, total in evaluated.ranking().top_sellers()]))
+    return PAGE.format(title=html.escape(title), body='\n'.join(parts))
+
+
+def export(orders_file: str, output_directory: str, image_format: Optional[str] = None) -> str:
+    """
+    evaluates the orders once and writes <name of orders file>.html (and one image per figure) to output_directory
+    :return: the path of the written report
+    :raise OrdersNotFound if the orders file contains no orders
+    """
+    orders = file_handler.load_orders(orders_file)
+    if not orders:
+        raise OrdersNotFound
+    classifier = classification.load_classifier()
+    # orders saved before the rules changed or by an older version may lack tags
+    classifier.tag_orders(orders)
+    evaluated = Evaluation(orders, classifier)
+    figures = report_figures(evaluated)
+
+    name = os.path.splitext(os.path.basename(orders_file))[0]
+    os.makedirs(output_directory, exist_ok=True)
+    path = os.path.join(output_directory, f'{name}.html')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(gen_report(evaluated, figures, f'Amazon order history ({name})'))
+
+    if image_format is not None:
+        for figure_name, figure in figures.items():
+            # needs orca (plotly's image export) to be installed
+            pio.write_image(figure, os.path.join(output_directory, f'{name}-{figure_name}.{image_format}'),
+                            format=image_format)
+
+    LOGGER.info(colored(f'report for {orders_file} written to {path}', 'blue'))
+    return path
+
+
+def main(orders_files: List[str], output_directory: str, image_format: Optional[str] = None) -> int:
+    """
+    writes one report per orders file, a failing file does not stop the others
+    :return: the number of failed reports
+    """
+    failed = 0
+    for orders_file in orders_files:
+        try:
+            print(export(orders_file, output_directory, image_format))
+        except (OrdersNotFound, OSError, ValueError) as error:
+            failed += 1
+            LOGGER.error(colored(f'no report for {orders_file}: {error!r}', 'red'))
+            print(colored(f'no report for {orders_file}: {error!r}', 'red'))
+    return failed
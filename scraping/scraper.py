@@ -4,34 +4,93 @@ downloads and parses the data from amazon.de to store it in a orders.json file
 # pylint: disable=R0913
 # pylint: disable=W0201
 # pylint: disable=C0103
+# pylint: disable=W0212
 
+import collections
 import datetime
-import json
 import logging
-from typing import List, Tuple, Optional, Dict, Callable
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Tuple, Optional, Dict, Callable, Iterator, Set
 
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 from selenium.webdriver import Firefox, FirefoxProfile
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from termcolor import colored
 
-from scraping.CustomExceptions import PasswordFileNotFound, LoginError
+from scraping.CustomExceptions import PasswordFileNotFound, LoginError, ScrapeCancelled
+from . import classification
 from . import file_handler
+from . import page_cache
 from .data import Order, Item
+from .page_cache import PageCache
+from .pipeline import Stage, StageWorker
+from .progress import ProgressTracker
+from .throttle import AdaptiveThrottle, is_signin_url, page_outcome
 from . import utils as ut
 
 FILE_NAME: str = "orders.json"
 
+BASE_URL: str = "https://www.amazon.de"
+
+# further browsers reading product and order details pages while the first one pages through the order list, by
+# default the first browser reads them itself
+ENRICH_WORKERS: int = 0
+
+# stored orders at most this many days old are scraped again and updated, they may still change (e.g. cancelled items)
+REFRESH_DAYS: int = 60
+
+# orders waiting in front of a stage at most, beyond that the order list waits for the enrichment
+QUEUE_SIZE: int = 32
+
+
+@dataclass
+class PendingItem:
+    """ an item read from the order list, whose categories and/or price are still to be read from another page """
+    item: Item
+    needs_categories: bool
+    details_link: Optional[str] = None  # of the order details page showing the price, None if the price is known
+    index: int = 0  # of the item on the order details page
+
+
+@dataclass
+class ListedOrder:
+    """ an order as read from the order list """
+    order: Order
+    pending: List[PendingItem]
+
 
 class Scraper:
     """
-    Scrapping instance, scrapes all Orders in the given year range and outputs it into FILE_NAME
+    Scrapping instance, scrapes all Orders in the given year range and outputs it into FILE_NAME (or file_name)
     """
 
     def __init__(self, email: str, password: Optional[str], headless: bool, start: int, end: int, extensive: bool,
-                 progress_observer_callback: Callable[[float], None] = None) -> None:
+                 progress_observer_callback: Optional[Callable[[ProgressTracker], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, file_name: str = FILE_NAME,
+                 enrich_workers: int = ENRICH_WORKERS, throttle: Optional[AdaptiveThrottle] = None,
+                 base_url: str = BASE_URL, refresh: bool = False, pages: Optional[PageCache] = None,
+                 refresh_days: int = REFRESH_DAYS) -> None:
+        """
+        :param file_name: the orders file of the account relative to the project root, e.g. one per account
+        :param enrich_workers: additional browsers reading categories and prices from product and order details
+        pages while the first browser pages through the order list, with 0 the first browser reads them itself
+        :param throttle: paces the page loads, e.g. one shared by the scrapes of a batch. By default one for the
+        browsers of this scrape
+        :param base_url: the shop to scrape, e.g. the url of a local mock server (scraping.mock_server)
+        :param refresh: load product and order details pages again instead of reading them from the page cache
+        :param pages: the page cache, by default the one in .cache/pages
+        :param refresh_days: stored orders of the last refresh_days days are scraped again and updated with what
+        changed, older ones are never loaded again
+        :param progress_observer_callback: called with the progress (rates, estimated total, ETA) a few times per
+        second at most
+        :param cancel_event: once set the scrape stops with ScrapeCancelled after the current order, nothing of it is
+        saved and the orders.json stays as it was
+        """
         assert email, "no E-Mail provided"
         assert '@' in email and '.' in email, "incorrect email layout"  # Todo replace by regex
         assert start <= end, "start year must be before end year"
@@ -39,7 +98,18 @@ class Scraper:
         assert end <= datetime.datetime.now().year, "End year can not be in the future"
 
         self.logger = logging.getLogger(__name__)
-        self.progress_observer_callback: Callable[[float], None] = progress_observer_callback
+        self.progress_observer_callback: Optional[Callable[[ProgressTracker], None]] = progress_observer_callback
+        self.progress = ProgressTracker(observer=self._notify_progress_observers)
+        self.cancel_event = cancel_event
+        self.file_name = file_name
+        self.base_url = base_url.rstrip('/')
+        self.page_cache = pages if pages is not None else PageCache(refresh=refresh)
+        self.refresh_days = max(refresh_days, 0)
+        # set by a partial scrape: stored orders since refresh_since are updated, the frozen ones are skipped
+        self.refresh_since: Optional[datetime.date] = None
+        self.frozen_order_ids: Set[str] = set()
+        self.frozen_orders_per_year: Dict[int, int] = dict()
+        self.known_categories: Dict[str, Dict[int, str]] = dict()
 
         self.email = email
         self.password = password if password else file_handler.load_password()
@@ -54,18 +124,32 @@ class Scraper:
 
         self.headless = headless
         self.extensive = extensive
+        self.enrich_workers = max(enrich_workers, 0)
+        self.throttle = throttle if throttle is not None else AdaptiveThrottle(max_concurrency=1 + self.enrich_workers)
+        self.progress.limits = self.throttle.format
 
         self.orders: List[Order] = []
         self.browser: WebDriver
 
         self._setup_scraping()
-        self._get_orders()
+        try:
+            self._get_orders()
+            self._check_cancelled()
+
+            classification.load_classifier().tag_orders(self.orders)
+            file_handler.save_orders(self.orders, self.file_name)
+            self.progress.finish()
+        finally:
+            self.browser.quit()
 
-        file_handler.save_file(FILE_NAME, json.dumps([order.to_dict() for order in self.orders]))
-        self.browser.quit()
+    def _check_cancelled(self) -> None:
+        """ :raise ScrapeCancelled if the scrape got cancelled """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.logger.info(colored('scrape cancelled', 'blue'))
+            raise ScrapeCancelled
 
-    def _notify_progress_observers(self, progress: float) -> None:
-        if self.progress_observer_callback:
+    def _notify_progress_observers(self, progress: ProgressTracker) -> None:
+        if self.progress_observer_callback is not None:
             self.progress_observer_callback(progress)
 
     def _setup_scraping(self) -> None:
@@ -76,15 +160,9 @@ class Scraper:
             - skipping the adding phone number dialog (should it appear)
         :raise LoginError if not possible to login
          """
-        firefox_profile = FirefoxProfile()
-        firefox_profile.set_preference("browser.tabs.remote.autostart", False)
-        firefox_profile.set_preference("browser.tabs.remote.autostart.1", False)
-        firefox_profile.set_preference("browser.tabs.remote.autostart.2", False)
-        opts = Options()
-        opts.headless = self.headless
-        if opts.headless:
+        if self.headless:
             self.logger.info(colored("Run in headless mode.", 'blue'))
-        self.browser = Firefox(options=opts, firefox_profile=firefox_profile)
+        self.browser = self._create_browser()
         self._navigate_to_orders_page()
         self._complete_sign_in_form()
         if not self._signed_in_successful():
@@ -94,11 +172,61 @@ class Scraper:
             raise LoginError
         self._skip_adding_phone_number()
 
+    def _create_browser(self) -> WebDriver:
+        firefox_profile = FirefoxProfile()
+        firefox_profile.set_preference("browser.tabs.remote.autostart", False)
+        firefox_profile.set_preference("browser.tabs.remote.autostart.1", False)
+        firefox_profile.set_preference("browser.tabs.remote.autostart.2", False)
+        opts = Options()
+        opts.headless = self.headless
+        return Firefox(options=opts, firefox_profile=firefox_profile)
+
+    def _create_session_browser(self, cookies: List[Dict]) -> WebDriver:
+        """
+        :param cookies: the cookies of the signed in first browser
+        :returns: another browser signed in by the cookies, without going through the sign in form again
+        """
+        browser = self._create_browser()
+        # cookies can only be added for the domain currently open
+        browser.get(f'{self.base_url}/')
+        for cookie in cookies:
+            try:
+                browser.add_cookie(cookie)
+            except WebDriverException as error:
+                self.logger.warning(colored(f'could not copy cookie {cookie.get("name")}: {error.msg}', 'yellow'))
+        return browser
+
+    @contextmanager
+    def _open_page(self, browser: WebDriver, url: str) -> Iterator[None]:
+        """
+        opens the url for the duration of the with block. The first browser opens it in a second tab, since its first
+        tab shows the order list
+        """
+        if browser is self.browser:
+            browser.execute_script('''window.open("about:blank","_blank");''')
+            browser.switch_to.window(browser.window_handles[1])
+        try:
+            with self._throttled(browser):
+                browser.get(url)
+            yield
+        finally:
+            if browser is self.browser:
+                browser.close()
+                browser.switch_to.window(browser.window_handles[0])
+
+    @contextmanager
+    def _throttled(self, browser: WebDriver) -> Iterator[None]:
+        """ the with block loads a page in the browser, once the throttle allows it """
+        with self.throttle.fetch(self.cancel_event) as fetch:
+            yield
+            fetch.outcome = page_outcome(browser)
+        self.progress.page_loaded()
+
     def _navigate_to_orders_page(self) -> None:
         """
         navigates to the orders page
         """
-        self.browser.get('https://www.amazon.de/gp/css/order-history?ref_=nav_orders_first')
+        self.browser.get(f'{self.base_url}/gp/css/order-history?ref_=nav_orders_first')
 
     def _complete_sign_in_form(self) -> None:
         """ searches for the sign in form enters the credentials and confirms
@@ -120,7 +248,7 @@ class Scraper:
 
     def _signed_in_successful(self) -> bool:
         """ simple check if we are still on the login page """
-        return bool(self.browser.current_url != "https://www.amazon.de/ap/signin")
+        return not is_signin_url(self.browser.current_url)
 
     def _skip_adding_phone_number(self) -> None:
         """ find and click the 'skip adding phone number' button if found on the current page """
@@ -181,9 +309,10 @@ class Scraper:
 
         """
         if self._is_custom_date_range():
-            file_handler.remove_file(FILE_NAME)
+            # nothing gets removed before the new orders are saved, a cancelled scrape keeps the existing orders
+            self.orders = []
         else:
-            self.orders = file_handler.load_orders(FILE_NAME)
+            self.orders = file_handler.load_orders(self.file_name)
 
         if self.orders:
             self._scrape_partial()
@@ -226,26 +355,74 @@ class Scraper:
         self.orders = self._scrape_orders()
 
     def _scrape_partial(self) -> None:
-        """ scrape data until finding duplicates, at which point the scraping can be canceled since the rest
-         is already there """
+        """
+        scrapes the orders newer than the stored ones and those within the refresh window. Stored orders within the
+        window get updated with what changed, older ones are frozen: neither loaded again nor changed
+        """
         self.orders = sorted(self.orders, key=lambda order: order.date)
-        self.start_scraping_date = self.orders[-1].date
+        self.refresh_since = datetime.date.today() - datetime.timedelta(days=self.refresh_days)
+        self.start_scraping_date = min(self.orders[-1].date, self.refresh_since)
+        self.frozen_order_ids = {order.order_id for order in self.orders if order.date < self.refresh_since}
+        self.frozen_orders_per_year = collections.Counter(order.date.year for order in self.orders
+                                                          if order.order_id in self.frozen_order_ids)
+        # items ordered again don't need their product page loaded again
+        self.known_categories = {item.link: item.category for order in self.orders for item in order.items
+                                 if item.category}
 
         scraped_orders: List[Order] = self._scrape_orders()
 
-        # check for intersection of fetched orders
-        existing_order_ids = list(map(lambda order: order.order_id, self.orders))
-        new_orders: List[Order] = list(filter(lambda order: order.order_id not in existing_order_ids, scraped_orders))
+        stored_orders: Dict[str, Order] = {order.order_id: order for order in self.orders}
+        new_orders: List[Order] = []
+        updated = 0
+        for scraped_order in scraped_orders:
+            stored_order = stored_orders.get(scraped_order.order_id)
+            if stored_order is None:
+                new_orders.append(scraped_order)
+            elif scraped_order.order_id not in self.frozen_order_ids:
+                changes = stored_order.update(scraped_order)
+                if changes:
+                    updated += 1
+                    self.logger.info(colored(f'order {stored_order.order_id} changed: {"; ".join(changes)}', 'blue'))
         self.orders.extend(new_orders)
+        self.logger.info(colored(f'{len(new_orders)} new orders, {updated} of the last {self.refresh_days} days '
+                                 f'updated', 'blue'))
+
+    def _is_refreshed(self, order: Order) -> bool:
+        """ :returns whether a stored version of the order gets updated, its pages must not come from the cache """
+        return self.refresh_since is not None and order.date >= self.refresh_since
 
     def _scrape_orders(self) -> List[Order]:
         """
+        Scrapes in a pipeline: this thread pages through the order list and reads the orders, the enrichment stage
+        reads the missing categories and prices of their items from product and order details pages with
+        enrich_workers browsers and the persistence stage collects the completed orders. Listing and parsing stay in one
+        thread, the elements of a page are gone as soon as the browser opens the next one.
+        The queues in between are bounded, the order list waits once the enrichment is QUEUE_SIZE orders behind
         :returns: a list of all orders in between given start year (inclusive) and end year (inclusive)
         """
-        orders: List[Order] = []
+        completed: List[Order] = []
+        persistence: Stage[Order] = Stage('persistence', lambda: _PersistenceWorker(completed, self.progress),
+                                          workers=1, capacity=QUEUE_SIZE)
+        # the first browser must only be used by this thread, so its cookies are read here
+        cookies = self.browser.get_cookies() if self.enrich_workers else []
+        enrichment: Stage[ListedOrder] = Stage('enrichment', lambda: _EnrichmentWorker(self, persistence, cookies),
+                                               workers=self.enrich_workers, capacity=QUEUE_SIZE)
+        try:
+            self._list_orders(enrichment)
+            enrichment.close()
+            persistence.close()
+        except BaseException:
+            enrichment.abort()
+            persistence.abort()
+            raise
+        return completed
+
+    def _list_orders(self, enrichment: Stage[ListedOrder]) -> None:
+        """ pages through the order list of every year in the range and passes the orders on to the enrichment """
         # order filter option 0 and 1 are already contained in option 2 [3months, 6months, currYear, lastYear, ...]
         start_index = 2 + (datetime.datetime.now().year - self.end_date.year)
         end_index = 2 + (datetime.datetime.now().year - self.start_scraping_date.year) + 1
+        self.progress.periods = end_index - start_index
 
         for order_filter_index in range(start_index, end_index):
             # open the dropdown
@@ -256,13 +433,14 @@ class Scraper:
             id_order_filter = f'orderFilter_{order_filter_index}'
             ut.wait_for_element_by_id(self.browser, id_order_filter)
             dropdown_element = self.browser.find_element_by_id(id_order_filter)
-            dropdown_element.click()
+            with self._throttled(self.browser):
+                dropdown_element.click()
+            self._read_order_count(order_filter_index)
 
             pages_remaining = self._are_orders_for_year_available()
             while pages_remaining:
 
-                orders_on_page: List[Order] = self._scrape_page_for_orders()
-                orders.extend(orders_on_page)
+                orders_on_page: List[Order] = self._scrape_page_for_orders(enrichment)
 
                 current_date: datetime.date = orders_on_page[-1].date
 
@@ -277,20 +455,42 @@ class Scraper:
                 if pages_remaining:
                     next_page_link = pagination_element.find_element_by_class_name('a-last') \
                         .find_element_by_css_selector('a').get_attribute('href')
-                    self.browser.get(next_page_link)
+                    with self._throttled(self.browser):
+                        self.browser.get(next_page_link)
 
-        return orders
+    def _read_order_count(self, period: int) -> None:
+        """
+        passes the number of orders of the selected year (e.g. '23 Bestellungen') to the progress, without the frozen
+        orders of a partial scrape, they are skipped
+        """
+        try:
+            match = re.search(r'\d+', self.browser.find_element_by_class_name('num-orders').text.replace('.', ''))
+        except NoSuchElementException:
+            match = None
+        # order filter 2 is the current year, 3 the last one and so on
+        year = datetime.datetime.now().year - (period - 2)
+        orders = int(match.group()) if match else 0
+        self.progress.set_period_total(period, max(orders - self.frozen_orders_per_year.get(year, 0), 0))
 
-    def _scrape_page_for_orders(self) -> List[Order]:
-        """ :returns a list of all orders found on the currently open page """
+    def _scrape_page_for_orders(self, enrichment: Stage[ListedOrder]) -> List[Order]:
+        """
+        reads the orders on the currently open page and passes them on to the enrichment
+        :returns a list of all orders found on the currently open page, their items might not be enriched yet
+        """
         orders = []
         for order_element in self.browser.find_elements_by_class_name('order'):
+            self._check_cancelled()
 
             ut.wait_for_element_by_class_name(order_element, 'order-info', timeout=3)
             order_info_element = order_element.find_element_by_class_name('order-info')
             order_id, order_price, date = self._get_order_info(order_info_element)
+            if order_id in self.frozen_order_ids:
+                # stored and outside the refresh window, only its date counts for where the listing stops
+                orders.append(Order(order_id, order_price, date, []))
+                continue
 
             items = []
+            pending_items = []
             # looking in an order there is a 'a-box' for order_info and and 'a-box' for each seller containing detailed
             # items info
             for items_by_seller in order_element.find_elements_by_class_name('a-box')[1:]:
@@ -299,16 +499,19 @@ class Scraper:
                     seller = self._get_item_seller(item_element)
                     title, link = self._get_item_title(item_element)
                     item_price = order_price if self._is_digital_order(order_id) else \
-                        self._get_item_price(item_element, index, order_element)
-                    categories = self._get_item_categories(link) if self.extensive else dict()
+                        self._get_item_price(item_element)
 
-                    items.append(Item(item_price, link, title, seller, categories))
+                    item = Item(item_price if item_price is not None else 0, link, title, seller,
+                                dict(self.known_categories.get(link, dict())))
+                    items.append(item)
+                    pending = PendingItem(item, self.extensive and not item.category)
+                    if item_price is None:
+                        pending.details_link, pending.index = self._get_order_details_link(order_element), index
+                    if pending.needs_categories or pending.details_link:
+                        pending_items.append(pending)
 
             orders.append(Order(order_id, order_price, date, items))
-
-            current_date: datetime.date = orders[-1].date
-            progress: float = self._get_progress(current_date=current_date)
-            self._notify_progress_observers(progress)
+            enrichment.put(ListedOrder(orders[-1], pending_items))
 
         return orders
 
@@ -342,97 +545,140 @@ class Scraper:
 
         return title, link
 
-    def _get_item_price(self, item_element: WebElement, item_index: int, order_element: WebElement) -> float:
+    def _get_item_price(self, item_element: WebElement) -> Optional[float]:
         """
         :param item_element: the item div
-        :param item_index: the index of the item in the order
-        :param order_element: the order div
-        :return: returns the price of an item
+        :return: returns the price of an item, None if it is only shown on the order details page
         """
         try:
             item_price_str = item_element.find_element_by_class_name('a-color-price').text
-            item_price = self._price_str_to_float(item_price_str)
+            return self._price_str_to_float(item_price_str)
         except (NoSuchElementException, ValueError):
-            item_price = self._get_item_price_through_details_page(order_element, item_index)
-
-        return item_price
+            return None
 
-    def _get_item_price_through_details_page(self, order_element: WebElement, item_index: int) -> float:
+    def _get_order_details_link(self, order_element: WebElement) -> Optional[str]:
         """
         :param order_element: the order div
-        :param item_index: the index of the item in the order
-        :returns: the item price found on the order details page
+        :return: the link to the order details page, None if there is none
         """
-        item_price: float = 0
-
         try:
-            order_details_link = order_element.find_element_by_class_name('a-link-normal').get_attribute('href')
-
-            self.browser.execute_script(f'''window.open("{order_details_link}","_blank");''')
-            self.browser.switch_to.window(self.browser.window_handles[1])
-            if not ut.wait_for_element_by_class_name(self.browser, 'od-shipments'):
-                return item_price
-
-            od_shipments_element = self.browser.find_element_by_class_name('od-shipments')
-            price_fields: List[WebElement] = od_shipments_element.find_elements_by_class_name('a-color-price')
-            item_price = self._price_str_to_float(price_fields[item_index].text)
-
-        except (NoSuchElementException, ValueError):
-            item_price = 0
+            return order_element.find_element_by_class_name('a-link-normal').get_attribute('href')
+        except NoSuchElementException:
             self.logger.warning(colored(f'Could not parse price for order:\n{order_element.text}', 'yellow'))
+            return None
 
-        finally:
-            self.browser.close()
-            self.browser.switch_to.window(self.browser.window_handles[0])
-        return item_price
+    def _get_item_price_through_details_page(self, browser: WebDriver, order_details_link: str,
+                                             item_index: int, use_cache: bool = True) -> float:
+        """
+        :param order_details_link: the link to the order details page
+        :param item_index: the index of the item in the order
+        :param use_cache: whether the page may be read from the page cache, it gets cached either way
+        :returns: the item price found on the order details page
+        """
+        cached_page = self.page_cache.get(page_cache.DETAILS, order_details_link) if use_cache else None
+        if cached_page is not None:
+            price_texts = page_cache.element_texts(cached_page, class_name='a-color-price', within_class='od-shipments')
+            return self._details_price(price_texts, item_index, order_details_link)
+
+        with self._open_page(browser, order_details_link):
+            if not ut.wait_for_element_by_class_name(browser, 'od-shipments'):
+                return 0
+            try:
+                od_shipments_element = browser.find_element_by_class_name('od-shipments')
+                price_texts = [price_field.text for price_field in
+                               od_shipments_element.find_elements_by_class_name('a-color-price')]
+            except NoSuchElementException:
+                price_texts = []
+            if price_texts:
+                self.page_cache.put(page_cache.DETAILS, order_details_link, browser.page_source)
+
+        return self._details_price(price_texts, item_index, order_details_link)
+
+    def _details_price(self, price_texts: List[str], item_index: int, order_details_link: str) -> float:
+        try:
+            return self._price_str_to_float(price_texts[item_index])
+        except (ValueError, IndexError):
+            self.logger.warning(colored(f'Could not parse price on {order_details_link}', 'yellow'))
+            return 0
 
-    def _get_item_categories(self, item_link: str) -> Dict[int, str]:
+    def _get_item_categories(self, browser: WebDriver, item_link: str) -> Dict[int, str]:
         """
         :param item_link: the link to the item itself
-        :returns: a dict with the categories and the importance as key
+        :returns: a dict with the categories and the importance as key, read from the page cache if possible
         """
-        categories: Dict[int, str] = dict()
-
-        self.browser.execute_script(f'''window.open("{item_link}","_blank");''')
-        self.browser.switch_to.window(self.browser.window_handles[1])
+        cached_page = self.page_cache.get(page_cache.PRODUCT, item_link)
+        if cached_page is not None:
+            return self._get_item_categories_from_page(cached_page)
 
-        if ut.wait_for_element_by_id(self.browser, 'wayfinding-breadcrumbs_container'):
-            categories = self._get_item_categories_from_normal()
-            self.browser.close()
-            self.browser.switch_to.window(self.browser.window_handles[0])
-            return categories
+        categories: Dict[int, str] = dict()
+        with self._open_page(browser, item_link):
+            if ut.wait_for_element_by_id(browser, 'wayfinding-breadcrumbs_container'):
+                categories = self._get_item_categories_from_normal(browser)
+            elif ut.wait_for_element_by_class_name(browser, 'dv-dp-node-meta-info'):
+                categories = self._get_item_categories_from_video(browser)
+            # pages without categories aren't cached, they might have been incomplete
+            if categories:
+                self.page_cache.put(page_cache.PRODUCT, item_link, browser.page_source)
 
-        if ut.wait_for_element_by_class_name(self.browser, 'dv-dp-node-meta-info'):
-            categories = self._get_item_categories_from_video()
-            self.browser.close()
-            self.browser.switch_to.window(self.browser.window_handles[0])
-            return categories
+        return categories
 
-        self.browser.close()
-        self.browser.switch_to.window(self.browser.window_handles[0])
+    def _enrich_order(self, browser: WebDriver, listed_order: ListedOrder) -> None:
+        """ reads the missing prices and categories of the items of the order from their pages """
+        for pending in listed_order.pending:
+            self._check_cancelled()
+            if pending.details_link:
+                pending.item.price = self._get_item_price_through_details_page(
+                    browser, pending.details_link, pending.index, use_cache=not self._is_refreshed(listed_order.order))
+            if pending.needs_categories:
+                pending.item.category = self._get_item_categories(browser, pending.item.link)
 
-        return categories
+    @staticmethod
+    def _get_item_categories_from_page(page: str) -> Dict[int, str]:
+        """
+        :param page: the source of a product page
+        :return: the categories as read by _get_item_categories_from_normal or _get_item_categories_from_video
+        """
+        breadcrumbs = page_cache.element_texts(page, class_name='a-list-item',
+                                               within_id='wayfinding-breadcrumbs_container')
+        if breadcrumbs:
+            return Scraper._categories_from_breadcrumbs(breadcrumbs)
+        video_info = page_cache.element_texts(page, class_name='dv-dp-node-meta-info')
+        if video_info:
+            return Scraper._categories_from_video_info(video_info[0])
+        return dict()
 
-    def _get_item_categories_from_normal(self) -> Dict[int, str]:
+    @staticmethod
+    def _get_item_categories_from_normal(browser: WebDriver) -> Dict[int, str]:
         """
         :return: the categories for a normal ordered item
         """
+        categories_element = browser.find_element_by_id('wayfinding-breadcrumbs_container')
+        return Scraper._categories_from_breadcrumbs(
+            [category_element.text for category_element in categories_element.find_elements_by_class_name("a-list-item")])
+
+    @staticmethod
+    def _get_item_categories_from_video(browser: WebDriver) -> Dict[int, str]:
+        """
+        :return: the genre of a movie as categories
+        """
+        return Scraper._categories_from_video_info(browser.find_element_by_class_name('dv-dp-node-meta-info').text)
+
+    @staticmethod
+    def _categories_from_breadcrumbs(breadcrumbs: List[str]) -> Dict[int, str]:
+        """ :param breadcrumbs: the texts of the breadcrumbs, every second one is a separator """
         categories = dict()
-        categories_element = self.browser.find_element_by_id('wayfinding-breadcrumbs_container')
-        for index, category_element in enumerate(categories_element.find_elements_by_class_name("a-list-item")):
+        for index, breadcrumb in enumerate(breadcrumbs):
             element_is_separator = index % 2 == 1
             if element_is_separator:
                 continue
             depth = int(index // 2 + 1)
-            categories[depth] = category_element.text
+            categories[depth] = breadcrumb
         return categories
 
-    def _get_item_categories_from_video(self) -> Dict[int, str]:
-        """
-        :return: the genre of a movie as categories
-        """
+    @staticmethod
+    def _categories_from_video_info(text: str) -> Dict[int, str]:
+        """ :param text: the meta info of a video, starting with a line like 'Genres Drama, Komödie' """
         categories = dict()
-        text: str = self.browser.find_element_by_class_name('dv-dp-node-meta-info').text
         genre = text.split("\n")[0]
         genre_list: List[str] = genre.split(", ")
         genre_list[0] = genre_list[0].split(" ")[1]
@@ -451,16 +697,32 @@ class Scraper:
         """
         return float((price_str[4:]).replace(',', '.'))
 
-    def _get_progress(self, current_date: datetime.date) -> float:
-        """
-        calculates the progress by months
-        :returns the progress in percentage
-        """
-        total_days = self.end_date.day - self.start_scraping_date.day + \
-                     (self.end_date.month - self.start_scraping_date.month) * 31 + \
-                     (self.end_date.year - self.start_scraping_date.year) * 12 * 31
-        scraped_days = self.end_date.day - current_date.day + \
-                       (self.end_date.month - current_date.month) * 31 + \
-                       (self.end_date.year - current_date.year) * 12 * 31
-        progress: float = scraped_days / total_days if total_days > 0 else 1.0
-        return progress if progress <= 1 else 1.0
+
+class _EnrichmentWorker(StageWorker[ListedOrder]):
+    """ reads missing prices and categories of the listed orders with a browser of its own (or the first one) """
+
+    def __init__(self, scraper: Scraper, persistence: Stage[Order], cookies: List[Dict]) -> None:
+        self.scraper = scraper
+        self.persistence = persistence
+        # without enrich workers the stage runs in the thread of the order list, which owns the first browser
+        self.browser = scraper._create_session_browser(cookies) if scraper.enrich_workers else scraper.browser
+
+    def handle(self, item: ListedOrder) -> None:
+        self.scraper._enrich_order(self.browser, item)
+        self.persistence.put(item.order)
+
+    def close(self) -> None:
+        if self.browser is not self.scraper.browser:
+            self.browser.quit()
+
+
+class _PersistenceWorker(StageWorker[Order]):
+    """ collects the completed orders, they are saved together once the scrape is done """
+
+    def __init__(self, orders: List[Order], progress: ProgressTracker) -> None:
+        self.orders = orders
+        self.progress = progress
+
+    def handle(self, item: Order) -> None:
+        self.orders.append(item)
+        self.progress.order_scraped(len(item.items))
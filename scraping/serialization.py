@@ -0,0 +1,254 @@
+"""
+writes orders as json or in a compact binary format one by one, without building dicts for them first, and reads both
+formats back
+"""
+from __future__ import annotations
+
+import contextlib
+import datetime
+import gc
+import json
+import os
+import struct
+from json.encoder import encode_basestring_ascii
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from . import order_store
+from .data import Item, Order
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# files with this suffix are written in the binary format, all others as json. Reading detects the format itself
+BINARY_SUFFIX: str = '.bin'
+
+# the first bytes of a binary file, followed by the format version
+MAGIC: bytes = b'AOHB'
+VERSION: int = 1
+
+# binary records start with their kind: a string (seller, tag or category name) or category used by the following
+# orders gets defined once, with the next free id, before the order referring to it
+_STRING, _CATEGORY, _ORDER = b'SCO'
+
+_LENGTH = struct.Struct('<I')
+_DEPTH = struct.Struct('<hI')  # depth, name id
+_ORDER_FIELDS = struct.Struct('<qiH')  # price in cents, date as ordinal, number of items
+_ITEM_FIELDS = struct.Struct('<qIII')  # price in cents, seller id, category id, tag id (0 for none)
+
+# chunks of this many bytes at least are passed to the file at once
+WRITE_BUFFER: int = 1024 * 1024
+
+
+class JsonEncoder:
+    """
+    encodes orders to the same json as json.dumps(order.to_dict()). Sellers, tags, categories and dates are shared by
+    many items and orders, their json is encoded once and reused
+    """
+
+    def __init__(self) -> None:
+        self._strings: Dict[str, str] = dict()
+        self._categories: Dict[Tuple[Tuple[int, str], ...], str] = dict()
+        self._dates: Dict[datetime.date, str] = dict()
+
+    def encode(self, order: Order) -> str:
+        date = self._dates.get(order.date)
+        if date is None:
+            date = self._dates[order.date] = f'"{order.date.isoformat()}"'
+        items = ', '.join([self._encode_item(item) for item in order.items])
+        return f'{{"order_id": {encode_basestring_ascii(order.order_id)}, "price": {order.cents / 100!r}, ' \
+               f'"date": {date}, "items": [{items}]}}'
+
+    def _encode_item(self, item: Item) -> str:
+        category = self._categories.get(item.category_pairs)
+        if category is None:
+            category = self._categories[item.category_pairs] = json.dumps(dict(item.category_pairs))
+        tag = 'null' if item.tag is None else self._string(item.tag)
+        return f'{{"price": {item.cents / 100!r}, "link": {encode_basestring_ascii(item.link)}, ' \
+               f'"title": {encode_basestring_ascii(item.title)}, "seller": {self._string(item.seller)}, ' \
+               f'"category": {category}, "tag": {tag}}}'
+
+    def _string(self, value: str) -> str:
+        encoded = self._strings.get(value)
+        if encoded is None:
+            encoded = self._strings[value] = encode_basestring_ascii(value)
+        return encoded
+
+
+class BinaryEncoder:
+    """
+    encodes orders to binary records. Strings are utf-8 with their length in front, sellers, tags and category names
+    are written once and referred to by id afterwards, so are categories
+    """
+
+    def __init__(self) -> None:
+        self._strings: Dict[str, int] = dict()
+        self._categories: Dict[Tuple[Tuple[int, str], ...], int] = {(): 0}
+
+    def encode(self, order: Order) -> bytes:
+        record = bytearray()
+        # definitions are appended to record while the items are encoded, the order follows them
+        items = bytearray()
+        for item in order.items:
+            items += _ITEM_FIELDS.pack(item.cents, self._string_id(item.seller, record),
+                                       self._category_id(item.category_pairs, record),
+                                       self._string_id(item.tag, record) if item.tag is not None else 0)
+            _append_string(items, item.link)
+            _append_string(items, item.title)
+        record.append(_ORDER)
+        _append_string(record, order.order_id)
+        record += _ORDER_FIELDS.pack(order.cents, order.date.toordinal(), len(order.items))
+        record += items
+        return bytes(record)
+
+    def _string_id(self, value: str, record: bytearray) -> int:
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = self._strings[value] = len(self._strings) + 1
+            record.append(_STRING)
+            _append_string(record, value)
+        return string_id
+
+    def _category_id(self, pairs: Tuple[Tuple[int, str], ...], record: bytearray) -> int:
+        category_id = self._categories.get(pairs)
+        if category_id is None:
+            names = [self._string_id(name, record) for _, name in pairs]
+            category_id = self._categories[pairs] = len(self._categories)
+            record.append(_CATEGORY)
+            record.append(len(pairs))
+            for (depth, _), name in zip(pairs, names):
+                record += _DEPTH.pack(depth, name)
+        return category_id
+
+
+def _append_string(record: bytearray, value: str) -> None:
+    encoded = value.encode('utf-8')
+    record += _LENGTH.pack(len(encoded))
+    record += encoded
+
+
+def iter_json(orders: Iterable[Order]) -> Iterator[str]:
+    """ :returns the json array of the orders in chunks, one order at a time """
+    encoder = JsonEncoder()
+    separator = '['
+    for order in orders:
+        yield separator
+        yield encoder.encode(order)
+        separator = ', '
+    yield '[]' if separator == '[' else ']'
+
+
+def iter_binary(orders: Iterable[Order]) -> Iterator[bytes]:
+    """ :returns the binary file of the orders in chunks, one order at a time """
+    encoder = BinaryEncoder()
+    yield MAGIC + bytes((VERSION,))
+    for order in orders:
+        yield encoder.encode(order)
+
+
+def is_binary_file_name(path: str) -> bool:
+    return path.endswith(BINARY_SUFFIX)
+
+
+def write_orders(path: str, orders: Iterable[Order], binary: Optional[bool] = None) -> int:
+    """
+    writes the orders one by one to a temporary file which then replaces path, so readers always see either the old or
+    the new content, while the orders are never encoded all at once
+    :param binary: the format, by default binary if path ends with BINARY_SUFFIX
+    :returns the number of bytes written
+    """
+    if binary is None:
+        binary = is_binary_file_name(path)
+    chunks: Iterator[Union[str, bytes]] = iter_binary(orders) if binary else iter_json(orders)
+    temporary_path = f'{path}.tmp'
+    written = 0
+    with open(temporary_path, 'wb') as file:
+        pending: List[bytes] = []
+        pending_size = 0
+        for chunk in chunks:
+            encoded = chunk if isinstance(chunk, bytes) else chunk.encode('ascii')
+            pending.append(encoded)
+            pending_size += len(encoded)
+            if pending_size >= WRITE_BUFFER:
+                written += file.write(b''.join(pending))
+                pending, pending_size = [], 0
+        written += file.write(b''.join(pending))
+    os.replace(temporary_path, path)
+    return written
+
+
+def read_orders(path: str) -> List[Order]:
+    """ reads all orders of a json, binary or order store file """
+    if order_store.is_store(path):
+        with order_store.OrderStore(path) as store, _garbage_collection_paused():
+            return list(store)
+    with open(path, 'rb') as file:
+        data = file.read()
+    # orders don't form reference cycles, but the garbage collector would traverse all objects created so far again
+    # and again while the many small ones get allocated, which takes more than half of the time otherwise
+    with _garbage_collection_paused():
+        if data.startswith(MAGIC):
+            return list(decode_binary(data))
+        order_dicts = orjson.loads(data) if orjson is not None else json.loads(data)
+        return [Order.from_dict(order_dict) for order_dict in order_dicts or []]
+
+
+@contextlib.contextmanager
+def _garbage_collection_paused() -> Iterator[None]:
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def decode_binary(data: bytes) -> Iterator[Order]:
+    """ :returns the orders of a binary file's content one by one """
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f'unsupported binary orders version {data[len(MAGIC)]}')
+    strings: List[Optional[str]] = [None]
+    categories: List[Dict[int, str]] = [dict()]
+    dates: Dict[int, datetime.date] = dict()
+
+    position = len(MAGIC) + 1
+    while position < len(data):
+        kind = data[position]
+        position += 1
+        if kind == _STRING:
+            string, position = _read_string(data, position)
+            strings.append(string)
+        elif kind == _CATEGORY:
+            count = data[position]
+            position += 1
+            category: Dict[int, str] = dict()
+            for depth, name in _DEPTH.iter_unpack(data[position:position + count * _DEPTH.size]):
+                category[depth] = strings[name]
+            position += count * _DEPTH.size
+            categories.append(category)
+        elif kind == _ORDER:
+            order_id, position = _read_string(data, position)
+            cents, ordinal, item_count = _ORDER_FIELDS.unpack_from(data, position)
+            position += _ORDER_FIELDS.size
+            items: List[Item] = []
+            for _ in range(item_count):
+                item_cents, seller, category_id, tag = _ITEM_FIELDS.unpack_from(data, position)
+                link, position = _read_string(data, position + _ITEM_FIELDS.size)
+                title, position = _read_string(data, position)
+                items.append(Item(item_cents / 100, link, title, strings[seller], categories[category_id],
+                                  strings[tag]))
+            date = dates.get(ordinal)
+            if date is None:
+                date = dates[ordinal] = datetime.date.fromordinal(ordinal)
+            yield Order(order_id, cents / 100, date, items)
+        else:
+            raise ValueError(f'unknown record {kind} at byte {position - 1}')
+
+
+def _read_string(data: bytes, position: int) -> Tuple[str, int]:
+    """ :returns the string at position and the position after it """
+    length, = _LENGTH.unpack_from(data, position)
+    start = position + _LENGTH.size
+    return data[start:start + length].decode('utf-8'), start + length
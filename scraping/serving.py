@@ -0,0 +1,71 @@
+"""
+serves the dashboard through gunicorn with several worker processes, each running several threads
+"""
+# pylint: disable=W1203
+import logging
+from typing import Any, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+from termcolor import colored
+
+from . import dash_app
+from . import file_handler as fh
+from .dash_app import LiveEvaluation
+from .watcher import FileWatcher
+
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 8050
+DEFAULT_WORKERS: int = 2
+DEFAULT_THREADS: int = 4
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DashboardApplication(BaseApplication):  # pylint: disable=W0223
+    """
+    The dashboard is built once in the gunicorn master before the workers are forked (preload_app), so every worker
+    starts with the evaluated aggregates and shares their memory pages copy-on-write instead of evaluating the orders
+    itself. Each worker watches the orders file on its own, since threads do not survive the fork
+    """
+
+    def __init__(self, options: Dict[str, Any], webgl: bool = False) -> None:
+        self.options = options
+        self.webgl = webgl
+        self.live: Optional[LiveEvaluation] = None
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('post_worker_init', self._start_watcher)
+
+    def load(self) -> Any:
+        app, self.live = dash_app.create_app(self.webgl)
+        return app.server
+
+    def _start_watcher(self, worker: Any) -> None:
+        if self.live is None:
+            return
+        FileWatcher(fh.to_file_path(self.live.file_name), self.live.reload).start()
+        LOGGER.info(colored(f'dashboard worker {worker.pid} serving', 'blue'))
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = DEFAULT_WORKERS,
+          threads: int = DEFAULT_THREADS, webgl: bool = False) -> None:
+    """
+    blocks until gunicorn is stopped (SIGINT/SIGTERM), which lets the workers finish their requests first
+    :param workers: number of worker processes
+    :param threads: number of threads per worker, each answering one request at a time
+    """
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'graceful_timeout': 10,
+    }
+    print(colored(f'serving the dashboard on http://{host}:{port}/ with {workers} workers x {threads} threads',
+                  'blue'))
+    DashboardApplication(options, webgl).run()
@@ -0,0 +1,118 @@
+"""
+deterministic generator for synthetic orders, e.g. to benchmark the evaluation without a real order history
+"""
+import datetime
+import random
+from typing import Dict, List, Sequence, Tuple, TypeVar
+
+from .data import Item, Order
+
+T = TypeVar('T')
+
+# (seller, weight), the weights roughly resemble a real order history
+SELLERS: List[Tuple[str, int]] = [
+    ('Amazon EU S.a.r.L.', 60),
+    ('Amazon Media EU S.à r.l.', 8),
+    ('Elektronik-Versand24', 4),
+    ('Buchhandlung Müller', 4),
+    ('Mode & Mehr GmbH', 3),
+    ('Haushaltswaren Schmidt', 3),
+    ('Spielwaren König', 2),
+    ('not available', 2),
+]
+
+# category breadcrumbs and their weights
+CATEGORIES: List[Tuple[Tuple[str, ...], int]] = [
+    (('Bücher', 'Fachbücher', 'Informatik'), 8),
+    (('Bücher', 'Romane & Erzählungen'), 6),
+    (('Kindle-Shop', 'eBooks', 'Krimis & Thriller'), 5),
+    (('Elektronik & Foto', 'Zubehör', 'Kabel'), 7),
+    (('Elektronik & Foto', 'Kamera & Foto', 'Objektive'), 2),
+    (('Computer & Zubehör', 'Datenspeicher', 'USB-Sticks'), 5),
+    (('Computer & Zubehör', 'Eingabegeräte', 'Tastaturen'), 3),
+    (('Bekleidung', 'Herren', 'Tops, T-Shirts & Hemden', 'T-Shirts'), 5),
+    (('Bekleidung', 'Damen', 'Jacken'), 3),
+    (('Küche, Haushalt & Wohnen', 'Küchenhelfer'), 6),
+    (('Drogerie & Körperpflege', 'Haarpflege'), 4),
+    (('Spielzeug', 'Bausteine'), 2),
+    (('Sport & Freizeit', 'Radsport', 'Fahrradzubehör'), 3),
+]
+
+# share of items scraped without --extensive, i.e. without categories
+UNCATEGORIZED_SHARE: float = 0.2
+
+# share of digital orders (audible, instant video) and of orders adding balance to the account
+AUDIBLE_SHARE: float = 0.05
+INSTANT_VIDEO_SHARE: float = 0.04
+BALANCE_SHARE: float = 0.01
+
+TITLE_WORDS: List[str] = ['Premium', 'Set', 'Kabel', 'Buch', 'Tasche', 'Adapter', 'Hülle', 'Lampe', 'Shirt', 'Becher',
+                          'Ladegerät', 'Roman', 'Handbuch', 'Schal', 'Pfanne', 'Bürste', 'Pumpe', 'Maus']
+
+
+def _weighted_choice(rng: random.Random, choices: Sequence[Tuple[T, int]]) -> T:
+    return rng.choices([choice[0] for choice in choices], weights=[choice[1] for choice in choices])[0]
+
+
+def _price(rng: random.Random, median: float = 20.0) -> float:
+    """ prices are log-normal distributed, most items are cheap but some are very expensive """
+    return round(max(0.5, rng.lognormvariate(0, 1.0) * median), 2)
+
+
+def _order_id(rng: random.Random, digital: bool) -> str:
+    prefix = 'D01' if digital else f'{rng.randint(302, 306)}'
+    return f'{prefix}-{rng.randint(0, 9999999):07d}-{rng.randint(0, 9999999):07d}'
+
+
+def _link(rng: random.Random) -> str:
+    return f'https://www.amazon.de/gp/product/B0{rng.randint(0, 99999999):08d}'
+
+
+def _physical_item(rng: random.Random) -> Item:
+    category: Dict[int, str] = dict()
+    if rng.random() >= UNCATEGORIZED_SHARE:
+        path = _weighted_choice(rng, CATEGORIES)
+        category = {depth + 1: name for depth, name in enumerate(path)}
+    title = ' '.join(rng.sample(TITLE_WORDS, rng.randint(2, 4)))
+    return Item(_price(rng), _link(rng), title, _weighted_choice(rng, SELLERS), category)
+
+
+def _generate_order(rng: random.Random, date: datetime.date) -> Order:
+    kind = rng.random()
+    if kind < AUDIBLE_SHARE:
+        price = round(rng.choice([9.95, 12.95, 19.95, 24.95]), 2)
+        items = [Item(price, _link(rng), f'Hörbuch {rng.randint(1, 5000)}', 'Audible GmbH', dict())]
+        return Order(_order_id(rng, digital=True), price, date, items)
+
+    kind -= AUDIBLE_SHARE
+    if kind < INSTANT_VIDEO_SHARE:
+        price = round(rng.choice([0.99, 2.99, 3.99, 9.99, 13.99]), 2)
+        category = {0: rng.choice(['Drama', 'Komödie', 'Action']), 1: 'movie'}
+        items = [Item(price, _link(rng), f'Film {rng.randint(1, 5000)}', 'Amazon Instant Video Germany GmbH',
+                      category)]
+        return Order(_order_id(rng, digital=True), price, date, items)
+
+    kind -= INSTANT_VIDEO_SHARE
+    if kind < BALANCE_SHARE:
+        price = float(rng.choice([25, 50, 100]))
+        items = [Item(price, _link(rng), 'Amazon-Konto aufladen', 'Amazon EU S.a.r.L.', dict())]
+        return Order(_order_id(rng, digital=False), price, date, items)
+
+    # most orders contain one item, few contain a lot
+    item_count = 1
+    while item_count < 20 and rng.random() < 0.35:
+        item_count += 1
+    items = [_physical_item(rng) for _ in range(item_count)]
+    price = round(sum(item.price for item in items), 2)
+    return Order(_order_id(rng, digital=False), price, date, items)
+
+
+def generate_orders(count: int, seed: int = 0, start: datetime.date = datetime.date(2010, 1, 1),
+                    end: datetime.date = datetime.date(2019, 12, 31)) -> List[Order]:
+    """
+    generates `count` orders between start and end, sorted by date. The same seed always generates the same orders
+    """
+    rng = random.Random(seed)
+    days = (end - start).days
+    dates = sorted(start + datetime.timedelta(days=rng.randint(0, days)) for _ in range(count))
+    return [_generate_order(rng, date) for date in dates]
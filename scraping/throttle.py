@@ -0,0 +1,276 @@
+"""
+paces the page loads of a scrape: a token bucket limits the rate, an AIMD controller adapts rate and concurrency to
+how Amazon answers
+"""
+# pylint: disable=W1203
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from termcolor import colored
+
+from scraping.CustomExceptions import ScrapeCancelled
+
+LOGGER = logging.getLogger(__name__)
+
+# pages per second a scrape starts with and never exceeds
+START_RATE: float = 1.0
+MAX_RATE: float = 4.0
+MIN_RATE: float = 0.1
+
+# every successful page load adds RATE_STEP / rate, i.e. the rate grows by about RATE_STEP pages/s per second
+RATE_STEP: float = 0.05
+# consecutive successful loads per allowed concurrent load before one more is allowed
+SUCCESSES_PER_STEP: int = 10
+# factor applied to rate and concurrency on a sign of throttling
+DECREASE: float = 0.5
+# seconds after a decrease in which further signs count as the same incident, loads started before the decrease
+# still report theirs
+COOLDOWN: float = 10.0
+# a load taking longer counts as a sign of throttling
+SLOW_LATENCY: float = 10.0
+# seconds no page is loaded at all after a captcha
+CAPTCHA_PAUSE: float = 60.0
+
+# seconds between checks for a cancellation while waiting
+POLL_INTERVAL: float = 0.2
+
+CAPTCHA_FORM: str = 'form[action*="validateCaptcha"]'
+ERROR_TITLES = ('Seite nicht gefunden', 'Service Unavailable', 'Tut uns Leid', 'Error', 'Fehler')
+
+
+class PageOutcome(Enum):
+    OK = 'ok'
+    SLOW = 'slow'
+    ERROR = 'error'  # an error page or an exception while loading
+    CAPTCHA = 'captcha'
+    SIGNIN = 'signin'  # redirected to the sign in form, e.g. after the session expired
+
+    @property
+    def throttled(self) -> bool:
+        return self is not PageOutcome.OK
+
+
+def is_signin_url(url: str) -> bool:
+    return '/ap/signin' in url
+
+
+def classify_page(url: str, title: str, captcha_form: bool = False) -> PageOutcome:
+    """
+    :param captcha_form: whether the page contains a captcha form (CAPTCHA_FORM)
+    :returns: what the loaded page says about the state of the scrape
+    """
+    if is_signin_url(url):
+        return PageOutcome.SIGNIN
+    if captcha_form or 'validateCaptcha' in url:
+        return PageOutcome.CAPTCHA
+    if any(error_title in title for error_title in ERROR_TITLES):
+        return PageOutcome.ERROR
+    return PageOutcome.OK
+
+
+def page_outcome(browser: Any) -> PageOutcome:
+    """ classifies the page currently open in the (selenium) browser """
+    return classify_page(browser.current_url, browser.title,
+                         bool(browser.find_elements_by_css_selector(CAPTCHA_FORM)))
+
+
+class TokenBucket:
+    """ hands out `rate` tokens per second, up to `burst` at once after an idle time """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.burst = burst
+        self.clock = clock
+        self._rate = rate
+        self._tokens = burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """ no tokens are handed out for the given seconds """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+    def try_acquire(self) -> float:
+        """ :returns 0 if a token got taken, else the seconds until the next one is available """
+        with self._lock:
+            now = self._refill()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    def acquire(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """ blocks until a token is available. :returns False if cancel_event got set meanwhile """
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if cancel_event is not None:
+                cancel_event.wait(min(wait, POLL_INTERVAL))
+            else:
+                time.sleep(wait)
+
+    def _refill(self) -> float:
+        now = self.clock()
+        # nothing accumulates during a pause
+        refill_from = max(self._updated, self._paused_until)
+        if now > refill_from:
+            self._tokens = min(self.burst, self._tokens + (now - refill_from) * self._rate)
+        self._updated = now
+        return now
+
+
+class Fetch:
+    """ a page load in progress, the loading code sets its outcome """
+
+    def __init__(self) -> None:
+        self.outcome = PageOutcome.OK
+
+
+class AdaptiveThrottle:
+    """
+    Limits page loads to `rate` per second and `concurrency` at once, shared by all browsers of a scrape (or of a batch
+    of scrapes from the same machine). Both grow additively while pages load fine and fast, and get halved (at most
+    once per COOLDOWN) on error pages, captchas, sign in redirects or loads slower than SLOW_LATENCY, like TCP
+    congestion control. A captcha additionally pauses all loads for CAPTCHA_PAUSE seconds
+    """
+
+    def __init__(self, rate: float = START_RATE, max_rate: float = MAX_RATE, min_rate: float = MIN_RATE,
+                 max_concurrency: int = 1, slow_latency: float = SLOW_LATENCY, cooldown: float = COOLDOWN,
+                 captcha_pause: float = CAPTCHA_PAUSE, clock: Callable[[], float] = time.monotonic,
+                 shared: Optional[TokenBucket] = None) -> None:
+        """
+        :param max_concurrency: e.g. the number of browsers, concurrency starts at 1
+        :param shared: a fixed limit shared with other throttles, e.g. those of the other accounts of a batch scraped
+        from the same machine. Every load takes a token from it as well, after one of the own adapted rate
+        """
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.slow_latency = slow_latency
+        self.cooldown = cooldown
+        self.captcha_pause = captcha_pause
+        self.clock = clock
+        self.bucket = TokenBucket(min(rate, max_rate), clock=clock)
+        self.shared = shared
+
+        self.concurrency = 1
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.latency: Optional[float] = None  # exponentially smoothed seconds per load
+
+        self._successes = 0
+        self._last_decrease: Optional[float] = None
+        self._condition = threading.Condition()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    @contextmanager
+    def fetch(self, cancel_event: Optional[threading.Event] = None) -> Iterator[Fetch]:
+        """
+        waits for a free slot and a token, the with block loads the page and sets the outcome of the yielded Fetch.
+        An exception in the block counts as PageOutcome.ERROR
+        :raise ScrapeCancelled if cancel_event gets set while waiting
+        """
+        self._acquire_slot(cancel_event)
+        fetch = Fetch()
+        started = self.clock()
+        try:
+            if not self.bucket.acquire(cancel_event) \
+                    or (self.shared is not None and not self.shared.acquire(cancel_event)):
+                raise ScrapeCancelled
+            started = self.clock()
+            yield fetch
+        except ScrapeCancelled:
+            self._release_slot()
+            raise
+        except BaseException:
+            self._record(PageOutcome.ERROR, self.clock() - started)
+            raise
+        else:
+            self._record(fetch.outcome, self.clock() - started)
+
+    def metrics(self) -> Dict[str, float]:
+        with self._condition:
+            return {'rate': round(self.rate, 3), 'concurrency': self.concurrency, 'in_flight': self.in_flight,
+                    'requests': self.requests, 'throttled': self.throttled, 'decreases': self.decreases,
+                    'latency': round(self.latency, 3) if self.latency is not None else 0.0}
+
+    def format(self) -> str:
+        """ :returns the current limits, e.g. 'limit 1.20 pages/s 2 at once' """
+        return f'limit {self.rate:.2f} pages/s {self.concurrency} at once'
+
+    def _acquire_slot(self, cancel_event: Optional[threading.Event]) -> None:
+        with self._condition:
+            while self.in_flight >= self.concurrency:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise ScrapeCancelled
+                self._condition.wait(POLL_INTERVAL)
+            self.in_flight += 1
+
+    def _release_slot(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def _record(self, outcome: PageOutcome, latency: float) -> None:
+        if outcome is PageOutcome.OK and latency > self.slow_latency:
+            outcome = PageOutcome.SLOW
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if outcome.throttled:
+                self.throttled += 1
+                self._decrease(outcome)
+            else:
+                self._increase()
+            self._condition.notify_all()
+
+    def _increase(self) -> None:
+        rate = self.rate
+        self.bucket.rate = min(self.max_rate, rate + RATE_STEP / max(rate, RATE_STEP))
+        self._successes += 1
+        if self._successes >= SUCCESSES_PER_STEP * self.concurrency and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+            self._successes = 0
+            LOGGER.info(colored(f'throttle: {self.format()}', 'blue'))
+
+    def _decrease(self, outcome: PageOutcome) -> None:
+        self._successes = 0
+        now = self.clock()
+        if outcome is PageOutcome.CAPTCHA:
+            self.bucket.pause(self.captcha_pause)
+        if self._last_decrease is not None and now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        self.bucket.rate = max(self.min_rate, self.rate * DECREASE)
+        self.concurrency = max(1, int(self.concurrency * DECREASE))
+        LOGGER.warning(colored(f'throttle: {outcome.value} page, backing off to {self.format()}', 'yellow'))
@@ -0,0 +1,246 @@
+"""
+Contains a TimeSeries class which resamples orders onto a dense calendar and provides rolling statistics
+"""
+from __future__ import annotations
+
+import datetime
+import heapq
+import itertools
+import math
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .data import Order
+
+
+class Frequency(Enum):
+    """
+    Enum for the calendar resolution a time series is resampled to
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+
+
+def period_start(date: datetime.date, frequency: Frequency) -> datetime.date:
+    """ :returns the first day of the period (day, week starting on monday or month) containing date """
+    if frequency == Frequency.WEEK:
+        return date - datetime.timedelta(days=date.weekday())
+    if frequency == Frequency.MONTH:
+        return date.replace(day=1)
+    return date
+
+
+def next_period(date: datetime.date, frequency: Frequency) -> datetime.date:
+    """ :returns the start of the period following the one starting at date """
+    if frequency == Frequency.WEEK:
+        return date + datetime.timedelta(days=7)
+    if frequency == Frequency.MONTH:
+        return datetime.date(year=date.year + date.month // 12, month=date.month % 12 + 1, day=1)
+    return date + datetime.timedelta(days=1)
+
+
+def _same_period_last_year(date: datetime.date, frequency: Frequency) -> datetime.date:
+    """ :returns the start of the period one year before the period starting at date """
+    if frequency == Frequency.WEEK:
+        # 52 weeks keep the comparison aligned to mondays
+        return date - datetime.timedelta(weeks=52)
+    if date.month == 2 and date.day == 29:
+        return datetime.date(year=date.year - 1, month=2, day=28)
+    return date.replace(year=date.year - 1)
+
+
+class _SlidingMedian:
+    """
+    the median of a window of values which gain and lose one value at a time. The smaller half is kept in a max heap
+    (as negated values), the larger half in a min heap. A removed value is only counted as removed and dropped once it
+    gets to the top of its heap, so adding and removing are O(log n) for n values added so far
+    """
+
+    def __init__(self) -> None:
+        self._lower: List[float] = []  # negated
+        self._upper: List[float] = []
+        self._lower_size = 0  # without the removed values still in the heap
+        self._upper_size = 0
+        self._removed: Dict[float, int] = dict()
+
+    def add(self, value: float) -> None:
+        if not self._lower or value <= -self._lower[0]:
+            heapq.heappush(self._lower, -value)
+            self._lower_size += 1
+        else:
+            heapq.heappush(self._upper, value)
+            self._upper_size += 1
+        self._balance()
+
+    def remove(self, value: float) -> None:
+        """ :param value: has to be in the window """
+        self._removed[value] = self._removed.get(value, 0) + 1
+        # the tops are never removed values, any value equal to the top may stand in for the removed one
+        if value <= -self._lower[0]:
+            self._lower_size -= 1
+            self._prune(self._lower, -1)
+        else:
+            self._upper_size -= 1
+            self._prune(self._upper, 1)
+        self._balance()
+
+    def median(self) -> float:
+        if self._lower_size > self._upper_size:
+            return -self._lower[0]
+        return (-self._lower[0] + self._upper[0]) / 2
+
+    def _balance(self) -> None:
+        """ the lower half has as many values as the upper one or one more """
+        if self._lower_size > self._upper_size + 1:
+            heapq.heappush(self._upper, -heapq.heappop(self._lower))
+            self._lower_size -= 1
+            self._upper_size += 1
+            self._prune(self._lower, -1)
+        elif self._lower_size < self._upper_size:
+            heapq.heappush(self._lower, -heapq.heappop(self._upper))
+            self._upper_size -= 1
+            self._lower_size += 1
+            self._prune(self._upper, 1)
+
+    def _prune(self, heap: List[float], sign: int) -> None:
+        """ drops removed values from the top of the heap """
+        while heap:
+            value = sign * heap[0]
+            count = self._removed.get(value)
+            if not count:
+                return
+            if count == 1:
+                del self._removed[value]
+            else:
+                self._removed[value] = count - 1
+            heapq.heappop(heap)
+
+
+class TimeSeries:
+    """
+    spending values on a dense calendar, i.e. every period between the first and the last one has a value even if
+    there were no orders in it. All rolling statistics run in a single pass over the values
+    """
+
+    def __init__(self, dates: List[datetime.date], values: List[float], frequency: Frequency) -> None:
+        assert len(dates) == len(values), "dates and values must have the same length"
+        self.dates = dates
+        self.values = values
+        self.frequency = frequency
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @staticmethod
+    def from_orders(orders: Iterable[Order], frequency: Frequency, start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None) -> TimeSeries:
+        """
+        sums up the order prices per period and fills periods without orders with 0
+        :param orders: the orders to resample
+        :param frequency: the calendar resolution
+        :param start: first date of the calendar, defaults to the date of the oldest order
+        :param end: last date of the calendar, defaults to the date of the newest order
+        """
+        buckets: Dict[datetime.date, float] = dict()
+        for order in orders:
+            key = period_start(order.date, frequency)
+            buckets[key] = buckets.get(key, 0.0) + order.price
+        return TimeSeries.from_totals(buckets, frequency, start, end)
+
+    @staticmethod
+    def from_totals(totals: Dict[datetime.date, float], frequency: Frequency, start: Optional[datetime.date] = None,
+                    end: Optional[datetime.date] = None) -> TimeSeries:
+        """ builds a dense series from totals keyed by period start, missing periods are filled with 0 """
+        if not totals and (start is None or end is None):
+            return TimeSeries([], [], frequency)
+
+        current = period_start(start if start is not None else min(totals.keys()), frequency)
+        last = period_start(end if end is not None else max(totals.keys()), frequency)
+
+        dates: List[datetime.date] = []
+        values: List[float] = []
+        while current <= last:
+            dates.append(current)
+            values.append(totals.get(current, 0.0))
+            current = next_period(current, frequency)
+        return TimeSeries(dates, values, frequency)
+
+    def to_dict(self) -> Dict[datetime.date, float]:
+        """ :returns the series as dict with the period start as key, sorted by date """
+        return dict(zip(self.dates, self.values))
+
+    def rounded(self, decimals: int = 2) -> TimeSeries:
+        """ :returns a copy with all values rounded to the given decimals """
+        return self._with_values([round(value, decimals) for value in self.values])
+
+    def _with_values(self, values: List[float]) -> TimeSeries:
+        return TimeSeries(list(self.dates), values, self.frequency)
+
+    def rolling_sum(self, window: int) -> TimeSeries:
+        """
+        sum over the last `window` periods, the first periods sum over the available ones.
+        Computed through the difference of two prefix sums so each value costs O(1)
+        """
+        assert window > 0, "window must be positive"
+        prefix = [0.0] + list(itertools.accumulate(self.values))
+        return self._with_values([prefix[index + 1] - prefix[max(0, index + 1 - window)]
+                                  for index in range(len(self.values))])
+
+    def rolling_mean(self, window: int) -> TimeSeries:
+        """ mean over the last `window` periods, the first periods average over the available ones """
+        sums = self.rolling_sum(window).values
+        return self._with_values([total / min(index + 1, window) for index, total in enumerate(sums)])
+
+    def rolling_median(self, window: int) -> TimeSeries:
+        """
+        median over the last `window` periods in O(n log n) for n periods, independent of the window size
+        (see _SlidingMedian)
+        """
+        assert window > 0, "window must be positive"
+        sliding = _SlidingMedian()
+        medians: List[float] = []
+        for index, value in enumerate(self.values):
+            if index >= window:
+                sliding.remove(self.values[index - window])
+            sliding.add(value)
+            medians.append(sliding.median())
+        return self._with_values(medians)
+
+    def ewma(self, span: Optional[float] = None, alpha: Optional[float] = None) -> TimeSeries:
+        """
+        exponentially weighted moving average, either span or alpha has to be given (alpha = 2 / (span + 1))
+        """
+        assert (span is None) != (alpha is None), "either span or alpha has to be given"
+        if alpha is None:
+            assert span is not None and span >= 1, "span must be at least 1"
+            alpha = 2 / (span + 1)
+        assert 0 < alpha <= 1, "alpha must be in (0, 1]"
+
+        averages: List[float] = []
+        average = self.values[0] if self.values else 0.0
+        for value in self.values:
+            average = alpha * value + (1 - alpha) * average
+            averages.append(average)
+        return self._with_values(averages)
+
+    def year_over_year(self, relative: bool = False) -> TimeSeries:
+        """
+        compares every period with the same period one year before. The result starts with the first period that
+        has a predecessor one year earlier
+        :param relative: if set the change is given in percent, periods without spending last year become nan
+        """
+        index_by_date = {date: index for index, date in enumerate(self.dates)}
+        change: Callable[[float, float], float] = \
+            (lambda now, before: (now - before) / before * 100 if before else math.nan) if relative \
+            else (lambda now, before: now - before)
+
+        dates: List[datetime.date] = []
+        values: List[float] = []
+        for date, value in zip(self.dates, self.values):
+            previous_index = index_by_date.get(_same_period_last_year(date, self.frequency))
+            if previous_index is None:
+                continue
+            dates.append(date)
+            values.append(change(value, self.values[previous_index]))
+        return TimeSeries(dates, values, self.frequency)
@@ -9,15 +9,14 @@ import os
 import webbrowser
 from collections import OrderedDict
 from enum import Enum
-from typing import List, Dict
+from typing import List, Dict, TYPE_CHECKING
 
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.firefox.webdriver import WebDriver
-from selenium.webdriver.support import expected_conditions as ec
-from selenium.webdriver.support.wait import WebDriverWait
 from termcolor import colored
 
+if TYPE_CHECKING:
+    # selenium is only imported where a browser is used, it takes longer to import than the rest of the CLI
+    from selenium.webdriver.firefox.webdriver import WebDriver
+
 MONTHS: List[str] = ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli', 'August', 'September', 'Oktober',
                      'November', 'Dezember']
 
@@ -75,10 +74,15 @@ def serialize_date(obj: object) -> str:
     raise TypeError("Type %s not serializable" % type(obj))
 
 
-def wait_for_element_by_class_name(browser: WebDriver, class_name: str, timeout: float = 3) -> bool:
+def wait_for_element_by_class_name(browser: 'WebDriver', class_name: str, timeout: float = 3) -> bool:
     """ wait the specified timout for a element to load
         :returns true if element was found
     """
+    # pylint: disable=C0415
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as ec
+    from selenium.webdriver.support.wait import WebDriverWait
     try:
         WebDriverWait(browser, timeout).until(ec.presence_of_element_located((By.CLASS_NAME, class_name)))
         return True
@@ -87,12 +91,17 @@ def wait_for_element_by_class_name(browser: WebDriver, class_name: str, timeout:
         return False
 
 
-def wait_for_element_by_id(browser: WebDriver, element_id: object, timeout: object = 3) -> bool:
+def wait_for_element_by_id(browser: 'WebDriver', element_id: object, timeout: object = 3) -> bool:
     """
     wait the specified timout for a element to load
 
     :return True if element was found in the given timeout and False otherwise
     """
+    # pylint: disable=C0415
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as ec
+    from selenium.webdriver.support.wait import WebDriverWait
     try:
         WebDriverWait(browser, timeout).until(ec.presence_of_element_located((By.ID, element_id)))
         return True
@@ -0,0 +1,112 @@
+"""
+watches a file for changes, through inotify on linux and by polling its modification time everywhere else
+"""
+# pylint: disable=W1203
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable, Optional, Tuple
+
+from termcolor import colored
+
+LOGGER = logging.getLogger(__name__)
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+
+# struct inotify_event header: wd, mask, cookie, len (followed by len bytes name)
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """
+    calls on_change in a background thread whenever the watched file was written or replaced. The directory is
+    watched instead of the file itself, so replacing the file (e.g. by an atomic rename) is noticed as well. What
+    on_change returns is ignored
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], object], poll_interval: float = 1.0) -> None:
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            self._watch_inotify()
+        except (OSError, AttributeError) as error:
+            LOGGER.info(colored(f'inotify not available ({error}), polling {self.path} instead', 'blue'))
+            self._watch_polling()
+
+    def _notify(self) -> None:
+        try:
+            self.on_change()
+        except Exception:  # pylint: disable=W0703
+            LOGGER.exception(f'handling the change of {self.path} failed')
+
+    def _watch_inotify(self) -> None:
+        library = ctypes.util.find_library('c')
+        if library is None:
+            raise OSError('libc not found')
+        libc = ctypes.CDLL(library, use_errno=True)
+
+        file_descriptor = libc.inotify_init()
+        if file_descriptor < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        try:
+            directory, file_name = os.path.split(self.path)
+            watch = libc.inotify_add_watch(file_descriptor, directory.encode(),
+                                           IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if watch < 0:
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+            LOGGER.info(colored(f'watching {self.path} through inotify', 'blue'))
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([file_descriptor], [], [], self.poll_interval)
+                if readable and file_name in self._read_event_names(os.read(file_descriptor, 64 * 1024)):
+                    self._notify()
+        finally:
+            os.close(file_descriptor)
+
+    @staticmethod
+    def _read_event_names(buffer: bytes) -> Tuple[str, ...]:
+        names = []
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            names.append(buffer[offset:offset + name_length].rstrip(b'\0').decode(errors='replace'))
+            offset += name_length
+        return tuple(names)
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _watch_polling(self) -> None:
+        signature = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current != signature:
+                signature = current
+                if current is not None:
+                    self._notify()
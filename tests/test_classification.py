@@ -0,0 +1,70 @@
+"""
+compares the classifier, which resolves seller only rules through a dict, with evaluating all rules in order
+"""
+import datetime
+import random
+from typing import List
+
+import pytest
+
+from scraping.classification import UNCATEGORIZED, Classifier, Rule
+from scraping.data import Item, Order
+
+SELLERS = ['Audible GmbH', 'Amazon EU S.a.r.L.', 'Buchhandlung', 'Amazon Instant Video Germany GmbH']
+TITLES = ['Hörbuch', 'Amazon-Konto aufladen', 'Kabel', 'Staffel 1']
+CATEGORIES = [{}, {1: 'Bücher'}, {1: 'Bücher', 2: 'Krimis'}, {0: 'Filme', 1: 'Drama'}, {1: 'Elektronik'}]
+
+
+def naive_classify(rules: List[Rule], order: Order, item: Item) -> str:
+    for rule in rules:
+        if rule.compile()(order, item):
+            return rule.tag
+    return UNCATEGORIZED
+
+
+def random_rule(rng: random.Random) -> Rule:
+    tag = rng.choice(['a', 'b', 'c', 'd'])
+    if rng.random() < 0.5:
+        return Rule(tag, seller=rng.choice(SELLERS))
+    return Rule(tag, seller=rng.choice(SELLERS + [None]), title=rng.choice(['^Hör', 'Konto', None]),
+                category=rng.choice([('Bücher',), ('Bücher', 'Krimis'), ('Filme',), None]),
+                order_id_prefix=rng.choice(['D01', None]))
+
+
+def random_order(rng: random.Random) -> Order:
+    items = [Item(rng.uniform(1, 50), f'link{index}', rng.choice(TITLES), rng.choice(SELLERS),
+                  dict(rng.choice(CATEGORIES))) for index in range(rng.randint(1, 4))]
+    return Order(rng.choice(['D01-1', '302-2']), sum(item.price for item in items), datetime.date(2020, 1, 1), items)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_first_matching_rule_wins_like_in_order_evaluation(seed: int) -> None:
+    rng = random.Random(seed)
+    rules = [random_rule(rng) for _ in range(rng.randint(0, 8))]
+    classifier = Classifier(rules)
+    for _ in range(50):
+        order = random_order(rng)
+        for item in order.items:
+            assert classifier.classify(order, item) == naive_classify(rules, order, item)
+
+
+def test_seller_rule_after_a_matching_general_rule_loses() -> None:
+    rules = [Rule('balance', title='Konto'), Rule('audible', seller='Audible GmbH')]
+    item = Item(10.0, 'link', 'Amazon-Konto aufladen', 'Audible GmbH', {})
+    assert Classifier(rules).classify(Order('1', 10.0, datetime.date(2020, 1, 1), [item]), item) == 'balance'
+
+
+def test_earlier_seller_rule_beats_a_later_general_rule() -> None:
+    rules = [Rule('audible', seller='Audible GmbH'), Rule('balance', title='Konto')]
+    item = Item(10.0, 'link', 'Amazon-Konto aufladen', 'Audible GmbH', {})
+    assert Classifier(rules).classify(Order('1', 10.0, datetime.date(2020, 1, 1), [item]), item) == 'audible'
+
+
+def test_order_class_is_the_tag_of_the_first_rule() -> None:
+    classifier = Classifier([Rule('a', seller='x'), Rule('b', seller='y'), Rule('a', seller='z')])
+    items = [Item(1.0, 'l1', 't', 'y', {}), Item(1.0, 'l2', 't', 'z', {}), Item(1.0, 'l3', 't', 'w', {})]
+    order = Order('1', 3.0, datetime.date(2020, 1, 1), items)
+    classifier.tag_orders([order])
+    assert [item.tag for item in items] == ['b', 'a', UNCATEGORIZED]
+    assert classifier.order_class(order) == 'a'
+    assert classifier.tags == ['a', 'b']
@@ -0,0 +1,47 @@
+"""
+compares lttb with a naive implementation building the buckets explicitly
+"""
+import random
+from typing import List, Sequence
+
+import pytest
+
+from scraping.downsampling import lttb
+
+
+def naive_lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    if threshold >= len(xs) or threshold < 3:
+        return list(range(len(xs)))
+    inner = list(range(1, len(xs) - 1))
+    size = (len(xs) - 2) / (threshold - 2)
+    buckets = [inner[int(bucket * size):int((bucket + 1) * size)] for bucket in range(threshold - 2)]
+    selected = [0]
+    for bucket, indices in enumerate(buckets):
+        following = buckets[bucket + 1] if bucket + 1 < len(buckets) and buckets[bucket + 1] else [len(xs) - 1]
+        average_x = sum(xs[index] for index in following) / len(following)
+        average_y = sum(ys[index] for index in following) / len(following)
+        previous = selected[-1]
+        # twice the areas of the triangles, the first of equally large ones is kept like by lttb
+        areas = [abs(xs[previous] * (ys[index] - average_y) + xs[index] * (average_y - ys[previous])
+                     + average_x * (ys[previous] - ys[index])) for index in indices]
+        selected.append(indices[areas.index(max(areas))])
+    return selected + [len(xs) - 1]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_naive_buckets(seed: int) -> None:
+    rng = random.Random(seed)
+    length = rng.randint(0, 500)
+    xs = sorted(rng.uniform(0, 1000) for _ in range(length))
+    ys = [rng.choice([0.0, rng.uniform(-100, 100)]) for _ in range(length)]
+    for threshold in (0, 3, 4, 10, 99, length, length + 1):
+        selected = lttb(xs, ys, threshold)
+        assert selected == naive_lttb(xs, ys, threshold)
+        assert selected == sorted(set(selected))
+        assert len(selected) == (threshold if 3 <= threshold < length else length)
+
+
+def test_keeps_the_peak() -> None:
+    ys = [0.0] * 1000
+    ys[537] = 100.0
+    assert 537 in lttb([float(index) for index in range(1000)], ys, 20)
@@ -0,0 +1,73 @@
+"""
+round trips of orders through json, the binary format and the order store
+"""
+import datetime
+import json
+import os
+import pathlib
+import random
+from typing import List
+
+import pytest
+
+from scraping import file_handler, serialization, synthetic
+from scraping.data import Item, Order
+from scraping.order_store import OrderStore, write_store
+
+
+def orders_with_edge_cases() -> List[Order]:
+    orders = synthetic.generate_orders(300, seed=3)
+    orders[0].items[0].tag = 'audible'
+    orders.append(Order('ü-1 "quoted"', 0.0, datetime.date(2016, 2, 29), []))
+    orders.append(Order('2', 12.34, datetime.date(2012, 1, 1),
+                        [Item(0.1, 'https://example.com/ä', 'Titel\nmit "Zeichen" \\ €', 'Händler', {0: 'Filme', 2: 'x'}),
+                         Item(12.24, 'l', '', '', {}, 'tag')]))
+    return orders
+
+
+@pytest.mark.parametrize('file_name', ['orders.json', 'orders.bin', 'orders.store'])
+def test_round_trip(tmp_path: pathlib.Path, file_name: str) -> None:
+    orders = orders_with_edge_cases()
+    path = os.path.join(tmp_path, file_name)
+    file_handler.save_orders(orders, path)
+    loaded = file_handler.load_orders(path)
+    if file_name.endswith('.store'):
+        # the store is sorted by date
+        orders = sorted(orders, key=lambda order: (order.date, order.order_id))
+    assert loaded == orders
+    assert [order.to_dict() for order in loaded] == [order.to_dict() for order in orders]
+
+
+def test_json_is_identical_to_json_dumps() -> None:
+    orders = orders_with_edge_cases()
+    assert ''.join(serialization.iter_json(orders)) == json.dumps([order.to_dict() for order in orders])
+    assert ''.join(serialization.iter_json([])) == json.dumps([])
+
+
+def test_empty_files(tmp_path: pathlib.Path) -> None:
+    for file_name in ['orders.json', 'orders.bin', 'orders.store']:
+        path = os.path.join(tmp_path, file_name)
+        file_handler.save_orders([], path)
+        assert file_handler.load_orders(path) == []
+
+
+def test_store_reads_ranges_and_ids_like_a_list(tmp_path: pathlib.Path) -> None:
+    orders = orders_with_edge_cases()
+    # a duplicate id is stored once
+    orders.append(orders[5])
+    path = os.path.join(tmp_path, 'orders.store')
+    assert write_store(path, orders) == len(orders) - 1
+    expected = sorted({order.order_id: order for order in orders}.values(), key=lambda order: (order.date, order.order_id))
+
+    rng = random.Random(1)
+    with OrderStore(path) as store:
+        assert len(store) == len(expected)
+        assert store[0] == expected[0] and store[-1] == expected[-1] and store[10:20] == expected[10:20]
+        for _ in range(20):
+            start = datetime.date(2010, 1, 1) + datetime.timedelta(days=rng.randrange(3650))
+            end = start + datetime.timedelta(days=rng.randrange(400))
+            in_range = [order for order in expected if start <= order.date <= end]
+            assert list(store.between(start, end)) == in_range
+            assert store.total(start, end) == pytest.approx(sum(order.price for order in in_range))
+        assert all(store.get(order.order_id) == order for order in expected)
+        assert store.get('unknown') is None
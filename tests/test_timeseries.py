@@ -0,0 +1,81 @@
+"""
+compares the single pass rolling statistics and the year over year comparison with naive implementations
+"""
+import datetime
+import math
+import random
+import statistics
+from typing import Dict, List
+
+import pytest
+
+from scraping.timeseries import Frequency, TimeSeries, period_start
+
+
+def series(values: List[float], frequency: Frequency = Frequency.DAY,
+           start: datetime.date = datetime.date(2019, 1, 1)) -> TimeSeries:
+    dates = [start + datetime.timedelta(days=index) for index in range(len(values))]
+    return TimeSeries(dates, values, frequency)
+
+
+def random_values(rng: random.Random, count: int) -> List[float]:
+    # few distinct values, so the windows contain duplicates
+    return [float(rng.choice([0, 0, 1, 2, 2, 3, 5, 8, -1])) if rng.random() < 0.7 else rng.uniform(-10, 10)
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_rolling_statistics_match_naive_windows(seed: int) -> None:
+    rng = random.Random(seed)
+    values = random_values(rng, rng.randint(0, 80))
+    for window in (1, 2, 3, 7, 12, 100):
+        windows = [values[max(0, index + 1 - window):index + 1] for index in range(len(values))]
+        assert series(values).rolling_median(window).values == [statistics.median(values) for values in windows]
+        assert series(values).rolling_sum(window).values == pytest.approx([sum(values) for values in windows])
+        assert series(values).rolling_mean(window).values == \
+            pytest.approx([statistics.mean(values) for values in windows])
+
+
+def test_rolling_median_of_constant_and_sorted_values() -> None:
+    assert series([4.0] * 10).rolling_median(3).values == [4.0] * 10
+    assert series([float(value) for value in range(6)]).rolling_median(4).values == [0, 0.5, 1, 1.5, 2.5, 3.5]
+    assert series([float(value) for value in range(6, 0, -1)]).rolling_median(2).values == [6, 5.5, 4.5, 3.5, 2.5, 1.5]
+
+
+def test_rolling_statistics_reject_empty_windows() -> None:
+    with pytest.raises(AssertionError):
+        series([1.0]).rolling_median(0)
+
+
+def test_year_over_year_compares_leap_days_with_february_28() -> None:
+    start = datetime.date(2019, 1, 1)
+    values = [float(index) for index in range((datetime.date(2020, 12, 31) - start).days + 1)]
+    daily = series(values, start=start)
+    compared = daily.year_over_year().to_dict()
+
+    by_date = daily.to_dict()
+    assert compared[datetime.date(2020, 2, 29)] == by_date[datetime.date(2020, 2, 29)] - by_date[datetime.date(2019, 2, 28)]
+    assert compared[datetime.date(2020, 3, 1)] == by_date[datetime.date(2020, 3, 1)] - by_date[datetime.date(2019, 3, 1)]
+    # every day of 2020 has a predecessor, none of 2019
+    assert min(compared) == datetime.date(2020, 1, 1)
+    assert len(compared) == 366
+
+
+def test_year_over_year_relative_without_spending_last_year_is_nan() -> None:
+    monthly = TimeSeries.from_totals({datetime.date(2019, 1, 1): 0.0, datetime.date(2020, 1, 1): 10.0}, Frequency.MONTH)
+    compared = monthly.year_over_year(relative=True).to_dict()
+    assert math.isnan(compared[datetime.date(2020, 1, 1)])
+
+
+@pytest.mark.parametrize('frequency', list(Frequency))
+def test_resampling_is_dense_and_keeps_the_total(frequency: Frequency) -> None:
+    rng = random.Random(7)
+    totals = {datetime.date(2019, 1, 1) + datetime.timedelta(days=rng.randrange(700)): rng.uniform(1, 100)
+              for _ in range(50)}
+    buckets: Dict[datetime.date, float] = dict()
+    for date, value in totals.items():
+        buckets[period_start(date, frequency)] = buckets.get(period_start(date, frequency), 0.0) + value
+    resampled = TimeSeries.from_totals(buckets, frequency)
+    assert sum(resampled.values) == pytest.approx(sum(totals.values()))
+    assert resampled.dates == sorted(set(resampled.dates))
+    assert all(period_start(date, frequency) == date for date in resampled.dates)